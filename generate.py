@@ -1,674 +1,4 @@
-import os
-import re
-import sys
-from dataclasses import dataclass
-import json
-from typing import Dict
-from typing_extensions import deprecated
+from noita_xsd.cli import main
 
-PRIMARY_FILE = True
-
-# these constants might need to be changed if your editor works differently to lemminx when generating hover docs, they are only used for hover info
-TAB = "&emsp;&emsp;&emsp;&emsp;"
-NL = "<br>"
-
-
-@dataclass
-class Field:
-    name: str
-    ty: str
-    default: str
-    values: str
-    comment: str
-
-
-@dataclass
-class Component:
-    name: str
-    fields: list[Field]
-
-
-@dataclass
-class Enum:
-    name: str
-    variants: list[str]
-
-
-def xml_encode(s: str) -> str:
-    return s.replace(">", "&gt;").replace("<", "&lt;")
-
-
-def get_xml_type(name: str, ty: str) -> list[tuple[str, str]] | str:
-    lens = "LensValue"
-    unsigned = "unsigned"
-    material = "material"
-    enum = "::Enum"
-    if ty == "int" and name[-len(material) :] == material:
-        return [("", "xsd:string")]
-    if ty == "Hex8":
-        return [("", "Hex8")]
-    if ty == "REACTION_DIRECTION":
-        return [("", "REACTION_DIRECTION")]
-    if ty == "StatusEffectType":
-        return [("", "GAME_EFFECT")]
-    if ty[-len(enum) :] == enum:
-        return [("", ty[: -len(enum)])]
-    if ty[: len(lens)] == lens:
-        return get_xml_type(name, ty[len(lens) + 1 : -1])
-    if ty == "float" or ty == "double":
-        return [("", "xsd:decimal")]
-    if ty[:3] == "int":
-        return [("", "xsd:int")]
-    if ty[: len(unsigned)] == unsigned or ty[:4] == "uint":
-        return [("", "xsd:unsignedInt")]
-    if ty == "string" or ty == "std::string" or ty == "std_string" or ty == "VEC_OF_MATERIALS":
-        return [("", "xsd:string")]
-    if ty == "bool":
-        return [("", "NoitaBool")]
-    if ty == "vec2":
-        return [
-            (".x", "xsd:decimal"),
-            (".y", "xsd:decimal"),
-        ]
-    if ty == "ivec2":
-        return [
-            (".x", "xsd:int"),
-            (".y", "xsd:int"),
-        ]
-    if ty == "types::fcolor":
-        return [
-            (".r", "xsd:decimal"),
-            (".g", "xsd:decimal"),
-            (".b", "xsd:decimal"),
-            (".a", "xsd:decimal"),
-        ]
-    if ty == "ValueRange":
-        return [
-            (".min", "xsd:decimal"),
-            (".max", "xsd:decimal"),
-        ]
-    if ty == "ValueRangeInt":
-        return [
-            (".min", "xsd:int"),
-            (".max", "xsd:int"),
-        ]
-    if ty == "types::aabb":
-        return [
-            (".min_x", "xsd:decimal"),
-            (".min_y", "xsd:decimal"),
-            (".max_x", "xsd:decimal"),
-            (".max_y", "xsd:decimal"),
-        ]
-    if ty == "types::iaabb":
-        return [
-            (".min_x", "xsd:int"),
-            (".min_y", "xsd:int"),
-            (".max_x", "xsd:int"),
-            (".max_y", "xsd:int"),
-        ]
-    # objects
-    if ty == "types::xform":
-        return "Transform"
-    if ty in config_types:
-        return ty
-    # enums:
-    if ty in [
-        "MATERIALAUDIO_TYPE",
-        "MOVETOSURFACE_TYPE",
-        "RAGDOLL_FX",
-        "INVENTORY_KIND",
-        "DAMAGE_TYPES",
-        "AUDIO_LAYER",
-        "GAME_EFFECT",
-        "PROJECTILE_TYPE",
-        "JOINT_TYPE",
-        "ARC_TYPE",
-        "HIT_EFFECT",
-        "MATERIALAUDIO_TYPE",
-        "MATERIALBREAKAUDIO_TYPE",
-        "EDGE_STYLE",
-        "EXPLOSION_TRIGGER_TYPE",
-        "LUA_VM_TYPE",
-        "FOG_OF_WAR_TYPE",
-        "NOISE_TYPE",
-        "GENERAL_NOISE",
-        "BIOME_TYPE",
-        "VERLET_TYPE",
-        "PARTICLE_EMITTER_CUSTOM_STYLE",
-    ]:
-        return [("", ty)]
-    # defined to be invalid
-    if ty in ["EntityID", "WormPartPositions"]:
-        return []
-    if "*" in ty:
-        return []
-    if "std::vector" in ty:
-        return []
-    if "VECTOR_" in ty:
-        return []
-    if "VEC_" in ty:
-        return []
-    # print(f"fail: {ty}")
-    return []
-
-
-TYPE_DEFAULTS = {
-    "ARC_TYPE": "MATERIAL",
-    "VERLET_TYPE": "CHAIN",
-    "PROJECTILE_TYPE": "PROJECTILE",
-    "EXPLOSION_TRIGGER_TYPE": "ON_CREATE",
-    "HIT_EFFECT": "NONE",
-    "INVENTORY_KIND": "QUICK",
-    "LUA_VM_TYPE": "SHARED_BY_MANY_COMPONENTS",
-    "MOVETOSURFACE_TYPE": "ENTITY",
-    "PARTICLE_EMITTER_CUSTOM_STYLE": "NONE",
-    "JOINT_TYPE": "REVOLUTE_JOINT",
-    "PathFindingComponentState": "",
-    "TeleportComponentState": "",
-    "BIOME_TYPE": "BIOME_PROCEDURAL",
-    "FOG_OF_WAR_TYPE": "DEFAULT",
-    "NOISE_TYPE": "IQ2_SIMPLEX1234",
-    "GENERAL_NOISE": "SimplexNoise",
-    "AUDIO_LAYER": "EFFECT_GAME",
-}
-
-
-def format_decimal(value: str) -> str:
-    """Format a decimal string to remove scientific notation and trailing zeroes."""
-    value_float = float(value)
-    return f"{value_float:.15f}".rstrip("0").rstrip(".")
-
-
-def get_default_for_sub_field(field: Field, ty: str, component_name: str) -> str:
-    default = TYPE_DEFAULTS.get(ty)
-    if default is not None:
-        return default
-
-    if ty == "GAME_EFFECT":
-        return "ELECTROCUTION" if component_name == "GameEffectComponent" else "NONE"
-    elif ty == "RAGDOLL_FX":
-        return "NORMAL" if component_name == "ProjectileComponent" else "NONE"
-    elif ty == "DAMAGE_TYPES":
-        return (
-            "DAMAGE_PHYSICS_HIT" if component_name == "AreaDamageComponent" else "NONE"
-        )
-
-    if field.default != "-":
-        if ty == "xsd:decimal":
-            return format_decimal(field.default)
-        return field.default
-
-    return "0" if ty != "xsd:string" else ""
-
-
-COMPONENTS_WITH_MATERIALS = {
-    "MaterialAreaCheckerComponent",
-    "PhysicsImageShapeComponent",
-    "MaterialSeaSpawnerComponent",
-    "ItemAlchemyComponent",
-    "AnimalAIComponent",
-}
-
-
-def get_type_for_sub_field(field_name: str, ty: str, component_name: str) -> str:
-    if component_name == "ParticleEmitterComponent":
-        if field_name == "color":
-            return "Hex8"
-    elif component_name == "GenomeDataComponent":
-        if field_name == "herd_id":
-            return "xsd:string"
-    elif component_name in COMPONENTS_WITH_MATERIALS:
-        if "material" in field_name:
-            return "xsd:string"
-    return ty
-
-
-def render_sub_field(field: Field, suffix: str, ty: str, component_name: str) -> str:
-    true_type = get_type_for_sub_field(field.name, ty, component_name)
-    default = get_default_for_sub_field(field, true_type, component_name)
-    return f"""
-\t\t<xsd:attribute name="{field.name}{suffix}" type="{true_type}" default="{default}">
-\t\t\t<xsd:annotation>
-\t\t\t\t<xsd:documentation><![CDATA[```cpp{NL}{render_field_cpp(field).replace("\t","")}{NL}```]]></xsd:documentation>
-\t\t\t</xsd:annotation>
-\t\t</xsd:attribute>"""[
-        1:
-    ]
-
-
-def render_field(field: Field, component_name: str) -> tuple[str, str]:
-    tys = get_xml_type(field.name, field.ty)
-    if type(tys) is str:
-        return (
-            f'\t\t\t\t<xsd:element name="{field.name}" type="{tys}" minOccurs="0"/>',
-            "",
-        )
-    if len(tys) == 0:
-        return "", f"\t\t<!-- Some Unknown Type: {field.ty} for {field.name} -->"
-    return "", "\n".join(
-        [render_sub_field(field, suffix, ty, component_name) for suffix, ty in tys]
-    )
-
-
-def render_field_cpp(comp: Field) -> str:
-    return f"\t{comp.ty} {comp.name}{f" = {comp.default if comp.ty != "std::string" else f'"{comp.default}"'}" if comp.default != "-" else ""};{f" // {comp.values} {comp.comment}" if comp.values != "" or comp.comment != "" else ""}"
-
-
-def render_component_cpp(comp: Component) -> str:
-    out = f"```cpp\nclass {comp.name} {{\n"
-    out += "\n".join([render_field_cpp(field) for field in comp.fields])
-    out += "\n};\n```"
-    return out.replace("\n", NL).replace("\t", TAB)  # parser bug
-
-
-def render_component(comp: Component) -> str:
-    fields = [render_field(x, comp.name) for x in comp.fields]
-    attrs = [x[1] for x in fields if x[1] != ""]
-    objects = [x[0] for x in fields if x[0] != ""]
-    return f"""
-\t<xsd:complexType name="{comp.name}" mixed="true">
-\t\t<xsd:annotation> <xsd:documentation> <![CDATA[{render_component_cpp(comp)}]]> </xsd:documentation> </xsd:annotation>{f"""
-\t\t\t<xsd:all>
-{"\n".join(objects)}
-\t\t\t</xsd:all>""" if len(objects) != 0 else ""}{
-"\n" + "\n".join(attrs) if len(attrs) != 0 else ""}
-\t\t<xsd:attributeGroup ref="CommonComponentAttributes"/>
-\t</xsd:complexType>
-\t<xsd:complexType name="{comp.name}Base">
-\t\t<xsd:complexContent>
-\t\t\t<xsd:extension base="{comp.name}">
-\t\t\t\t<xsd:attribute name="_remove_from_base" type="NoitaBool"/>
-\t\t\t</xsd:extension>
-\t\t</xsd:complexContent>
-\t</xsd:complexType>"""[
-        1:
-    ]
-
-
-def render_config(config: Component) -> str:
-    fields = [render_field(x, config.name) for x in config.fields]
-    attrs = [x[1] for x in fields if x[1] != ""]
-    objects = [x[0] for x in fields if x[0] != ""]
-    return f"""
-\t<xsd:complexType name="{config.name}" mixed="true">
-\t\t<xsd:annotation> <xsd:documentation> <![CDATA[{render_component_cpp(config)}]]> </xsd:documentation> </xsd:annotation>{f"""
-\t\t\t<xsd:all>
-{"\n".join(objects)}
-\t\t\t</xsd:all>""" if len(objects) != 0 else ""}{
-"\n" + "\n".join(attrs) if len(attrs) != 0 else ""}
-\t</xsd:complexType>"""[
-        1:
-    ]
-
-
-def trim_end(s: str):
-    while s[-1] == " ":
-        s = s[:-1]
-    return s
-
-# replaces int32 with std::string
-def mark_config_materials(values: list) -> list:
-    for x in values:
-        if x["type"] == "int32":
-            x["type"] = "std::string"
-    return values
-
-# configs are identical to components really, so we can just reuse component code
-configs_json = json.load(
-    open("./src/config_betas.json", "r")
-)  # credits to dexter for getting these, from https://github.com/dextercd/Noita-Component-Explorer/blob/main/data/configs_beta.json
-configs: list[Component] = []
-config_types = set()
-for config in configs_json:
-    configs.append(
-        Component(
-            config["name"].split("::")[-1],
-            [
-                Field(
-                    field["name"], field["type"], "-", "", field.get("description", "")
-                )
-                for field in config.get("members", [])
-                + config.get("privates", [])
-                + mark_config_materials(config.get("custom_data_types", []))
-                + config.get("objects", [])
-            ],
-        )
-    )
-    config_types.add(config["name"])
-
-
-def do_var_line(line: str) -> Field:
-    shift = 0
-    ty = ""
-    if line[27] == " ":
-        ty = trim_end(line[4:28])
-    else:
-        ty_part = line[4:].split(" ")[0]
-        if "::Enum" in ty_part:
-            ty = ty_part.split("::Enum")[0] + "::Enum"
-        elif "*" in ty_part:
-            ty = ty_part.split("*")[0] + "*"
-        else:
-            type_match = re.match("[A-Z_]+", ty_part)
-            assert type_match is not None
-            ty = type_match.group()
-    line = line[4 + len(ty) :]
-    shift += 4 + len(ty)
-    while line[0] == " ":
-        line = line[1:]
-        shift += 1
-    field = line.split(" ")[0]
-    line = line[len(field) :]
-    shift += len(field)
-    default_match = re.search("[^ ]+", line.split('"')[0])
-    assert default_match is not None
-    default = default_match.group()
-    line = line[len(default) + default_match.start() + 1 :]
-    shift += len(default)
-    example = ""
-    if default != "-":
-        example = line.split("]")[0] + "]"
-        line = line[len(example) :]
-        shift += len(example)
-    if example == "[0, 1]":
-        example = ""  # these are almost always wrong
-    comment = '"'.join(line.split('"')[1:-1])
-    return Field(field, ty, default, example, comment)
-
-
-docs_path = (
-    sys.argv[1]
-    if len(sys.argv) > 1
-    else (
-        os.path.expanduser(
-            "~/.local/share/Steam/steamapps/common/Noita/component_documentation.txt"
-        )
-        if PRIMARY_FILE
-        else "./small_comp_docs.txt"
-    )
-)
-docs = open(docs_path, "r").read()
-cur_type = ""
-current_fields = []
-components: list[Component] = []
-
-
-def flush_cur():
-    global cur_type
-    global current_fields
-    global components
-    if cur_type == "":
-        return
-    components.append(Component(cur_type, current_fields))
-    current_fields = []
-    cur_type = ""
-
-
-for l in docs.split("\n"):
-    if l == "":
-        flush_cur()
-        continue
-    if l[:4] == "    ":
-        current_fields.append(do_var_line(l))
-    elif l[0] != " ":
-        if cur_type != "":
-            flush_cur()
-        cur_type = l
-
-enums: list[Enum] = []
-enum_content = (
-    open("./src/enums", "r").read().split("\n")
-)  # this was generated from ghidra
-for i in range(len(enum_content) // 2):
-    name = enum_content[i * 2]
-    fields = enum_content[i * 2 + 1][3:-2].split("', u'")
-    enums.append(Enum(name, fields))
-enums.append(Enum("PathFindingComponentState", [""]))
-enums.append(Enum("TeleportComponentState", [""]))
-
-
-def render_enum(enum: Enum) -> str:
-    return f"""
-\t<xsd:simpleType name="{enum.name}">
-\t\t<xsd:restriction base="xsd:string">
-{"\n".join([f'\t\t\t<xsd:enumeration value="{variant}"/>' for variant in enum.variants])}
-\t\t</xsd:restriction>
-\t</xsd:simpleType>"""[
-        1:
-    ]
-
-
-transform = {
-    "rotation": "float rotation = 0; // [0, 360] Measured in degrees",
-    "position": "vec2 position; // EntityLoad doesn't respect this on entities, mostly used for relative offsets in InheritTransformComponent",
-    "scale": "vec2 scale = {.x = 1, .y = 1}; // A stretching factor, most components don't work with this",
-}
-
-out = f"""
-<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema">
-\t<xsd:simpleType name="NoitaBool">
-\t\t<xsd:restriction base="xsd:string">
-\t\t\t<xsd:enumeration value="0" />
-\t\t\t<xsd:enumeration value="1" />
-\t\t</xsd:restriction>
-\t</xsd:simpleType>
-\t<xsd:simpleType name="Hex8">
-\t\t<xsd:restriction base="xsd:string">
-\t\t\t<xsd:pattern value="[0-9A-Fa-f]{{8}}|0" />
-\t\t\t</xsd:restriction>
-\t</xsd:simpleType>
-\t<xsd:attributeGroup name="CommonComponentAttributes">
-\t\t<xsd:attribute name="_tags" type="xsd:string" default="" />
-\t\t<xsd:attribute name="_enabled" type="NoitaBool" default="1" />
-\t</xsd:attributeGroup>
-\t<xsd:complexType name="Transform" mixed="true">
-\t\t<xsd:annotation>
-\t\t\t<xsd:documentation><![CDATA[```cpp{NL}class types::xform {{{NL}{TAB}{transform["position"]}{NL}{TAB}{transform["scale"]}{NL}{TAB}{transform["rotation"]}{NL}}};```]]></xsd:documentation>
-\t\t</xsd:annotation>
-\t\t<xsd:attribute name="position.x" type="xsd:decimal" default="0" >
-\t\t\t<xsd:annotation>
-\t\t\t\t\t<xsd:documentation><![CDATA[```cpp{NL}{transform["position"]}{NL}```]]></xsd:documentation>
-\t\t\t</xsd:annotation>
-\t\t</xsd:attribute>
-\t\t<xsd:attribute name="position.y" type="xsd:decimal" default="0" >
-\t\t\t<xsd:annotation>
-\t\t\t\t\t<xsd:documentation><![CDATA[```cpp{NL}{transform["position"]}{NL}```]]></xsd:documentation>
-\t\t\t</xsd:annotation>
-\t\t</xsd:attribute>
-\t\t<xsd:attribute name="scale.x" type="xsd:decimal" default="1" >
-\t\t\t<xsd:annotation>
-\t\t\t\t\t<xsd:documentation><![CDATA[```cpp{NL}{transform["scale"]}{NL}```]]></xsd:documentation>
-\t\t\t</xsd:annotation>
-\t\t</xsd:attribute>
-\t\t<xsd:attribute name="scale.y" type="xsd:decimal" default="1" >
-\t\t\t<xsd:annotation>
-\t\t\t\t\t<xsd:documentation><![CDATA[```cpp{NL}{transform["scale"]}{NL}```]]></xsd:documentation>
-\t\t\t</xsd:annotation>
-\t\t</xsd:attribute>
-\t\t<xsd:attribute name="rotation" type="xsd:decimal" default="0" >
-\t\t\t<xsd:annotation>
-\t\t\t\t\t<xsd:documentation><![CDATA[```cpp{NL}{transform["rotation"]}{NL}```]]></xsd:documentation>
-\t\t\t</xsd:annotation>
-\t\t</xsd:attribute>
-\t</xsd:complexType>
-\t{"\n".join([render_enum(enum) for enum in enums])}
-\t<xsd:complexType name="Entity">
-\t\t<xsd:sequence minOccurs="0">
-\t\t\t<xsd:choice maxOccurs="unbounded" minOccurs="0">
-\t\t\t\t<xsd:element ref="Entity" />
-\t\t\t\t<xsd:element name="Base" type="Base" />
-\t\t\t\t<xsd:element name="_Transform" type="Transform" />
-\t\t\t\t{"\n\t\t\t\t".join([f"<xsd:element name=\"{comp.name}\" type=\"{comp.name}\" />" for comp in components])}
-\t\t\t</xsd:choice>
-\t\t</xsd:sequence>
-\t\t<xsd:attribute name="name" type="xsd:string" />
-\t\t<xsd:attribute name="tags" type="xsd:string" />
-\t\t<xsd:attribute name="serialize" type="NoitaBool" default="1" />
-\t</xsd:complexType>
-\t<xsd:complexType name="EntityBase">
-\t\t<xsd:sequence minOccurs="0">
-\t\t\t<xsd:choice maxOccurs="unbounded" minOccurs="0">
-\t\t\t\t<xsd:element ref="Entity" />
-\t\t\t\t<xsd:element name="Base" type="Base" />
-\t\t\t\t<xsd:element name="_Transform" type="Transform" />
-\t\t\t\t{"\n\t\t\t\t".join([f"<xsd:element name=\"{comp.name}\" type=\"{comp.name}Base\" />" for comp in components])}
-\t\t\t</xsd:choice>
-\t\t</xsd:sequence>
-\t\t<xsd:attribute name="name" type="xsd:string" />
-\t\t<xsd:attribute name="tags" type="xsd:string" />
-\t\t<xsd:attribute name="serialize" type="NoitaBool" default="1" />
-\t</xsd:complexType>
-\t<xsd:element name="Entity" type="Entity">
-\t\t<xsd:annotation>
-\t\t\t<xsd:documentation>Represents an entity that can be loaded into the world</xsd:documentation>
-\t\t</xsd:annotation>
-\t</xsd:element>
-\t<xsd:complexType name="Base">
-\t\t<xsd:annotation>
-\t\t\t<xsd:documentation>Base file</xsd:documentation>
-\t\t</xsd:annotation>
-\t\t<xsd:complexContent>
-\t\t\t<xsd:extension base="EntityBase">
-\t\t\t\t<xsd:attribute name="file" type="xsd:string" use="required"/>
-\t\t\t\t<xsd:attribute name="include_children" type="NoitaBool"/>
-\t\t\t</xsd:extension>
-\t\t</xsd:complexContent>
-\t</xsd:complexType>
-"""[
-    1:
-]
-configs_rendered = "\n".join([render_config(config) for config in configs])
-out += configs_rendered
-out += "\n"
-out += "\n".join([render_component(component) for component in components])
-# out = out.replace("\t","").replace("\n","")
-
-
-def replace_metatag(src: str, replacement: str, tag: str) -> str:
-    parts = src.split(tag)
-    # Replace content between markers
-    for i in range(
-        1, len(parts), 2
-    ):  # Only replace in "odd" indexed parts (between markers)
-        parts[i] = replacement
-    # Rejoin the parts
-    return tag.join(parts)
-
-
-def prune_builtin(src: str) -> str:
-    return "\n".join(
-        "\n".join([x for x in src.split("\n") if x != ""][1:-1]).split(
-            "<!--Builtin-->"
-        )[0::2]
-    )
-
-
-open("./out/entity.xsd", "w").write(out + "\n</xsd:schema>")
-
-
-@dataclass
-class RenderedJson:
-    docs: str
-    attributes: str
-
-
-def render_json(path_name: str, class_name: str) -> RenderedJson:
-    attributes_json = json.load(open(f"./src/{path_name}.json", "r"))
-    fields = []
-    attributes = "\n"
-    for attribute in attributes_json:
-        print(attribute)
-        ty = get_xml_type("", attribute["type"])[0][1]
-        this_field = Field(
-            attribute["name"],
-            attribute["type"],
-            attribute.get("default", "-"),
-            "",
-            attribute.get("doc", ""),
-        )
-        fields.append(this_field)
-        doc = f"""<![CDATA[{"```cpp" + NL + render_field_cpp(this_field).replace("\t", "") + NL + "```"}]]>"""
-        attributes += f"""\t\t<xsd:attribute name="{attribute["name"]}" type="{ty}" {f'default="{attribute["default"]}"' if not attribute.get("required", False) else 'use="required"'}>
-\t\t\t<xsd:annotation>
-\t\t\t\t<xsd:documentation>{doc}</xsd:documentation>
-\t\t\t</xsd:annotation>
-\t\t</xsd:attribute>
-"""
-
-    docs = (
-        "<xsd:annotation><xsd:documentation><![CDATA["
-        + NL
-        + render_component_cpp(Component(class_name, fields))
-        .replace("\n", NL)
-        .replace("\t", TAB)
-        + NL
-        + "]]></xsd:documentation></xsd:annotation>"
-    )
-
-    return RenderedJson(docs, attributes)
-
-
-def apply_replacements(path_name: str, replacements: Dict[str, str]):
-    xsd = open(f"./src/{path_name}.xsd", "r").read()
-    for name, replacement in replacements.items():
-        xsd = replace_metatag(xsd, replacement, f"<!-- {name} -->")
-
-    global out
-    open(f"./out/{path_name}.xsd", "w").write(xsd)
-
-    out += prune_builtin(xsd)
-
-
-# Update materials.xsd
-material_attributes_json = render_json("materials", "CellData")
-reaction_attributes_json = render_json("reaction", "Reaction")
-
-config_explosion = next(
-    render_config(config) for config in configs if config.name == "ConfigExplosion"
-)
-config_damage_critical = next(
-    render_config(config) for config in configs if config.name == "ConfigDamageCritical"
-)
-configs_and_enums = f"""
-{config_damage_critical}
-{config_explosion}
-{"\n".join(render_enum(enum) for enum in enums)}
-"""
-
-apply_replacements(
-    "materials",
-    {
-        "Material Attributes": material_attributes_json.attributes,
-        "Material Docs": material_attributes_json.docs,
-        "Reaction Attributes": reaction_attributes_json.attributes,
-        "Reaction Docs": reaction_attributes_json.docs,
-        "Configs and Enums": configs_and_enums,
-    },
-)
-
-
-@deprecated("Use render_json and apply_replacements instead")
-def handwritten(name: str):
-    global out
-    with open(f"./src/{name}.xsd", "r") as src_file:
-        content = src_file.read()
-        out += prune_builtin(src_file.read())
-        open(f"./out/{name}.xsd", "w").write(content)
-
-
-handwritten("sprite")
-handwritten("biomes_all")
-
-mod_replacements = render_json("mod", "Mod")
-apply_replacements(
-    "mod",
-    {"Mod Attributes": mod_replacements.attributes, "Mod Docs": mod_replacements.docs},
-)
-
-magic_replacements = render_json("magic_numbers", "MagicNumbers")
-apply_replacements(
-    "magic_numbers",
-    {"MagicNumbers Attributes": magic_replacements.attributes, "MagicNumbers Docs": magic_replacements.docs},
-)
-
-open("./out/merged.xsd", "w").write(out + "\n</xsd:schema>")
+if __name__ == "__main__":
+    main()
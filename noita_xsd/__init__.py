@@ -0,0 +1,56 @@
+# submodules are only imported once one of their names is used, so importing the type
+# model doesn't pull in the renderer or touch any files
+import importlib
+
+_EXPORTS = {
+    "TAB": "model",
+    "NL": "model",
+    "Field": "model",
+    "Component": "model",
+    "Enum": "model",
+    "get_xml_type": "model",
+    "TypeRegistry": "model",
+    "type_registry": "model",
+    "format_decimal": "model",
+    "DEFAULT_DOCS_PATH": "parse",
+    "do_var_line": "parse",
+    "iter_components": "parse",
+    "load_components": "parse",
+    "load_configs": "parse",
+    "load_enums": "parse",
+    "load_model": "snapshot",
+    "render_component": "render",
+    "render_config": "render",
+    "render_enum": "render",
+    "render_json": "render",
+    "render_entity_schema": "render",
+    "render_materials_schema": "render",
+    "render_mod_schema": "render",
+    "render_magic_numbers_schema": "render",
+    "render_merged_schema": "render",
+    "build": "build",
+    "compile_tables": "native",
+    "NativeValidator": "native",
+    "build_index": "index",
+    "IndexLookup": "lookup",
+    "check_materials": "materials",
+    "MagicNumbersChecker": "magic",
+    "BaseResolver": "bases",
+    "DeltaBuild": "delta",
+    "StreamValidator": "stream",
+    "Minifier": "minify",
+    "CorpusGenerator": "corpus",
+    "build_schemas": "ir",
+    "emit": "backends",
+    "ResultCache": "cache",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
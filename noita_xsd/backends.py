@@ -0,0 +1,429 @@
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import ExitStack
+from xml.sax.saxutils import escape, quoteattr
+
+from .ir import Attribute, ComplexType, Root, Schema, SimpleType, build_schemas
+from .native import DECIMAL_PATTERN, INT_PATTERN, UNSIGNED_PATTERN
+from .output import Output, StreamedOutput
+from .parse import DEFAULT_DOCS_PATH
+from .snapshot import load_model
+
+# output formats written from the schema IR (ir.py). emit() walks a schema once and
+# hands every type to all backends as it goes, each writes its part to its own output
+# straight away. The xsd is equivalent to out/*.xsd, which render.py writes from the same
+# IR with the lemminx specific doc markup. RELAX NG uses the xsd datatypes and the DTD
+# compatibility annotations for defaults and docs. JSON Schema describes documents
+# converted to json as {"attributes": {name: value}, "children": [{tag: element}]},
+# every attribute value is a string like in the xml
+
+
+class Backend:
+    extension = ""
+
+    def __init__(self, out: Output):
+        self.out = out
+
+    def start(self, schema: Schema):
+        pass
+
+    def simple_type(self, ty: SimpleType):
+        pass
+
+    def complex_type(self, ty: ComplexType):
+        pass
+
+    def root(self, root: Root):
+        pass
+
+    def end(self):
+        pass
+
+
+def emit(schema: Schema, backends: list[Backend]):
+    for backend in backends:
+        backend.start(schema)
+    for simple in schema.simple_types:
+        for backend in backends:
+            backend.simple_type(simple)
+    for complex in schema.types:
+        for backend in backends:
+            backend.complex_type(complex)
+    for root in schema.roots:
+        for backend in backends:
+            backend.root(root)
+    for backend in backends:
+        backend.end()
+
+
+class XsdBackend(Backend):
+    extension = ".xsd"
+
+    def start(self, schema: Schema):
+        self.out.write('<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema">\n')
+
+    def documentation(self, doc: str, indent: str) -> str:
+        if doc == "":
+            return ""
+        return (
+            f"{indent}<xsd:annotation><xsd:documentation>{escape(doc)}"
+            "</xsd:documentation></xsd:annotation>\n"
+        )
+
+    def simple_type(self, ty: SimpleType):
+        facets = (
+            [f'\t\t\t<xsd:pattern value="{ty.pattern}"/>\n']
+            if ty.pattern is not None
+            else [
+                f"\t\t\t<xsd:enumeration value={quoteattr(variant)}/>\n"
+                for variant in ty.variants or []
+            ]
+        )
+        self.out.write(
+            f'\t<xsd:simpleType name="{ty.name}">\n'
+            '\t\t<xsd:restriction base="xsd:string">\n'
+            f"{''.join(facets)}"
+            "\t\t</xsd:restriction>\n"
+            "\t</xsd:simpleType>\n"
+        )
+
+    def attribute(self, attribute: Attribute, indent: str) -> str:
+        use = ""
+        if attribute.required:
+            use = ' use="required"'
+        elif attribute.default is not None:
+            use = f" default={quoteattr(attribute.default)}"
+        start = f'{indent}<xsd:attribute name="{attribute.name}" type="{attribute.ty}"{use}'
+        if attribute.doc == "":
+            return start + "/>\n"
+        doc = self.documentation(attribute.doc, indent + "\t")
+        return f"{start}>\n{doc}{indent}</xsd:attribute>\n"
+
+    def complex_type(self, ty: ComplexType):
+        indent = "\t\t\t\t" if ty.extends is not None else "\t\t"
+        # an extension takes mixed from its base, libxml2 refuses to extend an xsd:all
+        # type when it's spelled out again
+        mixed = ' mixed="true"' if ty.mixed and ty.extends is None else ""
+        out = [
+            f'\t<xsd:complexType name="{ty.name}"{mixed}>\n',
+            self.documentation(ty.doc, "\t\t"),
+        ]
+        if ty.extends is not None:
+            out.append(
+                "\t\t<xsd:complexContent>\n"
+                f'\t\t\t<xsd:extension base="{ty.extends}">\n'
+            )
+        if len(ty.children) != 0:
+            group = (
+                "<xsd:all>"
+                if ty.content == "all"
+                else '<xsd:choice minOccurs="0" maxOccurs="unbounded">'
+            )
+            out.append(f"{indent}{group}\n")
+            out += [
+                f'{indent}\t<xsd:element name="{child.name}" type="{child.ty}"'
+                ' minOccurs="0"/>\n'
+                for child in ty.children
+            ]
+            out.append(f"{indent}</xsd:{ty.content}>\n")
+        out += [self.attribute(attribute, indent) for attribute in ty.attributes]
+        if ty.extends is not None:
+            out.append("\t\t\t</xsd:extension>\n\t\t</xsd:complexContent>\n")
+        out.append("\t</xsd:complexType>\n")
+        self.out.write("".join(out))
+
+    def root(self, root: Root):
+        doc = self.documentation(root.doc, "\t\t")
+        if doc == "":
+            self.out.write(f'\t<xsd:element name="{root.name}" type="{root.ty}"/>\n')
+            return
+        self.out.write(
+            f'\t<xsd:element name="{root.name}" type="{root.ty}">\n{doc}\t</xsd:element>\n'
+        )
+
+    def end(self):
+        self.out.write("</xsd:schema>\n")
+
+
+RELAX_NG_DATATYPES = {
+    "xsd:decimal": "decimal",
+    "xsd:int": "int",
+    "xsd:unsignedInt": "unsignedInt",
+    "xsd:string": "string",
+}
+
+
+class RelaxNgBackend(Backend):
+    extension = ".rng"
+
+    def start(self, schema: Schema):
+        self.out.write(
+            '<grammar xmlns="http://relaxng.org/ns/structure/1.0"'
+            ' xmlns:a="http://relaxng.org/ns/compatibility/annotations/1.0"'
+            ' datatypeLibrary="http://www.w3.org/2001/XMLSchema-datatypes">\n'
+        )
+        self.roots: list[Root] = []
+
+    def documentation(self, doc: str, indent: str) -> str:
+        if doc == "":
+            return ""
+        return f"{indent}<a:documentation>{escape(doc)}</a:documentation>\n"
+
+    def simple_type(self, ty: SimpleType):
+        # simple and complex types share one namespace of defines here
+        if ty.pattern is not None:
+            value = (
+                '\t\t<data type="string">\n'
+                f"\t\t\t<param name=\"pattern\">{escape(ty.pattern)}</param>\n"
+                "\t\t</data>\n"
+            )
+        else:
+            value = (
+                "\t\t<choice>\n"
+                + "".join(
+                    f'\t\t\t<value type="string">{escape(variant)}</value>\n'
+                    for variant in ty.variants or []
+                )
+                + "\t\t</choice>\n"
+            )
+        self.out.write(f'\t<define name="simple.{ty.name}">\n{value}\t</define>\n')
+
+    def attribute(self, attribute: Attribute) -> str:
+        datatype = RELAX_NG_DATATYPES.get(attribute.ty)
+        value = (
+            f'<data type="{datatype}"/>'
+            if datatype is not None
+            else f'<ref name="simple.{attribute.ty}"/>'
+        )
+        default = ""
+        if attribute.default is not None:
+            default = f" a:defaultValue={quoteattr(attribute.default)}"
+        doc = escape(attribute.doc)
+        doc = f"<a:documentation>{doc}</a:documentation>" if doc != "" else ""
+        pattern = f'<attribute name="{attribute.name}"{default}>{doc}{value}</attribute>'
+        if attribute.required:
+            return pattern
+        return f"<optional>{pattern}</optional>"
+
+    def complex_type(self, ty: ComplexType):
+        # everything goes into one interleave, libxml2 takes exponential time matching a
+        # long group of optional attributes but handles an interleave of them fine
+        items = [f'<ref name="{ty.extends}"/>'] if ty.extends is not None else []
+        items += [self.attribute(attribute) for attribute in ty.attributes]
+        if ty.mixed and ty.extends is None:
+            items.append("<text/>")
+        children = [
+            f'<element name="{child.name}"><ref name="{child.ty}"/></element>'
+            for child in ty.children
+        ]
+        if ty.content == "all":
+            items += [f"<optional>{child}</optional>" for child in children]
+        elif len(children) != 0:
+            items.append(
+                f"<zeroOrMore><choice>{''.join(children)}</choice></zeroOrMore>"
+            )
+        body = "\t\t<empty/>\n"
+        if len(items) != 0:
+            body = "".join(f"\t\t\t{item}\n" for item in items)
+            body = f"\t\t<interleave>\n{body}\t\t</interleave>\n"
+        doc = self.documentation(ty.doc, "\t\t")
+        self.out.write(f'\t<define name="{ty.name}">\n{doc}{body}\t</define>\n')
+
+    def root(self, root: Root):
+        self.roots.append(root)
+
+    def end(self):
+        elements = "".join(
+            f'\t\t\t<element name="{root.name}"><ref name="{root.ty}"/></element>\n'
+            for root in self.roots
+        )
+        self.out.write(f"\t<start>\n\t\t<choice>\n{elements}\t\t</choice>\n\t</start>\n")
+        self.out.write("</grammar>\n")
+
+
+JSON_PATTERNS = {
+    "xsd:decimal": DECIMAL_PATTERN.pattern,
+    "xsd:int": INT_PATTERN.pattern,
+    "xsd:unsignedInt": UNSIGNED_PATTERN.pattern,
+}
+
+
+class JsonSchemaBackend(Backend):
+    extension = ".schema.json"
+
+    def start(self, schema: Schema):
+        self.out.write(
+            "{\n"
+            '\t"$schema": "https://json-schema.org/draft/2020-12/schema",\n'
+            f'\t"title": {json.dumps(schema.name)},\n'
+            '\t"$defs": {'
+        )
+        # extensions are spelled out, additionalProperties can't see through allOf
+        self.types = {ty.name: ty for ty in schema.types}
+        self.roots: list[Root] = []
+        self.first = True
+
+    def define(self, name: str, value: dict):
+        separator = "\n" if self.first else ",\n"
+        self.first = False
+        self.out.write(f"{separator}\t\t{json.dumps(name)}: {json.dumps(value)}")
+
+    def simple_type(self, ty: SimpleType):
+        value: dict = {"type": "string"}
+        if ty.pattern is not None:
+            value["pattern"] = f"^(?:{ty.pattern})$"
+        else:
+            value["enum"] = ty.variants
+        self.define(f"simple.{ty.name}", value)
+
+    def attribute(self, attribute: Attribute) -> dict:
+        value: dict
+        if attribute.ty in JSON_PATTERNS:
+            pattern = JSON_PATTERNS[attribute.ty]
+            value = {"type": "string", "pattern": f"^\\s*(?:{pattern})\\s*$"}
+        elif attribute.ty == "xsd:string":
+            value = {"type": "string"}
+        else:
+            value = {"$ref": f"#/$defs/simple.{attribute.ty}"}
+        if attribute.default is not None:
+            value["default"] = attribute.default
+        if attribute.doc != "":
+            value["description"] = attribute.doc
+        return value
+
+    def complex_type(self, ty: ComplexType):
+        chain = [ty]
+        while chain[-1].extends is not None:
+            chain.append(self.types[chain[-1].extends])
+        attributes = [a for link in reversed(chain) for a in link.attributes]
+        children = [c for link in reversed(chain) for c in link.children]
+        child_list: dict = {
+            "type": "array",
+            "items": {
+                "oneOf": [
+                    {
+                        "type": "object",
+                        "properties": {child.name: {"$ref": f"#/$defs/{child.ty}"}},
+                        "required": [child.name],
+                        "additionalProperties": False,
+                    }
+                    for child in children
+                ]
+            },
+        }
+        if ty.content == "all":
+            # at most once each isn't expressible, this is the closest
+            child_list["maxItems"] = len(children)
+        element: dict = {
+            "type": "object",
+            "properties": {
+                "attributes": {
+                    "type": "object",
+                    "properties": {a.name: self.attribute(a) for a in attributes},
+                    "required": [a.name for a in attributes if a.required],
+                    "additionalProperties": False,
+                },
+                "children": child_list,
+            },
+            "additionalProperties": False,
+        }
+        if ty.doc != "" or len(chain) > 1:
+            element["description"] = ty.doc or chain[-1].doc
+        self.define(ty.name, element)
+
+    def root(self, root: Root):
+        self.roots.append(root)
+
+    def end(self):
+        roots = [
+            {
+                "type": "object",
+                "properties": {root.name: {"$ref": f"#/$defs/{root.ty}"}},
+                "required": [root.name],
+                "additionalProperties": False,
+                **({"description": root.doc} if root.doc != "" else {}),
+            }
+            for root in self.roots
+        ]
+        self.out.write(f'\n\t}},\n\t"oneOf": {json.dumps(roots)}\n}}\n')
+
+
+BACKENDS: dict[str, type[Backend]] = {
+    "xsd": XsdBackend,
+    "rng": RelaxNgBackend,
+    "json": JsonSchemaBackend,
+}
+
+
+def write_schemas(
+    schemas: list[Schema], out_dir: str, formats: list[str]
+) -> list[str]:
+    """Every schema in every format, returning the files that changed"""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for schema in schemas:
+        with ExitStack() as stack:
+            outputs = [
+                stack.enter_context(
+                    StreamedOutput(
+                        os.path.join(
+                            out_dir, f"{schema.name}{BACKENDS[name].extension}"
+                        )
+                    )
+                )
+                for name in formats
+            ]
+            emit(
+                schema,
+                [BACKENDS[name](output) for name, output in zip(formats, outputs)],
+            )
+        written += [output.path for output in outputs if output.changed]
+    return written
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Write the entity, mod and magic_numbers schemas as xsd, RELAX NG "
+        "and JSON Schema from one model"
+    )
+    arg_parser.add_argument(
+        "--out-dir", default="./out/formats", help="directory to write the schemas to"
+    )
+    arg_parser.add_argument(
+        "--formats",
+        default="xsd,rng,json",
+        help=f"comma separated formats out of {', '.join(BACKENDS)}",
+    )
+    arg_parser.add_argument(
+        "--docs",
+        default=DEFAULT_DOCS_PATH,
+        help="component_documentation.txt the components come from",
+    )
+    args = arg_parser.parse_args(argv)
+    formats = [name.strip() for name in args.formats.split(",") if name.strip() != ""]
+    unknown = [name for name in formats if name not in BACKENDS]
+    if len(unknown) != 0:
+        arg_parser.error(f"unknown formats: {', '.join(unknown)}")
+
+    start = time.perf_counter()
+    model = load_model(args.docs)
+    schemas = build_schemas(
+        model.components, model.configs, model.enums, model.config_types
+    )
+    built = time.perf_counter()
+    written = write_schemas(schemas, args.out_dir, formats)
+    for path in written:
+        print(f"Wrote {path}")
+    end = time.perf_counter()
+    print(
+        f"model and ir in {(built - start) * 1000:.0f}ms, "
+        f"{len(schemas) * len(formats)} schemas in {(end - built) * 1000:.0f}ms",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
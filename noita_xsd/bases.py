@@ -0,0 +1,328 @@
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+
+from lxml import etree
+
+from .records import record
+from .validate import find_xml_files
+
+# flattens <Base file="..."> the way the game does: the base entity (itself flattened) takes the
+# place of the <Base> element, components inside <Base> override the first base component of
+# the same type that wasn't overridden yet or drop it with _remove_from_base="1", the base's
+# tags are added to the entity's and its child entities only come along with include_children.
+# Popular bases are used by thousands of entities, so every flattened file is kept in an LRU
+# cache and only copied from there. An entry remembers the mtime of every file that went into
+# it and of every directory a base was looked for in, and is only used while none changed
+
+_parser = etree.XMLParser(resolve_entities=False, no_network=True, remove_comments=True)
+
+
+class BaseError(Exception):
+    def __init__(self, ty: str, message: str, line: int = 0):
+        super().__init__(message)
+        self.ty = ty
+        self.line = line
+
+
+# (path, mtime_ns) of a file or directory something was made from, -1 when it didn't exist
+Dependency = tuple[str, int]
+
+
+def mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return -1
+
+
+def unchanged(dependencies: list[Dependency]) -> bool:
+    return all(mtime(path) == mtime_ns for path, mtime_ns in dependencies)
+
+
+def merge_into(target: etree._Element, override: etree._Element):
+    """Applies the attributes of override to target, and its children to the children of
+    target with the same tag in order"""
+    for name, value in override.attrib.items():
+        if name != "_remove_from_base":
+            target.set(name, value)
+    used: set[int] = set()
+    for child in override:
+        match = next(
+            (
+                i
+                for i, candidate in enumerate(target)
+                if candidate.tag == child.tag and i not in used
+            ),
+            None,
+        )
+        if match is None:
+            target.append(copy.deepcopy(child))
+        else:
+            used.add(match)
+            merge_into(target[match], child)
+
+
+def merge_tags(*tags: str | None) -> str:
+    names = dict.fromkeys(
+        tag.strip() for value in tags if value for tag in value.split(",")
+    )
+    return ",".join(name for name in names if name != "")
+
+
+class BaseResolver:
+    """Resolves <Base file> paths against roots, the directories the game's paths are relative
+    to (the one holding data/, and the one holding mods/ for mod files)"""
+
+    def __init__(self, roots: Iterable[str] = (".",), cache_size: int = 1024):
+        self.roots = list(roots)
+        self.cache_size = cache_size
+        # path -> (what it was made from, flattened root element, errors found while
+        # flattening it)
+        self.cache: OrderedDict[
+            str, tuple[list[Dependency], etree._Element, list[dict]]
+        ] = OrderedDict()
+        # base file -> (where it was found, the directories that were searched)
+        self.found: dict[str, tuple[str | None, list[Dependency]]] = {}
+        self.resolving: list[str] = []
+        # the dependencies of every file being flattened, innermost last
+        self.dependencies: list[list[Dependency]] = []
+        self.hits = 0
+        self.misses = 0
+
+    def find(self, file: str) -> str | None:
+        return self.locate(file)[0]
+
+    def locate(self, file: str) -> tuple[str | None, list[Dependency]]:
+        """Where a base file is, and the directories looked in to find it. A file added to
+        or removed from any of them changes their mtime and the file is looked for again"""
+        found = self.found.get(file)
+        if found is not None and unchanged(found[1]):
+            return found
+        path = None
+        searched = []
+        for root in self.roots:
+            candidate = os.path.join(root, file)
+            directory = os.path.dirname(candidate) or "."
+            searched.append((directory, mtime(directory)))
+            if os.path.isfile(candidate):
+                path = candidate
+                break
+        self.found[file] = (path, searched)
+        return path, searched
+
+    def flattened(self, path: str) -> tuple[etree._Element, list[dict]]:
+        """The flattened root element of path and the problems met on the way. Both are
+        shared with the cache and must not be modified"""
+        _, root, errors = self.flattened_entry(path)
+        return root, errors
+
+    def flattened_entry(
+        self, path: str
+    ) -> tuple[list[Dependency], etree._Element, list[dict]]:
+        path = os.path.normpath(path)
+        cached = self.cache.get(path)
+        if cached is not None and unchanged(cached[0]):
+            self.hits += 1
+            self.cache.move_to_end(path)
+            return cached
+        self.misses += 1
+        if path in self.resolving:
+            cycle = [*self.resolving[self.resolving.index(path) :], path]
+            raise BaseError("BASE_CYCLE", " -> ".join(cycle))
+        # taken before parsing, a file saved in between is flattened again next time
+        dependencies = [(path, os.stat(path).st_mtime_ns)]
+        self.resolving.append(path)
+        self.dependencies.append(dependencies)
+        try:
+            root = etree.parse(path, _parser).getroot()
+            errors: list[dict] = []
+            self.flatten(path, root, errors)
+        finally:
+            self.resolving.pop()
+            self.dependencies.pop()
+        entry = (dependencies, root, errors)
+        self.cache[path] = entry
+        self.cache.move_to_end(path)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return entry
+
+    def flatten(self, path: str, entity: etree._Element, errors: list[dict]):
+        """Replaces every <Base> in entity and its child entities with what it stands for"""
+        for child in list(entity):
+            if child.tag == "Entity":
+                self.flatten(path, child, errors)
+            elif child.tag == "Base":
+                self.apply_base(path, entity, child, errors)
+
+    def apply_base(
+        self,
+        path: str,
+        entity: etree._Element,
+        base: etree._Element,
+        errors: list[dict],
+    ):
+        position = entity.index(base)
+        entity.remove(base)
+        file = base.get("file", "")
+        base_path, searched = self.locate(file)
+        dependencies = self.dependencies[-1]
+        dependencies += searched
+        if base_path is None:
+            errors.append(
+                record(
+                    path,
+                    "entity",
+                    base.sourceline,
+                    "error",
+                    "BASE_NOT_FOUND",
+                    f"no base file {file}",
+                )
+            )
+            return
+        try:
+            base_dependencies, base_root, base_errors = self.flattened_entry(base_path)
+        except (BaseError, etree.XMLSyntaxError, OSError) as e:
+            # fixing the base fixes this file too
+            dependencies.append((os.path.normpath(base_path), mtime(base_path)))
+            errors.append(
+                record(
+                    path,
+                    "entity",
+                    base.sourceline,
+                    "error",
+                    getattr(e, "ty", type(e).__name__),
+                    f"base file {file}: {e}",
+                )
+            )
+            return
+        errors.extend(base_errors)
+        dependencies += base_dependencies
+
+        include_children = base.get("include_children", "0") == "1"
+        has_transform = entity.find("_Transform") is not None
+        overrides = [child for child in base if child.tag != "Entity"]
+        used: set[int] = set()
+        inserted = []
+        for child in base_root:
+            if child.tag == "Entity" and not include_children:
+                continue
+            if child.tag == "_Transform" and has_transform:
+                continue
+            override = next(
+                (
+                    j
+                    for j, candidate in enumerate(overrides)
+                    if candidate.tag == child.tag and j not in used
+                ),
+                None,
+            )
+            if override is not None:
+                used.add(override)
+                if overrides[override].get("_remove_from_base", "0") == "1":
+                    continue
+            copied = copy.deepcopy(child)
+            if override is not None:
+                merge_into(copied, overrides[override])
+            inserted.append(copied)
+        # components only in <Base> are added like any other
+        for j, override in enumerate(overrides):
+            if j not in used and override.get("_remove_from_base", "0") != "1":
+                copied = copy.deepcopy(override)
+                copied.attrib.pop("_remove_from_base", None)
+                inserted.append(copied)
+        for child in base:
+            if child.tag == "Entity":
+                copied = copy.deepcopy(child)
+                self.flatten(path, copied, errors)
+                inserted.append(copied)
+        for offset, child in enumerate(inserted):
+            entity.insert(position + offset, child)
+
+        tags = merge_tags(entity.get("tags"), base.get("tags"), base_root.get("tags"))
+        if tags != "":
+            entity.set("tags", tags)
+
+    def resolve(self, path: str) -> tuple[etree._Element | None, list[dict]]:
+        """The flattened entity in path (shared with the cache, copy it before changing it)
+        and the problems found, None if the file couldn't be read"""
+        try:
+            return self.flattened(path)
+        except (BaseError, etree.XMLSyntaxError, OSError) as e:
+            line = getattr(e, "line", 0) or getattr(e, "position", (0, 0))[0]
+            return None, [
+                record(
+                    path,
+                    "entity",
+                    line,
+                    "fatal",
+                    getattr(e, "ty", type(e).__name__),
+                    str(e),
+                )
+            ]
+
+    def resolve_all(
+        self, paths: Iterable[str]
+    ) -> Iterator[tuple[str, etree._Element | None, list[dict]]]:
+        """resolve() for every entity file in paths (directories are searched), other xml
+        files are skipped. Bases shared between the files are only flattened once"""
+        for path in find_xml_files(paths):
+            try:
+                root_tag = next(etree.iterparse(path, ("start",)))[1].tag
+            except (etree.XMLSyntaxError, OSError, StopIteration):
+                root_tag = None
+            if root_tag not in ("Entity", None):
+                continue
+            yield path, *self.resolve(path)
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Flatten the <Base> elements of entity files, printing one json error per line"
+    )
+    arg_parser.add_argument(
+        "paths", nargs="+", help="entity files, or directories to search for them"
+    )
+    arg_parser.add_argument(
+        "--root",
+        action="append",
+        help="directory base file paths are relative to, can be repeated (defaults to .)",
+    )
+    arg_parser.add_argument(
+        "--print",
+        action="store_true",
+        help="print the flattened entities instead of the errors",
+    )
+    arg_parser.add_argument("--cache-size", type=int, default=1024)
+    args = arg_parser.parse_args(argv)
+
+    resolver = BaseResolver(args.root or ["."], args.cache_size)
+    start = time.perf_counter()
+    files = failed = 0
+    for path, root, errors in resolver.resolve_all(args.paths):
+        files += 1
+        failed += len(errors) != 0
+        if args.print and root is not None:
+            sys.stdout.write(f"<!-- {path} -->\n")
+            sys.stdout.write(etree.tostring(root, encoding="unicode") + "\n")
+            continue
+        for error in errors:
+            sys.stdout.write(json.dumps(error) + "\n")
+    elapsed = time.perf_counter() - start
+    print(
+        f"{files} entities, {failed} with problems in {elapsed:.2f}s, "
+        f"{resolver.misses} files parsed, {resolver.hits} cache hits",
+        file=sys.stderr,
+    )
+    if failed != 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+
+from lxml import etree
+
+from .build import OUTPUTS, render_outputs
+from .output import CountingOutput, StreamedOutput
+from .parse import (
+    DEFAULT_DOCS_PATH,
+    iter_components,
+    load_components,
+    load_configs,
+    load_enums,
+)
+from .snapshot import load_model
+from .validate import pick_schema
+
+# test files validation throughput is measured on, against the schema validate.py would pick
+VALIDATION_FILES = [
+    "./test/materials.xml",
+    "./test/biomes_all.xml",
+    "./test/magic_numbers.xml",
+    "./test/entity.xml",
+]
+
+
+def best_time(function, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# lxml allocates outside of python so tracemalloc can't see it, instead a fresh process
+# compiles the schema and reports how much its peak rss grew. VmHWM is used over ru_maxrss
+# since the latter keeps the peak of the parent across exec
+SCHEMA_MEMORY_SCRIPT = """
+import sys
+from lxml import etree
+def peak():
+    for line in open("/proc/self/status"):
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) * 1024
+before = peak()
+schema = etree.XMLSchema(etree.parse(sys.argv[1]))
+print(peak() - before)
+"""
+
+
+def schema_memory(path: str) -> int | None:
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", SCHEMA_MEMORY_SCRIPT, path],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return int(result.stdout)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def enlarge_docs(docs_path: str, scale: int, out_path: str):
+    """Writes docs_path scale times over to out_path, every copy with renamed components"""
+    docs = open(docs_path, "r").read()
+    if not docs.endswith("\n"):
+        docs += "\n"
+    with open(out_path, "w") as out:
+        for i in range(scale):
+            for line in docs.splitlines(keepends=True):
+                if i != 0 and line[:1] not in ("", " ", "\n"):
+                    line = f"{line[:-1]}{i}\n"
+                out.write(line)
+
+
+def time_parse(path: str, repeat: int) -> tuple[float, int, int]:
+    """Best of repeat runs in seconds, plus the component and field counts"""
+    best = float("inf")
+    components = fields = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        components = fields = 0
+        for comp in iter_components(path):
+            components += 1
+            fields += len(comp.fields)
+        best = min(best, time.perf_counter() - start)
+    return best, components, fields
+
+
+def bench_parse(docs_path: str, scales: list[int], repeat: int = 5) -> list[dict]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            path = os.path.join(tmp, f"component_documentation_x{scale}.txt")
+            enlarge_docs(docs_path, scale, path)
+            seconds, components, fields = time_parse(path, repeat)
+            size = os.path.getsize(path)
+            results.append(
+                {
+                    "scale": scale,
+                    "bytes": size,
+                    "components": components,
+                    "fields": fields,
+                    "seconds": seconds,
+                    "mb_per_second": size / seconds / 1e6,
+                }
+            )
+    return results
+
+
+def write_outputs(out_dir: str, components, configs, enums, config_types):
+    with ExitStack() as stack:
+        outputs = {
+            name: stack.enter_context(
+                StreamedOutput(os.path.join(out_dir, f"{name}.xsd"))
+            )
+            for name in OUTPUTS
+        }
+        render_outputs(outputs, components, configs, enums, config_types)
+
+
+def bench_generate(docs_path: str, out_dir: str, repeat: int) -> tuple[dict, dict]:
+    """Seconds per generation stage and the bytes of every output, the schemas are
+    written to out_dir"""
+    components = load_components(docs_path)
+    configs, config_types = load_configs()
+    enums = load_enums()
+    counters = {name: CountingOutput() for name in OUTPUTS}
+    render_outputs(counters, components, configs, enums, config_types)
+
+    def render():
+        render_outputs(
+            {name: CountingOutput() for name in OUTPUTS},
+            components,
+            configs,
+            enums,
+            config_types,
+        )
+
+    def write():
+        # removing the old files makes every run pay for the rename
+        for name in OUTPUTS:
+            path = os.path.join(out_dir, f"{name}.xsd")
+            if os.path.exists(path):
+                os.remove(path)
+        write_outputs(out_dir, components, configs, enums, config_types)
+
+    # the first call writes the snapshot the timed ones load
+    load_model(docs_path)
+    stages = {
+        "docs_parse": best_time(lambda: load_components(docs_path), repeat),
+        "configs": best_time(load_configs, repeat),
+        "enums": best_time(load_enums, repeat),
+        "model_snapshot": best_time(lambda: load_model(docs_path), repeat),
+        "render": best_time(render, repeat),
+        "render_and_write": best_time(write, repeat),
+    }
+    stages["total"] = (
+        stages["docs_parse"]
+        + stages["configs"]
+        + stages["enums"]
+        + stages["render_and_write"]
+    )
+    return stages, {name: counter.size for name, counter in counters.items()}
+
+
+def bench_schemas(schema_dir: str, repeat: int) -> dict:
+    """lxml compile time and how much memory compiling each schema takes"""
+    results = {}
+    for name in OUTPUTS:
+        path = os.path.join(schema_dir, f"{name}.xsd")
+        results[name] = {
+            "compile_seconds": best_time(
+                lambda: etree.XMLSchema(etree.parse(path)), repeat
+            ),
+            "peak_rss_bytes": schema_memory(path),
+        }
+    return results
+
+
+def bench_validation(schema_dir: str, min_seconds: float) -> dict:
+    results = {}
+    for path in VALIDATION_FILES:
+        name = pick_schema(path, etree.parse(path).getroot().tag)
+        assert name is not None
+        schema = etree.XMLSchema(etree.parse(os.path.join(schema_dir, f"{name}.xsd")))
+        data = open(path, "rb").read()
+        files = 0
+        start = time.perf_counter()
+        while True:
+            schema.validate(etree.fromstring(data))
+            files += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_seconds:
+                break
+        results[os.path.basename(path)] = {
+            "schema": name,
+            "bytes": len(data),
+            "files_per_second": files / elapsed,
+            "mb_per_second": len(data) * files / elapsed / 1e6,
+        }
+    return results
+
+
+def run_suite(docs_path: str, repeat: int = 5, min_seconds: float = 0.5) -> dict:
+    with tempfile.TemporaryDirectory() as out_dir:
+        generate, sizes = bench_generate(docs_path, out_dir, repeat)
+        schemas = bench_schemas(out_dir, repeat)
+        validation = bench_validation(out_dir, min_seconds)
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "lxml": ".".join(map(str, etree.LXML_VERSION)),
+        "docs_path": docs_path,
+        "generate_seconds": generate,
+        "output_bytes": sizes,
+        "schemas": schemas,
+        "validation": validation,
+    }
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat |= flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def print_results(results: dict, previous: dict | None = None):
+    before = flatten(previous) if previous is not None else {}
+    for key, value in flatten(results).items():
+        line = f"{key:<48}{value:>16}" if isinstance(value, int) else f"{key:<48}{value:>16.6g}"
+        old = before.get(key)
+        if old:
+            line += f"{100 * (value - old) / old:>+10.1f}%"
+        print(line)
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Benchmark generating the schemas and validating against them"
+    )
+    arg_parser.add_argument(
+        "docs_path",
+        nargs="?",
+        default=DEFAULT_DOCS_PATH,
+        help="path to component_documentation.txt",
+    )
+    arg_parser.add_argument(
+        "--json", metavar="PATH", help="write the results to this json file"
+    )
+    arg_parser.add_argument(
+        "--compare",
+        metavar="PATH",
+        help="results of an earlier run to print the change against",
+    )
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    arg_parser.add_argument(
+        "--parse-scales",
+        type=int,
+        nargs="*",
+        default=[1, 4, 16, 64],
+        help="also time parsing the docs enlarged by these factors",
+    )
+    args = arg_parser.parse_args(argv)
+
+    results = run_suite(args.docs_path, args.repeat)
+    if len(args.parse_scales) != 0:
+        results["docs_parse_scaling"] = {
+            f"x{result['scale']}": result
+            for result in bench_parse(args.docs_path, args.parse_scales, args.repeat)
+        }
+    previous = json.load(open(args.compare, "r")) if args.compare else None
+    print_results(results, previous)
+    if args.json:
+        open(args.json, "w").write(json.dumps(results, indent="\t"))
+        print(f"Wrote {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
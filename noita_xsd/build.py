@@ -0,0 +1,477 @@
+import io
+import json
+import os
+import warnings
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from .model import Component, Enum
+from .output import (
+    BuiltinPruner,
+    CountingOutput,
+    Minifier,
+    NullOutput,
+    Output,
+    StreamedOutput,
+    Tee,
+)
+from .parse import DEFAULT_DOCS_PATH
+from .snapshot import hash_file, load_model
+from .timing import cprofiled, stage, timed, timed_output
+
+if TYPE_CHECKING:
+    import multiprocessing.pool
+
+    from .render import BatchRenderer, DocsMode, Layout
+
+# build cache, every output records the hashes of the inputs it was made from so that
+# unchanged outputs are never rewritten (editors watching ./out won't reload them).
+# Checking them only needs the hashes, the renderers and the worker pool are imported
+# once something is stale so a run where nothing changed doesn't pay for them
+MANIFEST_PATH = "./.build_manifest.json"
+MANIFEST_VERSION = 3
+OUTPUTS = [
+    "entity",
+    "materials",
+    "sprite",
+    "biomes_all",
+    "mod",
+    "magic_numbers",
+    "merged",
+]
+
+
+# the modules the schemas are rendered by, editing any of them rebuilds everything
+GENERATOR_MODULES = [
+    "build",
+    "index",
+    "ir",
+    "model",
+    "modular",
+    "output",
+    "parse",
+    "render",
+    "snapshot",
+    "timing",
+]
+
+
+def generator_sources() -> list[str]:
+    package_dir = os.path.dirname(__file__)
+    return [
+        os.path.relpath(os.path.join(package_dir, f"{name}.py"))
+        for name in GENERATOR_MODULES
+    ]
+
+
+def output_inputs(docs_path: str) -> dict[str, list[str]]:
+    generator = generator_sources()
+    shared = [*generator, "./src/config_betas.json", "./src/enums"]
+    inputs = {
+        "entity": [docs_path, *shared],
+        "materials": [
+            "./src/materials.json",
+            "./src/reaction.json",
+            "./src/materials.xsd",
+            *shared,
+        ],
+        "sprite": [*generator, "./src/sprite.xsd"],
+        "biomes_all": [*generator, "./src/biomes_all.xsd"],
+        "mod": [*generator, "./src/mod.json", "./src/mod.xsd"],
+        "magic_numbers": [
+            *generator,
+            "./src/magic_numbers.json",
+            "./src/magic_numbers.xsd",
+        ],
+    }
+    for domain in list(inputs):
+        inputs[f"modular/{domain}"] = inputs[domain]
+    inputs["modular/common"] = generator
+    inputs["modular/types"] = shared
+    inputs["modular/merged"] = generator
+    inputs["index"] = inputs["entity"]
+    inputs["merged"] = list(
+        dict.fromkeys(path for paths in inputs.values() for path in paths)
+    )
+    return inputs
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> dict:
+    try:
+        manifest = json.load(open(path, "r"))
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "files": {}, "outputs": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "files": {}, "outputs": {}}
+    return manifest
+
+
+def save_manifest(manifest: dict, path: str = MANIFEST_PATH):
+    open(path, "w").write(json.dumps(manifest, indent="\t"))
+
+
+def output_hashes(
+    names: list[str], docs_path: str, options: str, manifest: dict
+) -> dict[str, dict[str, str]]:
+    """The options and input hashes each of the outputs in names would be built from"""
+    inputs = output_inputs(docs_path)
+    input_hashes = {
+        path: hash_file(path, manifest["files"]) for path in inputs["merged"]
+    }
+    return {
+        name: {"<options>": options}
+        | {path: input_hashes[path] for path in inputs[name]}
+        for name in names
+    }
+
+
+def is_stale(path: str, hashes: dict[str, str], manifest: dict) -> bool:
+    return not os.path.exists(path) or manifest["outputs"].get(path) != hashes
+
+
+# the outputs merged.xsd is made of, in order
+MERGED_SECTIONS = ["entity", "materials", "mod", "magic_numbers"]
+
+
+def render_section(
+    name: str,
+    output: Output,
+    merged: Output,
+    components: list[Component],
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: "DocsMode" = "full",
+    layout: "Layout" = "classic",
+    render_batches: "BatchRenderer | None" = None,
+):
+    """Writes the schema name to output and its part of merged.xsd to merged"""
+    from .render import (
+        SCHEMA_END,
+        iter_entity_body,
+        iter_magic_numbers_schema,
+        iter_materials_schema,
+        iter_mod_schema,
+    )
+
+    if name == "entity":
+        entity = Tee(output, merged)
+        for chunk in timed(
+            "render entity",
+            iter_entity_body(
+                components, configs, enums, config_types, docs, layout, render_batches
+            ),
+        ):
+            entity.write(chunk)
+        output.write(SCHEMA_END)
+        return
+
+    if name == "materials":
+        chunks = iter_materials_schema(configs, enums, config_types, docs)
+    elif name == "mod":
+        chunks = iter_mod_schema(docs)
+    else:
+        chunks = iter_magic_numbers_schema(docs)
+    pruned = BuiltinPruner(merged)
+    schema = Tee(output, pruned)
+    for chunk in timed(f"apply_replacements {name}", chunks):
+        schema.write(chunk)
+    pruned.close()
+
+
+def copy_handwritten(name: str, output: Output):
+    from .render import handwritten
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        with stage(f"copy {name}"):
+            output.write(handwritten(name))
+
+
+def render_section_text(
+    name: str,
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: "DocsMode" = "full",
+) -> tuple[str, str]:
+    """render_section in a worker process, returns the schema and its merged.xsd part"""
+    schema = io.StringIO()
+    part = io.StringIO()
+    render_section(name, schema, part, [], configs, enums, config_types, docs)
+    return schema.getvalue(), part.getvalue()
+
+
+# every worker gets a few batches so one slow batch doesn't leave the others idle
+BATCHES_PER_JOB = 4
+
+# the model, handed to every worker once when the pool starts (for free with fork),
+# so a batch is only a range of indices instead of pickled components
+_shared: dict[str, list] = {}
+
+
+def init_render_worker(shared: dict[str, list]):
+    global _shared
+    _shared = shared
+
+
+def _render_shared(task: tuple[Callable[[list], str], str, int, int]) -> str:
+    render, name, start, stop = task
+    return render(_shared[name][start:stop])
+
+
+class PoolRenderer:
+    """Renders the config and component types in batches on a worker pool, --jobs"""
+
+    def __init__(
+        self, pool: "multiprocessing.pool.Pool", jobs: int, shared: dict[str, list]
+    ):
+        self.pool = pool
+        self.jobs = jobs
+        self.shared = shared
+
+    def __call__(self, render: Callable[[list], str], items: list) -> Iterator[str]:
+        size = max(1, -(-len(items) // (self.jobs * BATCHES_PER_JOB)))
+        ranges = [
+            (start, min(start + size, len(items)))
+            for start in range(0, len(items), size)
+        ]
+        name = next(
+            (name for name, shared in self.shared.items() if shared is items), None
+        )
+        if name is None:
+            return self.pool.imap(render, [items[start:stop] for start, stop in ranges])
+        return self.pool.imap(
+            _render_shared, [(render, name, start, stop) for start, stop in ranges]
+        )
+
+
+def render_outputs(
+    outputs: dict[str, Output],
+    components: list[Component],
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: "DocsMode" = "full",
+    layout: "Layout" = "classic",
+    pool: PoolRenderer | None = None,
+):
+    from .render import SCHEMA_END
+
+    merged = outputs["merged"]
+    if pool is None:
+        for name in MERGED_SECTIONS:
+            render_section(
+                name,
+                outputs[name],
+                merged,
+                components,
+                configs,
+                enums,
+                config_types,
+                docs,
+                layout,
+            )
+    else:
+        # the other schemas render in the background while the entity types are spread out
+        # over the pool, everything is written in the serial order afterwards
+        sections = {
+            name: pool.pool.apply_async(
+                render_section_text, (name, configs, enums, config_types, docs)
+            )
+            for name in MERGED_SECTIONS[1:]
+        }
+        render_section(
+            "entity",
+            outputs["entity"],
+            merged,
+            components,
+            configs,
+            enums,
+            config_types,
+            docs,
+            layout,
+            pool,
+        )
+        for name, result in sections.items():
+            with stage(f"wait for {name}"):
+                schema, part = result.get()
+            outputs[name].write(schema)
+            merged.write(part)
+    merged.write(SCHEMA_END)
+
+    # sprite and biomes_all have never been part of merged.xsd
+    for name in ["sprite", "biomes_all"]:
+        copy_handwritten(name, outputs[name])
+
+
+@dataclass
+class BuildResult:
+    written: list[str] = field(default_factory=list)
+    # bytes of every rendered output, and of the same output with full docs when a
+    # smaller docs mode was requested
+    sizes: dict[str, int] = field(default_factory=dict)
+    full_sizes: dict[str, int] = field(default_factory=dict)
+
+
+def build(
+    docs_path: str = DEFAULT_DOCS_PATH,
+    force: bool = False,
+    docs: "DocsMode" = "full",
+    compact: bool = False,
+    out_dir: str = "./out",
+    layout: "Layout" = "classic",
+    modular: bool = False,
+    split_components: bool = False,
+    jobs: int = 1,
+    index: bool = False,
+) -> BuildResult:
+    """Regenerate every stale output in out_dir, compact implies docs="none" and minifies,
+    modular also writes the include based schemas to out_dir/modular. With jobs above 1
+    the schemas are rendered on that many worker processes, index also writes the
+    completion index out_dir/index.json"""
+    if compact:
+        docs = "none"
+    modular = modular or split_components
+    names = OUTPUTS
+    if modular:
+        from .modular import MODULAR_OUTPUTS
+
+        names = names + MODULAR_OUTPUTS
+    paths = {name: os.path.join(out_dir, f"{name}.xsd") for name in names}
+    if index:
+        names = names + ["index"]
+        paths["index"] = os.path.join(out_dir, "index.json")
+    with stage("hash inputs"):
+        manifest = load_manifest()
+        known_files = dict(manifest["files"])
+        hashes = output_hashes(
+            names, docs_path, f"docs={docs} compact={compact} layout={layout}", manifest
+        )
+    if modular:
+        hashes["modular/entity"]["<options>"] += f" split={split_components}"
+    if index:
+        from .index import INDEX_VERSION
+
+        hashes["index"]["<options>"] = f"index={INDEX_VERSION}"
+    stale_outputs = {
+        name
+        for name in names
+        if force or is_stale(paths[name], hashes[name], manifest)
+    }
+    if len(stale_outputs) == 0:
+        # hashing only updates the stat cache when a source was touched without changing
+        if manifest["files"] != known_files:
+            save_manifest(manifest)
+        return BuildResult()
+
+    pool = None
+    with ExitStack() as workers:
+        with stage("load model"):
+            model = load_model(docs_path)
+        components, configs = model.components, model.configs
+        config_types, enums = model.config_types, model.enums
+        if jobs > 1:
+            import multiprocessing
+
+            with stage("start workers"):
+                shared = {"components": components, "configs": configs}
+                pool = PoolRenderer(
+                    workers.enter_context(
+                        multiprocessing.Pool(jobs, init_render_worker, (shared,))
+                    ),
+                    jobs,
+                    shared,
+                )
+        files: dict[str, StreamedOutput | NullOutput] = {}
+        counters: dict[str, CountingOutput] = {}
+        # closing the outputs compares them with the old files and replaces the changed ones
+        with stage("finish outputs"), ExitStack() as stack:
+
+            def open_output(name: str) -> Output:
+                # component family files are rebuilt together with the modular entity.xsd
+                group = name if name in names else "modular/entity"
+                path = os.path.join(out_dir, f"{name}.xsd")
+                if group in stale_outputs:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    files[name] = stack.enter_context(StreamedOutput(path))
+                else:
+                    files[name] = NullOutput()
+                counters[name] = CountingOutput()
+                output: Output = Tee(
+                    timed_output(f"write {name}", files[name]), counters[name]
+                )
+                if compact:
+                    minifier = Minifier(output)
+                    stack.callback(minifier.close)
+                    output = timed_output("minify", minifier)
+                return output
+
+            with stage("render"), cprofiled():
+                render_outputs(
+                    {name: open_output(name) for name in OUTPUTS},
+                    components,
+                    configs,
+                    enums,
+                    config_types,
+                    docs,
+                    layout,
+                    pool,
+                )
+                if modular:
+                    from .modular import render_modular_outputs
+
+                    render_modular_outputs(
+                        open_output,
+                        components,
+                        configs,
+                        enums,
+                        config_types,
+                        docs,
+                        layout,
+                        split_components,
+                    )
+            index_file: StreamedOutput | None = None
+            if "index" in stale_outputs:
+                with stage("index"):
+                    from .index import build_index, write_index
+
+                    index_file = stack.enter_context(StreamedOutput(paths["index"]))
+                    write_index(
+                        index_file,
+                        build_index(components, configs, enums, config_types),
+                    )
+
+        result = BuildResult(
+            [
+                os.path.join(out_dir, f"{name}.xsd")
+                for name in files
+                if files[name].changed
+            ],
+            {name: counter.size for name, counter in counters.items()},
+        )
+        if index_file is not None and index_file.changed:
+            result.written.append(paths["index"])
+        if docs != "full" or compact:
+            full_counters = {name: CountingOutput() for name in OUTPUTS}
+            with stage("render full size report"):
+                render_outputs(
+                    full_counters,
+                    components,
+                    configs,
+                    enums,
+                    config_types,
+                    layout=layout,
+                    pool=pool,
+                )
+            result.full_sizes = {
+                name: counter.size for name, counter in full_counters.items()
+            }
+
+    with stage("save manifest"):
+        for name in names:
+            manifest["outputs"][paths[name]] = hashes[name]
+        save_manifest(manifest)
+    return result
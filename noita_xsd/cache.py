@@ -0,0 +1,194 @@
+import hashlib
+import marshal
+import os
+import re
+
+from .parse import DEFAULT_DOCS_PATH
+from .snapshot import hash_file
+
+# the errors of every file validate.py checked, saved so the next run with the cache only
+# checks what changed. A file is looked up by its path and the options of the run, and its
+# errors are used again when its content hash is the same and what it was checked with
+# (an out/*.xsd with every schema it includes, or the sources the native and magic numbers
+# checkers are built from, and the checkers' own code) hashes the same as when it was
+# checked. Like the model snapshot, a file whose size and mtime didn't change isn't read
+# at all, so a run where nothing changed is a stat per file
+DEFAULT_CACHE_PATH = "./.validation_cache"
+CACHE_VERSION = 2
+INCLUDE_PATTERN = re.compile(
+    rb"<(?:\w+:)?(?:include|import|redefine)\b[^>]*?\bschemaLocation=[\"']([^\"']*)[\"']"
+)
+PACKAGE_DIR = os.path.dirname(__file__)
+
+
+def package_sources(*names: str) -> list[str]:
+    return [os.path.join(PACKAGE_DIR, f"{name}.py") for name in names]
+
+
+class ResultCache:
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        schema_dir: str = "./out",
+        docs_path: str | None = None,
+        forced_schema: str | None = None,
+    ):
+        self.path = path
+        self.schema_dir = schema_dir
+        self.docs_path = docs_path
+        # which checker a file gets depends on these, so results of runs with other
+        # options are kept apart
+        self.options = repr(
+            (
+                forced_schema,
+                None if docs_path is None else os.path.abspath(docs_path),
+                os.path.abspath(schema_dir),
+            )
+        )
+        # size, mtime and sha256 of every file and schema source, as snapshot.hash_file
+        # keeps them
+        self.hashes: dict[str, dict] = {}
+        # (path, options) -> (sha256, checked with, fingerprint of that, errors)
+        self.results: dict[tuple[str, str], tuple] = {}
+        self.fingerprints: dict[str | None, str | None] = {}
+        # everything a fingerprint of this run was made from
+        self.sources: set[str] = set()
+        self.hits = 0
+        self.changed = False
+        try:
+            data = marshal.loads(open(path, "rb").read())
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+        if isinstance(data, tuple) and len(data) == 3 and data[0] == CACHE_VERSION:
+            self.hashes = data[1]
+            self.results = data[2]
+
+    def checker_sources(self, checker: str | None) -> list[str]:
+        mode, _, name = (checker or "").partition(":")
+        if mode == "xsd":
+            return self.schema_sources(
+                os.path.join(self.schema_dir, f"{name}.xsd")
+            ) + package_sources("records", "validate")
+        if mode == "native":
+            # the tables it checks against are built from these by the model code
+            return [
+                self.docs_path or DEFAULT_DOCS_PATH,
+                "./src/config_betas.json",
+                "./src/enums",
+            ] + package_sources(
+                "model", "parse", "snapshot", "native", "records", "trigram", "validate"
+            )
+        if mode == "magic":
+            return ["./src/magic_numbers.json"] + package_sources(
+                "model", "parse", "native", "magic", "records", "trigram", "validate"
+            )
+        return package_sources("records", "validate")
+
+    def schema_sources(self, path: str) -> list[str]:
+        """The schema at path and every schema it includes or imports, transitively. The
+        locations a schema refers to are kept with its hash and only looked for again
+        when it changed"""
+        sources: list[str] = []
+        pending = [os.path.abspath(path)]
+        while len(pending) != 0:
+            source = pending.pop()
+            if source in sources:
+                continue
+            sources.append(source)
+            self.hash(source)
+            known = self.hashes[source]
+            if "includes" not in known:
+                directory = os.path.dirname(source)
+                known["includes"] = [
+                    os.path.normpath(os.path.join(directory, location.decode()))
+                    for location in INCLUDE_PATTERN.findall(open(source, "rb").read())
+                    if b"://" not in location
+                ]
+                self.changed = True
+            pending += reversed(known["includes"])
+        return sources
+
+    def fingerprint(self, checker: str | None) -> str | None:
+        """A hash of everything the results of checker depend on besides the file, None
+        when some of it is missing"""
+        if checker in self.fingerprints:
+            return self.fingerprints[checker]
+        digest = hashlib.sha256()
+        try:
+            for source in self.checker_sources(checker):
+                source = os.path.abspath(source)
+                self.sources.add(source)
+                digest.update(f"{source}\0{self.hash(source)}\0".encode())
+            fingerprint = digest.hexdigest()
+        except OSError:
+            fingerprint = None
+        self.fingerprints[checker] = fingerprint
+        return fingerprint
+
+    def hash(self, path: str) -> str:
+        known = self.hashes.get(path)
+        digest = hash_file(path, self.hashes)
+        if self.hashes[path] is not known:
+            self.changed = True
+        return digest
+
+    def lookup(self, path: str) -> list[dict] | None:
+        """The errors for path from the cache, None when it has to be checked again"""
+        full_path = os.path.abspath(path)
+        try:
+            digest = self.hash(full_path)
+        except OSError:
+            return None
+        result = self.results.get((full_path, self.options))
+        if result is None:
+            return None
+        sha256, checker, fingerprint, errors = result
+        if sha256 != digest:
+            return None
+        if self.fingerprint(checker) != fingerprint:
+            return None
+        self.hits += 1
+        # the records name the file the way it was given last time
+        return [
+            error if error["file"] == path else {**error, "file": path}
+            for error in errors
+        ]
+
+    def store(self, path: str, checker: str | None, errors: list[dict]):
+        """Saves the errors path was just checked to have. The file's hash is the one
+        lookup saw, from before it was checked"""
+        full_path = os.path.abspath(path)
+        known = self.hashes.get(full_path)
+        fingerprint = self.fingerprint(checker)
+        if known is None or fingerprint is None:
+            return
+        self.results[(full_path, self.options)] = (
+            known["sha256"],
+            checker,
+            fingerprint,
+            errors,
+        )
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        # files that are gone don't come back with the same results
+        self.results = {
+            key: result
+            for key, result in self.results.items()
+            if key[0] in self.hashes and os.path.exists(key[0])
+        }
+        used = {key[0] for key in self.results} | self.sources
+        self.hashes = {
+            path: known for path, known in self.hashes.items() if path in used
+        }
+        try:
+            open(self.path + ".tmp", "wb").write(
+                marshal.dumps((CACHE_VERSION, self.hashes, self.results))
+            )
+            os.replace(self.path + ".tmp", self.path)
+        except OSError:
+            # validating still works without it, next run just checks everything
+            pass
+        self.changed = False
@@ -0,0 +1,138 @@
+import argparse
+import os
+
+from .build import OUTPUTS, BuildResult, build
+from .parse import DEFAULT_DOCS_PATH
+from .timing import Profiler, profiling
+
+
+def print_size_report(result: BuildResult):
+    print("Size against the fully documented output:")
+    for name in OUTPUTS:
+        full = result.full_sizes[name]
+        size = result.sizes[name]
+        reduction = 100 * (full - size) / full if full != 0 else 0
+        print(f"\t{name + '.xsd':<20}{full:>10} -> {size:>10} bytes (-{reduction:.1f}%)")
+    full = sum(result.full_sizes.values())
+    size = sum(result.sizes.values())
+    print(f"\t{'total':<20}{full:>10} -> {size:>10} bytes (-{100 * (full - size) / full:.1f}%)")
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Generate the Noita xsd files in ./out"
+    )
+    arg_parser.add_argument(
+        "docs_path",
+        nargs="?",
+        default=DEFAULT_DOCS_PATH,
+        help="path to component_documentation.txt",
+    )
+    arg_parser.add_argument(
+        "--force",
+        action="store_true",
+        help="ignore the build cache and rewrite every output",
+    )
+    arg_parser.add_argument(
+        "--docs",
+        choices=["full", "once", "none"],
+        default="full",
+        help="hover documentation to emit, once only documents the first sub-attribute of each field",
+    )
+    arg_parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="drop all documentation and comments and minify whitespace",
+    )
+    arg_parser.add_argument(
+        "--layout",
+        choices=["classic", "collapsed"],
+        default="classic",
+        help="collapsed allows _remove_from_base on every component instead of emitting a second {Component}Base type for each",
+    )
+    arg_parser.add_argument(
+        "--modular",
+        action="store_true",
+        help="also write schemas that include the shared common.xsd and types.xsd to <out-dir>/modular",
+    )
+    arg_parser.add_argument(
+        "--split-components",
+        action="store_true",
+        help="with --modular, put the component types in one file per component family",
+    )
+    arg_parser.add_argument(
+        "--out-dir", default="./out", help="directory to write the schemas to"
+    )
+    arg_parser.add_argument(
+        "--index",
+        action="store_true",
+        help="also write <out-dir>/index.json, the component model as json for editor completion (see python -m noita_xsd.lookup)",
+    )
+    arg_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="report the time and tracemalloc peak of every build stage (tracing slows the build down)",
+    )
+    arg_parser.add_argument(
+        "--profile-dump",
+        metavar="PATH",
+        help="with --profile, also write cProfile stats of the render stage to PATH",
+    )
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="render the schemas on this many worker processes, 0 for one per core",
+    )
+    arg_parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild the outputs depending on a source as soon as it is saved",
+    )
+    arg_parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="with --watch, check the sources for changes every 50ms instead of using inotify",
+    )
+    args = arg_parser.parse_args(argv)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    if args.watch:
+        if (
+            args.compact
+            or args.modular
+            or args.split_components
+            or args.profile
+            or args.index
+            or args.jobs != 1
+        ):
+            arg_parser.error(
+                "--watch can't be combined with --compact, --modular, --profile, --index or --jobs"
+            )
+        from .watch import watch
+
+        watch(args.docs_path, args.docs, args.layout, args.out_dir, args.poll)
+        return
+    profiler = Profiler(args.profile_dump) if args.profile or args.profile_dump else None
+    with profiling(profiler):
+        result = build(
+            args.docs_path,
+            args.force,
+            args.docs,
+            args.compact,
+            args.out_dir,
+            args.layout,
+            args.modular,
+            args.split_components,
+            args.jobs or os.cpu_count() or 1,
+            args.index,
+        )
+    if len(result.written) == 0:
+        print("All outputs are up to date")
+    for path in result.written:
+        print(f"Wrote {path}")
+    if len(result.full_sizes) != 0:
+        print_size_report(result)
+    if profiler is not None:
+        print(profiler.report())
@@ -0,0 +1,463 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections.abc import Iterator
+
+from .model import get_xml_type
+from .materials import MATERIAL_REFERENCES, REACTION_REFERENCES
+from .native import ElementTable, Tables, compile_tables
+from .parse import DEFAULT_DOCS_PATH, load_json
+from .snapshot import load_model
+from .stream import compile_schema
+
+# made up but realistic files for measuring the validators, the schema compile and the
+# streaming memory at any size: entity trees with nested entities, <Base> files and config
+# sub-elements, materials files with any number of CellData and Reaction entries and
+# magic_numbers files. Everything comes from the same model the schemas are rendered from, so
+# a valid file is valid against them. The same seed gives the same corpus, byte for byte.
+# manifest.json lists every file with the mistakes that were put into it on purpose
+MANIFEST_VERSION = 1
+WORDS = [
+    "spark",
+    "blood",
+    "acid",
+    "gold",
+    "ice",
+    "slime",
+    "wood",
+    "steel",
+    "poison",
+    "fire",
+    "water",
+    "rock",
+    "glass",
+    "oil",
+    "smoke",
+    "magic",
+]
+# what a deliberate mistake looks like to each validator
+MISTAKES = ["unknown_attribute", "bad_value", "unknown_element"]
+MATERIAL_MISTAKES = MISTAKES + ["duplicate_name", "unknown_material"]
+REACTION_MISTAKES = ["unknown_attribute", "bad_value", "unknown_material"]
+MAGIC_MISTAKES = ["unknown_attribute", "bad_value"]
+ENTITIES_PER_DIR = 1000
+SIZE_SUFFIXES = {"k": 1 << 10, "m": 1 << 20, "g": 1 << 30}
+
+
+def parse_size(text: str) -> int:
+    """Bytes from a size like 500k, 20M or 1.5G"""
+    factor = SIZE_SUFFIXES.get(text[-1:].lower())
+    if factor is None:
+        return int(text)
+    return int(float(text[:-1]) * factor)
+
+
+def typo(name: str, rng: random.Random, taken) -> str:
+    # a swapped, dropped or doubled letter, retried until it isn't a real name
+    while True:
+        i = rng.randrange(len(name))
+        kind = rng.randrange(3)
+        if kind == 0 and len(name) > 1:
+            i = min(i, len(name) - 2)
+            wrong = name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+        elif kind == 1 and len(name) > 1:
+            wrong = name[:i] + name[i + 1 :]
+        else:
+            wrong = name[:i] + name[i] + name[i:]
+        if wrong != name and wrong not in taken:
+            return wrong
+
+
+class CorpusGenerator:
+    def __init__(
+        self,
+        tables: Tables,
+        config_types: frozenset[str],
+        seed: int = 0,
+        invalid_rate: float = 0.1,
+    ):
+        self.tables = tables
+        self.rng = random.Random(seed)
+        self.invalid_rate = invalid_rate
+        self.components = [
+            name
+            for name in tables.elements["Entity"].children
+            if name not in ("Entity", "Base", "_Transform")
+        ]
+        # components a bad value can be put in, strings take anything
+        self.typed_components = [
+            name
+            for name in self.components
+            if any(ty != "xsd:string" for ty in tables.elements[name].attributes.values())
+        ]
+
+        def json_types(name: str) -> dict[str, str]:
+            return {
+                attribute["name"]: get_xml_type("", attribute["type"], config_types)[0][1]
+                for attribute in load_json(name)
+            }
+
+        self.material_attributes = json_types("materials")
+        self.reaction_attributes = json_types("reaction")
+        self.magic_attributes = json_types("magic_numbers")
+        # CELL_TYPE and REACTION_DIRECTION only exist in the hand written part
+        self.enums = compile_schema("./src/materials.xsd").enums | tables.enums
+
+    def value(self, ty: str) -> str:
+        rng = self.rng
+        if ty == "xsd:decimal":
+            return f"{rng.uniform(-100, 100):.{rng.randrange(4)}f}"
+        if ty == "xsd:int":
+            return str(rng.randint(-1000, 1000))
+        if ty == "xsd:unsignedInt":
+            return str(rng.randint(0, 1000))
+        if ty == "NoitaBool":
+            return rng.choice("01")
+        if ty == "Hex8":
+            return f"{rng.getrandbits(32):08x}"
+        variants = self.enums.get(ty)
+        if variants is not None:
+            return rng.choice(list(variants))
+        return rng.choice(WORDS)
+
+    def bad_value(self, ty: str) -> str:
+        if ty in self.enums or ty == "NoitaBool":
+            return "NOT_A_VARIANT"
+        if ty in ("xsd:decimal", "xsd:int", "xsd:unsignedInt", "Hex8"):
+            return "twelve"
+        return ""
+
+    def attributes(
+        self, types: dict[str, str], count: int, mistakes: list[str]
+    ) -> dict[str, str]:
+        """count random attributes out of types, with the mistakes asked for"""
+        names = self.rng.sample(list(types), min(count, len(types)))
+        attributes = {name: self.value(types[name]) for name in names}
+        for mistake in mistakes:
+            if mistake == "unknown_attribute":
+                name = self.rng.choice(list(types))
+                attributes[typo(name, self.rng, types)] = self.value(types[name])
+            elif mistake == "bad_value":
+                # strings take anything, so only typed attributes can hold a bad value
+                typed = [name for name in types if types[name] != "xsd:string"]
+                name = self.rng.choice(typed)
+                attributes[name] = self.bad_value(types[name])
+        return attributes
+
+    def mistakes(self, kinds: list[str], rate: float) -> list[str]:
+        return [self.rng.choice(kinds)] if self.rng.random() < rate else []
+
+    def element(
+        self,
+        name: str,
+        table: ElementTable,
+        indent: str,
+        mistakes: list[str],
+        depth: int = 0,
+        extra: dict[str, str] | None = None,
+    ) -> Iterator[str]:
+        attribute_mistakes = [m for m in mistakes if m != "unknown_element"]
+        attributes = self.attributes(
+            table.attributes, self.rng.randint(0, 8), attribute_mistakes
+        ) | (extra or {})
+        # configs and objects are written for some components, configs in configs rarely
+        children = [
+            child
+            for child in table.children
+            if self.rng.random() < (0.3 if depth == 0 else 0.1)
+        ]
+        text = "".join(f' {k}="{v}"' for k, v in attributes.items())
+        if len(children) == 0:
+            yield f"{indent}<{name}{text} />\n"
+            return
+        yield f"{indent}<{name}{text}>\n"
+        for child in children:
+            child_table = self.tables.elements.get(table.children[child])
+            if child_table is not None:
+                yield from self.element(child, child_table, indent + "\t", [], depth + 1)
+        yield f"{indent}</{name}>\n"
+
+    def entity(
+        self,
+        indent: str,
+        mistakes: list[str],
+        bases: list[str],
+        depth: int = 0,
+    ) -> Iterator[str]:
+        rng = self.rng
+        attributes = ""
+        if rng.random() < 0.5:
+            attributes += f' name="{rng.choice(WORDS)}_{rng.randrange(1000)}"'
+        if rng.random() < 0.5:
+            attributes += f' tags="{",".join(rng.sample(WORDS, rng.randint(1, 3)))}"'
+        yield f"{indent}<Entity{attributes}>\n"
+        inner = indent + "\t"
+        if len(bases) != 0 and rng.random() < 0.3:
+            base = rng.choice(bases)
+            overrides = rng.sample(self.components, rng.randint(0, 2))
+            if len(overrides) == 0:
+                yield f'{inner}<Base file="{base}" />\n'
+            else:
+                yield f'{inner}<Base file="{base}">\n'
+                for comp in overrides:
+                    extra = {"_remove_from_base": "1"} if rng.random() < 0.2 else {}
+                    yield from self.element(
+                        comp,
+                        self.tables.elements[f"{comp}Base"],
+                        inner + "\t",
+                        [],
+                        1,
+                        extra,
+                    )
+                yield f"{inner}</Base>\n"
+        if rng.random() < 0.5:
+            yield from self.element(
+                "_Transform", self.tables.elements["Transform"], inner, []
+            )
+        components = rng.sample(self.components, rng.randint(1, 8))
+        # each mistake goes into one of the components
+        placed: dict[str, list[str]] = {}
+        for mistake in mistakes:
+            if mistake == "bad_value":
+                comp = rng.choice(self.typed_components)
+                if comp not in components:
+                    components.append(comp)
+            else:
+                comp = rng.choice(components)
+            placed.setdefault(comp, []).append(mistake)
+        for comp in components:
+            comp_mistakes = placed.get(comp, [])
+            name = comp
+            if "unknown_element" in comp_mistakes:
+                name = typo(comp, rng, self.tables.elements)
+            yield from self.element(
+                name, self.tables.elements[comp], inner, comp_mistakes
+            )
+        if depth < 2 and rng.random() < 0.2:
+            for _ in range(rng.randint(1, 3)):
+                yield from self.entity(inner, [], bases, depth + 1)
+        yield f"{indent}</Entity>\n"
+
+    def entity_file(self, bases: list[str]) -> tuple[str, list[str]]:
+        mistakes = self.mistakes(MISTAKES, self.invalid_rate)
+        return "".join(self.entity("", mistakes, bases)), mistakes
+
+    def materials(self, count: int, path: str) -> list[str]:
+        """Writes count CellData (some of them CellDataChild) and about count / 4
+        reactions to path, returning the mistakes made"""
+        rng = self.rng
+        mistakes: list[str] = []
+        names: list[str] = []
+        tags: list[str] = []
+        types = {
+            name: ty
+            for name, ty in self.material_attributes.items()
+            if name not in ("name", "tags", "wang_color")
+            and name not in MATERIAL_REFERENCES["CellData"]
+        }
+        with open(path, "w") as out:
+            out.write("<Materials>\n")
+            for i in range(count):
+                entry_mistakes = []
+                if len(names) != 0:
+                    entry_mistakes = self.mistakes(
+                        MATERIAL_MISTAKES, self.invalid_rate / 10
+                    )
+                mistakes += entry_mistakes
+                name = f"{rng.choice(WORDS)}_{i}"
+                if "duplicate_name" in entry_mistakes:
+                    name = rng.choice(names)
+                material_tags = rng.sample(WORDS, rng.randint(1, 3))
+                attributes = {
+                    "name": name,
+                    "tags": ",".join(f"[{tag}]" for tag in material_tags),
+                    # has to be unique too, an odd factor never maps two materials to one
+                    "wang_color": f"{i * 2654435761 % (1 << 32):08x}",
+                } | self.attributes(types, rng.randint(2, 12), entry_mistakes)
+                # references only go to materials that are already there
+                if len(names) != 0 and rng.random() < 0.3:
+                    reference = rng.choice(MATERIAL_REFERENCES["CellData"])
+                    attributes[reference] = rng.choice(names)
+                    if "unknown_material" in entry_mistakes:
+                        attributes[reference] = f"no_such_material_{i}"
+                elif "unknown_material" in entry_mistakes:
+                    attributes["warmth_melts_to_material"] = f"no_such_material_{i}"
+                tag = "CellData"
+                if len(names) != 0 and rng.random() < 0.2:
+                    tag = "CellDataChild"
+                    attributes = {"_parent": rng.choice(names)} | attributes
+                if "unknown_element" in entry_mistakes:
+                    tag = typo(tag, rng, ("CellData", "CellDataChild"))
+                # a misspelled element isn't a material anything could refer to
+                if "unknown_element" not in entry_mistakes:
+                    names.append(name)
+                tags += (f"[{tag}]" for tag in material_tags if f"[{tag}]" not in tags)
+                text = "".join(f' {k}="{v}"' for k, v in attributes.items())
+                if rng.random() < 0.05:
+                    out.write(f"\t<{tag}{text}>\n")
+                    for line in self.element(
+                        "ExplosionConfig",
+                        self.tables.elements["ConfigExplosion"],
+                        "\t\t",
+                        [],
+                        1,
+                    ):
+                        out.write(line)
+                    out.write(f"\t</{tag}>\n")
+                else:
+                    out.write(f"\t<{tag}{text} />\n")
+                if rng.random() < 0.25:
+                    mistakes += self.reaction(out, names, tags)
+            out.write("</Materials>\n")
+        return mistakes
+
+    def reaction(self, out, names: list[str], tags: list[str]) -> list[str]:
+        rng = self.rng
+        mistakes = self.mistakes(REACTION_MISTAKES, self.invalid_rate / 10)
+
+        def cell() -> str:
+            return rng.choice(names) if rng.random() < 0.7 else rng.choice(tags)
+
+        attributes = {
+            f"{side}_cell{i}": cell() for i in (1, 2) for side in ("input", "output")
+        }
+        if "unknown_material" in mistakes:
+            attributes["input_cell1"] = f"no_such_material_{rng.randrange(1000)}"
+        types = {
+            name: ty
+            for name, ty in self.reaction_attributes.items()
+            if name not in REACTION_REFERENCES
+            and name not in MATERIAL_REFERENCES["Reaction"]
+        }
+        attributes |= self.attributes(
+            types,
+            rng.randint(1, 4),
+            [m for m in mistakes if m != "unknown_material"],
+        )
+        text = "".join(f' {k}="{v}"' for k, v in attributes.items())
+        out.write(f"\t<Reaction{text} />\n")
+        return mistakes
+
+    def magic_numbers(self) -> tuple[str, list[str]]:
+        mistakes = self.mistakes(MAGIC_MISTAKES, self.invalid_rate)
+        attributes = self.attributes(
+            self.magic_attributes, self.rng.randint(1, 40), mistakes
+        )
+        text = "".join(f'\n\t{k}="{v}"' for k, v in attributes.items())
+        return f"<MagicNumbers{text}\n/>\n", mistakes
+
+
+def generate(
+    generator: CorpusGenerator,
+    out_dir: str,
+    size: int,
+    materials: int = 0,
+    magic: int = 0,
+) -> dict:
+    """Writes entity files until they add up to size bytes, a materials.xml with the
+    given number of materials and magic magic_numbers.xml files, returning the manifest"""
+    files: list[dict] = []
+
+    def add(path: str, kind: str, text: str | None, mistakes: list[str]):
+        full_path = os.path.join(out_dir, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        if text is not None:
+            open(full_path, "w").write(text)
+        files.append(
+            {
+                "path": path,
+                "kind": kind,
+                "bytes": os.path.getsize(full_path),
+                "mistakes": mistakes,
+            }
+        )
+
+    # bases come first so the entities can use them, and never have mistakes of their own
+    base_count = max(1, size // (200 * 1024))
+    bases: list[str] = []
+    written = 0
+    for i in range(base_count if size > 0 else 0):
+        path = f"data/entities/base/base_{i:04}.xml"
+        text = "".join(generator.entity("", [], bases[:i]))
+        add(path, "base", text, [])
+        bases.append(path)
+        written += len(text)
+    i = 0
+    while written < size:
+        path = f"data/entities/{i // ENTITIES_PER_DIR:04}/entity_{i:06}.xml"
+        text, mistakes = generator.entity_file(bases)
+        add(path, "entity", text, mistakes)
+        written += len(text)
+        i += 1
+    if materials > 0:
+        path = "data/materials.xml"
+        os.makedirs(os.path.join(out_dir, "data"), exist_ok=True)
+        mistakes = generator.materials(materials, os.path.join(out_dir, path))
+        add(path, "materials", None, mistakes)
+    for i in range(magic):
+        text, mistakes = generator.magic_numbers()
+        add(f"mods/magic_{i:03}/magic_numbers.xml", "magic_numbers", text, mistakes)
+    return {"version": MANIFEST_VERSION, "files": files}
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Generate a corpus of Noita xml files for load tests, the same seed always gives the same files"
+    )
+    arg_parser.add_argument("out_dir", help="directory to write the corpus to")
+    arg_parser.add_argument(
+        "--size",
+        default="1M",
+        help="total size of the entity files, like 500k, 20M or 2G (default 1M)",
+    )
+    arg_parser.add_argument(
+        "--materials",
+        type=int,
+        default=0,
+        help="number of materials in data/materials.xml (about 300 bytes each), none by default",
+    )
+    arg_parser.add_argument(
+        "--magic", type=int, default=0, help="number of magic_numbers.xml files"
+    )
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument(
+        "--invalid",
+        type=float,
+        default=0.1,
+        help="share of entity and magic_numbers files with a mistake, a tenth of that for each material and reaction",
+    )
+    arg_parser.add_argument(
+        "--docs",
+        default=DEFAULT_DOCS_PATH,
+        help="component_documentation.txt the components come from",
+    )
+    args = arg_parser.parse_args(argv)
+
+    start = time.perf_counter()
+    model = load_model(args.docs)
+    tables = compile_tables(
+        model.components, model.configs, model.enums, model.config_types
+    )
+    generator = CorpusGenerator(tables, model.config_types, args.seed, args.invalid)
+    manifest = generate(
+        generator, args.out_dir, parse_size(args.size), args.materials, args.magic
+    )
+    manifest["seed"] = args.seed
+    with open(os.path.join(args.out_dir, "manifest.json"), "w") as out:
+        json.dump(manifest, out, indent="\t")
+        out.write("\n")
+    elapsed = time.perf_counter() - start
+    total = sum(file["bytes"] for file in manifest["files"])
+    invalid = sum(len(file["mistakes"]) != 0 for file in manifest["files"])
+    print(
+        f"{len(manifest['files'])} files, {invalid} with mistakes, {total / (1 << 20):.1f} MB "
+        f"in {elapsed:.2f}s ({total / (1 << 20) / elapsed:.1f} MB/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
+
+from .build import MERGED_SECTIONS, OUTPUTS, copy_handwritten, render_section
+from .model import Component, Enum, Field
+from .output import StreamedOutput
+from .render import SCHEMA_END, DocsMode, Layout
+from .snapshot import load_model
+
+# the main and beta builds of the game only differ in a few components, so rendering every
+# variant from scratch is mostly rendering the same types again. DeltaBuild keeps the rendered
+# types of the builds it made and only renders the types whose definition changed, the other
+# schemas are only redone when the configs or enums they are made of changed. Next to the
+# schemas every variant gets a changelog against the first build
+CHANGELOG_VERSION = 1
+
+
+class FragmentCache:
+    """A BatchRenderer (see render.iter_entity_body) that renders one type at a time and
+    hands back the text from an earlier build where the type is the same"""
+
+    def __init__(self):
+        # (render function, its options) -> type name -> (type, rendered text)
+        self.fragments: dict[tuple, dict[str, tuple[Component, str]]] = {}
+        self.rendered = 0
+        self.reused = 0
+
+    def __call__(self, render: Callable[[list], str], items: list) -> Iterator[str]:
+        # render is a partial of render_configs or render_components, the options it was
+        # given (docs, layout, config types) change the text as much as the type does
+        key = (render.func, tuple(sorted(render.keywords.items())))
+        fragments = self.fragments.setdefault(key, {})
+        for item in items:
+            known = fragments.get(item.name)
+            if known is not None and known[0] == item:
+                self.reused += 1
+                yield known[1]
+                continue
+            self.rendered += 1
+            text = render([item])
+            fragments[item.name] = (item, text)
+            yield text
+
+
+def diff_fields(old: list[Field], new: list[Field]) -> dict[str, list]:
+    old_fields = {field.name: field for field in old}
+    new_fields = {field.name: field for field in new}
+    changes: dict[str, list] = {
+        "added": [
+            {"name": field.name, "type": field.ty}
+            for field in new
+            if field.name not in old_fields
+        ],
+        "removed": [
+            {"name": field.name, "type": field.ty}
+            for field in old
+            if field.name not in new_fields
+        ],
+        "retyped": [],
+        # same type, but a different default, example range or comment
+        "updated": [],
+    }
+    for field in new:
+        previous = old_fields.get(field.name)
+        if previous is None or previous == field:
+            continue
+        if previous.ty != field.ty:
+            changes["retyped"].append(
+                {"name": field.name, "from": previous.ty, "to": field.ty}
+            )
+        else:
+            changes["updated"].append(field.name)
+    return {kind: found for kind, found in changes.items() if len(found) != 0}
+
+
+def diff_types(old: list[Component], new: list[Component]) -> dict:
+    """Added, removed and changed components (or configs) by name"""
+    old_types = {comp.name: comp for comp in old}
+    new_types = {comp.name: comp for comp in new}
+    changed = {}
+    for comp in new:
+        previous = old_types.get(comp.name)
+        if previous is not None and previous != comp:
+            # a type whose fields only moved around renders differently, but has no
+            # field changes to report
+            changed[comp.name] = diff_fields(previous.fields, comp.fields) or {
+                "reordered": True
+            }
+    return {
+        "added": [comp.name for comp in new if comp.name not in old_types],
+        "removed": [comp.name for comp in old if comp.name not in new_types],
+        "changed": changed,
+    }
+
+
+def diff_enums(old: list[Enum], new: list[Enum]) -> dict:
+    old_enums = {enum.name: enum for enum in old}
+    new_enums = {enum.name: enum for enum in new}
+    changed = {}
+    for enum in new:
+        previous = old_enums.get(enum.name)
+        if previous is not None and previous != enum:
+            changed[enum.name] = {
+                "added": [v for v in enum.variants if v not in previous.variants],
+                "removed": [v for v in previous.variants if v not in enum.variants],
+            }
+    return {
+        "added": [enum.name for enum in new if enum.name not in old_enums],
+        "removed": [enum.name for enum in old if enum.name not in new_enums],
+        "changed": changed,
+    }
+
+
+class BuildModel:
+    """The model one variant is rendered from"""
+
+    def __init__(
+        self,
+        docs_path: str,
+        configs_path: str = "./src/config_betas.json",
+        enums_path: str = "./src/enums",
+    ):
+        self.docs_path = docs_path
+        self.configs_path = configs_path
+        model = load_model(docs_path, configs_path, enums_path)
+        self.components = model.components
+        self.configs, self.config_types = model.configs, model.config_types
+        self.enums = model.enums
+
+
+def changelog(old: BuildModel, new: BuildModel) -> dict:
+    return {
+        "version": CHANGELOG_VERSION,
+        "from": {"docs": old.docs_path, "configs": old.configs_path},
+        "to": {"docs": new.docs_path, "configs": new.configs_path},
+        "components": diff_types(old.components, new.components),
+        "configs": diff_types(old.configs, new.configs),
+        "enums": diff_enums(old.enums, new.enums),
+    }
+
+
+class DeltaBuild:
+    def __init__(self, docs: DocsMode = "full", layout: Layout = "classic"):
+        self.docs: DocsMode = docs
+        self.layout: Layout = layout
+        self.fragments = FragmentCache()
+        # schema name -> (the configs and enums it was rendered from, schema, merged part)
+        self.sections: dict[str, tuple[tuple, str, str]] = {}
+        self.base: BuildModel | None = None
+
+    def section(self, name: str, model: BuildModel) -> tuple[str, str]:
+        # mod and magic_numbers only come from src/, materials also lists configs and enums
+        inputs = (model.configs, model.enums) if name == "materials" else ()
+        known = self.sections.get(name)
+        if known is not None and known[0] == inputs:
+            return known[1], known[2]
+        schema = io.StringIO()
+        part = io.StringIO()
+        render_section(
+            name,
+            schema,
+            part,
+            [],
+            model.configs,
+            model.enums,
+            model.config_types,
+            self.docs,
+        )
+        self.sections[name] = (inputs, schema.getvalue(), part.getvalue())
+        return schema.getvalue(), part.getvalue()
+
+    def build(self, model: BuildModel, out_dir: str) -> tuple[list[str], dict | None]:
+        """Writes the schemas of model to out_dir, returning the files that changed and
+        the changelog against the first model built (None for the first)"""
+        os.makedirs(out_dir, exist_ok=True)
+        files: dict[str, StreamedOutput] = {}
+        with ExitStack() as stack:
+            for name in OUTPUTS:
+                files[name] = stack.enter_context(
+                    StreamedOutput(os.path.join(out_dir, f"{name}.xsd"))
+                )
+            merged = files["merged"]
+            render_section(
+                "entity",
+                files["entity"],
+                merged,
+                model.components,
+                model.configs,
+                model.enums,
+                model.config_types,
+                self.docs,
+                self.layout,
+                self.fragments,
+            )
+            for name in MERGED_SECTIONS[1:]:
+                schema, part = self.section(name, model)
+                files[name].write(schema)
+                merged.write(part)
+            merged.write(SCHEMA_END)
+            for name in ["sprite", "biomes_all"]:
+                copy_handwritten(name, files[name])
+        written = [file.path for file in files.values() if file.changed]
+
+        if self.base is None:
+            self.base = model
+            return written, None
+        log = changelog(self.base, model)
+        changelog_file = StreamedOutput(os.path.join(out_dir, "changelog.json"))
+        with changelog_file:
+            changelog_file.write(json.dumps(log, indent="\t") + "\n")
+        if changelog_file.changed:
+            written.append(changelog_file.path)
+        return written, log
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Generate the schemas of several builds of the game (e.g. main and beta), only rendering what differs from the first"
+    )
+    arg_parser.add_argument(
+        "docs_paths",
+        nargs="+",
+        metavar="docs_path",
+        help="component_documentation.txt of every build, the first is the one the others are compared to",
+    )
+    arg_parser.add_argument(
+        "--out-dir",
+        action="append",
+        required=True,
+        help="directory to write a build's schemas to, once for every docs_path",
+    )
+    arg_parser.add_argument(
+        "--configs",
+        action="append",
+        help="config_betas.json of every build, once for every docs_path (defaults to ./src/config_betas.json for all)",
+    )
+    arg_parser.add_argument("--docs", choices=["full", "once", "none"], default="full")
+    arg_parser.add_argument(
+        "--layout", choices=["classic", "collapsed"], default="classic"
+    )
+    args = arg_parser.parse_args(argv)
+    configs = args.configs or ["./src/config_betas.json"] * len(args.docs_paths)
+    if len(args.out_dir) != len(args.docs_paths) or len(configs) != len(
+        args.docs_paths
+    ):
+        arg_parser.error("--out-dir and --configs have to be given once per docs_path")
+
+    delta = DeltaBuild(args.docs, args.layout)
+    for docs_path, configs_path, out_dir in zip(args.docs_paths, configs, args.out_dir):
+        start = time.perf_counter()
+        rendered, reused = delta.fragments.rendered, delta.fragments.reused
+        written, log = delta.build(BuildModel(docs_path, configs_path), out_dir)
+        elapsed = time.perf_counter() - start
+        for path in written:
+            print(f"Wrote {path}")
+        summary = ""
+        if log is not None:
+            components = log["components"]
+            summary = (
+                f", {len(components['added'])} components added, "
+                f"{len(components['removed'])} removed, {len(components['changed'])} changed"
+            )
+        print(
+            f"{docs_path}: {delta.fragments.rendered - rendered} types rendered, "
+            f"{delta.fragments.reused - reused} reused in {elapsed:.2f}s{summary}",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import json
+
+from .ir import (
+    COMMON_ATTRIBUTES,
+    ENTITY_ATTRIBUTES,
+    class_cpp,
+    field_cpp,
+    transform_type,
+)
+from .model import (
+    Component,
+    Enum,
+    get_default_for_sub_field,
+    get_type_for_sub_field,
+    get_xml_type,
+)
+from .output import Output
+
+# completion and hover data for editors without xsd support, the same model entity.xsd is
+# rendered from but as plain json. Docs are the raw C++ declarations, without the <br>/&emsp;
+# encoding lemminx needs. Attributes only carry a default where the schema declares one
+INDEX_VERSION = 1
+
+
+def index_element(
+    comp: Component, kind: str, config_types: set[str] | frozenset[str]
+) -> dict:
+    attributes: dict[str, dict] = {}
+    children: dict[str, str] = {}
+    for f in comp.fields:
+        tys = get_xml_type(f.name, f.ty, config_types)
+        if type(tys) is str:
+            children[f.name] = tys.split("::")[-1]
+            continue
+        for suffix, ty in tys:
+            true_type = get_type_for_sub_field(f.name, ty, comp.name)
+            attributes[f.name + suffix] = {
+                "type": true_type,
+                "default": get_default_for_sub_field(f, true_type, comp.name),
+                "doc": field_cpp(f),
+            }
+    if kind == "component":
+        attributes |= COMMON_ATTRIBUTES
+    return {
+        "kind": kind,
+        "doc": class_cpp(comp),
+        "attributes": attributes,
+        "children": children,
+    }
+
+
+def build_index(
+    components: list[Component],
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+) -> dict:
+    """Every element of an entity file by name: its attributes with type, default and doc,
+    and its child elements with the element they are. Attribute types that are enums (or
+    NoitaBool) can be looked up in "enums" for the values"""
+    transform = transform_type()
+    elements: dict[str, dict] = {
+        "Transform": {
+            "kind": "transform",
+            "doc": transform.doc,
+            "attributes": {
+                attribute.name: {
+                    "type": attribute.ty,
+                    "default": attribute.default,
+                    "doc": attribute.doc,
+                }
+                for attribute in transform.attributes
+            },
+            "children": {},
+        }
+    }
+    for config in configs:
+        elements[config.name] = index_element(config, "config", config_types)
+    for comp in components:
+        elements[comp.name] = index_element(comp, "component", config_types)
+    entity_children = {
+        "Entity": "Entity",
+        "Base": "Base",
+        "_Transform": "Transform",
+    } | {comp.name: comp.name for comp in components}
+    elements["Entity"] = {
+        "kind": "entity",
+        "doc": "Represents an entity that can be loaded into the world",
+        "attributes": ENTITY_ATTRIBUTES,
+        "children": entity_children,
+    }
+    elements["Base"] = {
+        "kind": "entity",
+        "doc": "Base file",
+        "attributes": ENTITY_ATTRIBUTES
+        | {
+            "file": {"type": "xsd:string", "required": True},
+            "include_children": {"type": "NoitaBool"},
+        },
+        "children": entity_children,
+        # components inside <Base> may also use _remove_from_base
+        "child_attributes": {"_remove_from_base": {"type": "NoitaBool"}},
+    }
+    return {
+        "version": INDEX_VERSION,
+        "roots": ["Entity"],
+        "elements": elements,
+        "enums": {"NoitaBool": ["0", "1"]}
+        | {enum.name: enum.variants for enum in enums},
+    }
+
+
+def write_index(output: Output, index: dict):
+    output.write(json.dumps(index, separators=(",", ":")))
@@ -0,0 +1,387 @@
+from dataclasses import dataclass, field
+from typing import Literal
+
+from .model import (
+    Component,
+    Enum,
+    Field,
+    get_default_for_sub_field,
+    get_type_for_sub_field,
+    get_xml_type,
+)
+from .parse import load_json
+
+# the schemas as data instead of text: which elements there are, their attributes with
+# type, default and docs, and which children they take. Built from the parsed model and
+# the json in src/, out/*.xsd (render.py) and every other output format (backends.py) are
+# written from the same objects, so they can't disagree about what a document may
+# contain. Attribute types keep the names the xsd uses, xsd:decimal and friends for
+# builtins and the name of a SimpleType otherwise. Docs are plain text, the lemminx
+# specific markup is the writers' business
+HEX8_PATTERN = "[0-9A-Fa-f]{8}|0"
+
+# how much hover documentation is emitted: "full" repeats a field's docs on each of its
+# sub-attributes, "once" only documents the first one (.x of a vec2), "none" drops all docs
+DocsMode = Literal["full", "once", "none"]
+# "classic" gives every component a second {name}Base type that allows _remove_from_base and
+# lists all of them again in EntityBase, "collapsed" allows _remove_from_base on every component
+# instead so each component is one type and only Entity lists them
+Layout = Literal["classic", "collapsed"]
+
+ENTITY_ATTRIBUTES = {
+    "name": {"type": "xsd:string"},
+    "tags": {"type": "xsd:string"},
+    "serialize": {"type": "NoitaBool", "default": "1"},
+}
+COMMON_ATTRIBUTES = {
+    "_tags": {"type": "xsd:string", "default": ""},
+    "_enabled": {"type": "NoitaBool", "default": "1"},
+}
+
+transform = {
+    "rotation": "float rotation = 0; // [0, 360] Measured in degrees",
+    "position": "vec2 position; // EntityLoad doesn't respect this on entities, mostly used for relative offsets in InheritTransformComponent",
+    "scale": "vec2 scale = {.x = 1, .y = 1}; // A stretching factor, most components don't work with this",
+}
+
+
+@dataclass(slots=True)
+class SimpleType:
+    name: str
+    # exactly one of the two is set
+    variants: list[str] | None = None
+    pattern: str | None = None
+
+
+@dataclass(slots=True)
+class Attribute:
+    name: str
+    ty: str
+    default: str | None = None
+    required: bool = False
+    doc: str = ""
+
+
+@dataclass(slots=True)
+class Child:
+    name: str
+    # the ComplexType the child element is
+    ty: str
+
+
+@dataclass(slots=True)
+class UnknownField:
+    # a field whose C++ type has no xml type, documents can't set it
+    name: str
+    cpp_type: str
+    # how many of the type's attributes come before it
+    position: int
+
+
+@dataclass(slots=True)
+class ComplexType:
+    name: str
+    attributes: list[Attribute]
+    children: list[Child] = field(default_factory=list)
+    # "all" takes every child at most once, "choice" any of them any number of times
+    content: Literal["all", "choice"] = "all"
+    # the type whose attributes and children come before these
+    extends: str | None = None
+    mixed: bool = True
+    doc: str = ""
+    unknown: list[UnknownField] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class Root:
+    name: str
+    ty: str
+    doc: str = ""
+
+
+@dataclass(slots=True)
+class Schema:
+    name: str
+    simple_types: list[SimpleType]
+    types: list[ComplexType]
+    roots: list[Root]
+
+
+def field_cpp(field: Field) -> str:
+    default = ""
+    if field.default != "-":
+        default = f" = {field.default}"
+        if field.ty == "std::string":
+            default = f' = "{field.default}"'
+    comment = ""
+    if field.values != "" or field.comment != "":
+        comment = f" // {field.values} {field.comment}"
+    return f"{field.ty} {field.name}{default};{comment}"
+
+
+def class_cpp(comp: Component) -> str:
+    fields = "".join(f"\t{field_cpp(field)}\n" for field in comp.fields)
+    return f"class {comp.name} {{\n{fields}}};"
+
+
+def class_doc(
+    comp: Component,
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+) -> str:
+    if docs == "none":
+        return ""
+    if docs == "once":
+        # fields that become attributes carry their comment on the attribute already
+        comp = Component(
+            comp.name,
+            [
+                (
+                    Field(field.name, field.ty, field.default, "", "")
+                    if isinstance(get_xml_type(field.name, field.ty, config_types), list)
+                    else field
+                )
+                for field in comp.fields
+            ],
+        )
+    return class_cpp(comp)
+
+
+def builtin_types(used: set[str]) -> list[SimpleType]:
+    types = []
+    if "NoitaBool" in used:
+        types.append(SimpleType("NoitaBool", variants=["0", "1"]))
+    if "Hex8" in used:
+        types.append(SimpleType("Hex8", pattern=HEX8_PATTERN))
+    return types
+
+
+def enum_type(enum: Enum) -> SimpleType:
+    return SimpleType(enum.name, variants=enum.variants)
+
+
+def component_type(
+    comp: Component,
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+) -> ComplexType:
+    """A component or config with its own fields, the attributes every component has
+    are common_attributes"""
+    attributes: list[Attribute] = []
+    children: list[Child] = []
+    unknown: list[UnknownField] = []
+    for f in comp.fields:
+        tys = get_xml_type(f.name, f.ty, config_types)
+        if type(tys) is str:
+            children.append(Child(f.name, tys))
+            continue
+        if len(tys) == 0:
+            unknown.append(UnknownField(f.name, f.ty, len(attributes)))
+            continue
+        doc = field_cpp(f) if docs != "none" else ""
+        for i, (suffix, ty) in enumerate(tys):
+            true_type = get_type_for_sub_field(f.name, ty, comp.name)
+            attributes.append(
+                Attribute(
+                    f.name + suffix,
+                    true_type,
+                    get_default_for_sub_field(f, true_type, comp.name),
+                    doc=doc if docs == "full" or i == 0 else "",
+                )
+            )
+    return ComplexType(
+        comp.name,
+        attributes,
+        children,
+        doc=class_doc(comp, config_types, docs),
+        unknown=unknown,
+    )
+
+
+def common_attributes(layout: Layout = "classic") -> list[Attribute]:
+    attributes = [
+        Attribute(name, attribute["type"], attribute.get("default"))
+        for name, attribute in COMMON_ATTRIBUTES.items()
+    ]
+    if layout == "collapsed":
+        attributes.append(Attribute("_remove_from_base", "NoitaBool"))
+    return attributes
+
+
+def component_base_type(name: str) -> ComplexType:
+    """The classic layout's {name}Base, what a component inside <Base> is"""
+    return ComplexType(
+        f"{name}Base", [Attribute("_remove_from_base", "NoitaBool")], extends=name
+    )
+
+
+def transform_type(docs: DocsMode = "full") -> ComplexType:
+    attributes = [
+        Attribute(
+            f"{name}{suffix}",
+            "xsd:decimal",
+            "1" if name == "scale" else "0",
+            doc=(
+                transform[name]
+                if docs == "full" or (docs == "once" and suffix != ".y")
+                else ""
+            ),
+        )
+        for name, suffix in [
+            ("position", ".x"),
+            ("position", ".y"),
+            ("scale", ".x"),
+            ("scale", ".y"),
+            ("rotation", ""),
+        ]
+    ]
+    doc = ""
+    if docs != "none":
+        fields = "".join(
+            f"\t{transform[name]}\n" for name in ["position", "scale", "rotation"]
+        )
+        doc = f"class types::xform {{\n{fields}}};"
+    return ComplexType("Transform", attributes, doc=doc)
+
+
+def entity_types(
+    components: list[Component], layout: Layout = "classic"
+) -> list[ComplexType]:
+    """Entity, and for the classic layout EntityBase, whose components are the
+    {name}Base types"""
+    suffixes = [("Entity", "")]
+    if layout == "classic":
+        suffixes.append(("EntityBase", "Base"))
+    attributes = [
+        Attribute(name, attribute["type"], attribute.get("default"))
+        for name, attribute in ENTITY_ATTRIBUTES.items()
+    ]
+    return [
+        ComplexType(
+            name,
+            attributes,
+            [
+                Child("Entity", "Entity"),
+                Child("Base", "Base"),
+                Child("_Transform", "Transform"),
+            ]
+            + [Child(comp.name, f"{comp.name}{suffix}") for comp in components],
+            "choice",
+            mixed=False,
+        )
+        for name, suffix in suffixes
+    ]
+
+
+def base_type(layout: Layout = "classic") -> ComplexType:
+    return ComplexType(
+        "Base",
+        [
+            Attribute("file", "xsd:string", required=True),
+            Attribute("include_children", "NoitaBool"),
+        ],
+        extends="EntityBase" if layout == "classic" else "Entity",
+        mixed=False,
+        doc="Base file",
+    )
+
+
+def entity_root() -> Root:
+    return Root(
+        "Entity", "Entity", "Represents an entity that can be loaded into the world"
+    )
+
+
+def entity_schema(
+    components: list[Component],
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+    layout: Layout = "classic",
+) -> Schema:
+    types = [transform_type(docs)]
+    types += [component_type(config, config_types, docs) for config in configs]
+    common = common_attributes(layout)
+    for comp in components:
+        ty = component_type(comp, config_types, docs)
+        ty.attributes += common
+        types.append(ty)
+        if layout == "classic":
+            types.append(component_base_type(comp.name))
+    types += entity_types(components, layout)
+    types.append(base_type(layout))
+    used = {attribute.ty for ty in types for attribute in ty.attributes}
+    simple_types = builtin_types(used) + [enum_type(enum) for enum in enums]
+    return Schema("entity", simple_types, types, [entity_root()])
+
+
+def json_field(attribute: dict) -> Field:
+    return Field(
+        attribute["name"],
+        attribute["type"],
+        attribute.get("default", "-"),
+        "",
+        attribute.get("doc", ""),
+    )
+
+
+def json_attribute(
+    attribute: dict,
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+) -> Attribute:
+    required = attribute.get("required", False)
+    return Attribute(
+        attribute["name"],
+        get_xml_type("", attribute["type"], config_types)[0][1],
+        None if required else attribute.get("default"),
+        required,
+        field_cpp(json_field(attribute)) if docs != "none" else "",
+    )
+
+
+def json_type(
+    name: str,
+    class_name: str,
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+) -> ComplexType:
+    """The element whose attributes are listed in src/{name}.json"""
+    attributes_json = load_json(name)
+    doc = ""
+    if docs != "none":
+        fields = [json_field(attribute) for attribute in attributes_json]
+        doc = class_cpp(Component(class_name, fields))
+    return ComplexType(
+        class_name,
+        [json_attribute(attribute, config_types, docs) for attribute in attributes_json],
+        doc=doc,
+    )
+
+
+def json_schema(name: str, root: str, docs: DocsMode = "full") -> Schema:
+    """mod.xsd and magic_numbers.xsd, a single element with the attributes in
+    src/{name}.json"""
+    ty = json_type(name, root, docs=docs)
+    return Schema(
+        name,
+        builtin_types({attribute.ty for attribute in ty.attributes}),
+        [ty],
+        [Root(root, root)],
+    )
+
+
+def build_schemas(
+    components: list[Component],
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+) -> list[Schema]:
+    """The schemas that are made entirely from the model and src/*.json. materials.xsd,
+    sprite.xsd and biomes_all.xsd are mostly hand written and stay xsd only"""
+    return [
+        entity_schema(components, configs, enums, config_types),
+        json_schema("mod", "Mod"),
+        json_schema("magic_numbers", "MagicNumbers"),
+    ]
@@ -0,0 +1,199 @@
+import argparse
+import json
+import sys
+from bisect import bisect_left
+from typing import IO
+
+# a JSON-RPC 2.0 server over stdio answering completion and hover requests from the index
+# generate.py --index writes, one request per line in and one response per line out:
+#   {"jsonrpc": "2.0", "id": 1, "method": "completions", "params": {"element": "DamageModelComponent", "prefix": "hp"}}
+#   {"jsonrpc": "2.0", "id": 2, "method": "values", "params": {"element": "VerletPhysicsComponent", "attribute": "type"}}
+#   {"jsonrpc": "2.0", "id": 3, "method": "hover", "params": {"name": "DamageModelComponent.hp"}}
+# element is the tag the cursor is in, parent optionally the tag around it (components inside
+# <Base> accept a few more attributes)
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class NotInIndex(Exception):
+    pass
+
+
+def with_prefix(names: list[str], prefix: str) -> list[str]:
+    """The names in the sorted list names starting with prefix"""
+    start = bisect_left(names, prefix)
+    end = start
+    while end < len(names) and names[end].startswith(prefix):
+        end += 1
+    return names[start:end]
+
+
+class IndexLookup:
+    def __init__(self, index: dict):
+        self.elements: dict[str, dict] = index["elements"]
+        self.enums: dict[str, list[str]] = index["enums"]
+        self.roots: list[str] = index["roots"]
+        # sorted once so a prefix is a binary search
+        self.attribute_names = {
+            name: sorted(element["attributes"])
+            for name, element in self.elements.items()
+        }
+        self.child_names = {
+            name: sorted(element["children"])
+            for name, element in self.elements.items()
+        }
+        self.extra_attributes = {
+            name: element["child_attributes"]
+            for name, element in self.elements.items()
+            if "child_attributes" in element
+        }
+
+    def resolve(self, name: str, parent: str | None = None) -> str:
+        """The element a tag is, a tag inside parent can be a different element than the
+        same tag somewhere else (<_Transform> is a Transform)"""
+        if parent is not None:
+            parent_element = self.elements.get(parent)
+            if parent_element is not None:
+                name = parent_element["children"].get(name, name)
+        if name not in self.elements:
+            raise NotInIndex(f"unknown element {name}")
+        return name
+
+    def element(self, name: str, parent: str | None = None) -> dict:
+        return self.elements[self.resolve(name, parent)]
+
+    def attribute(
+        self, element: str, attribute: str, parent: str | None = None
+    ) -> dict:
+        found = self.element(element, parent)["attributes"].get(attribute)
+        if found is None and parent is not None:
+            found = self.extra_attributes.get(parent, {}).get(attribute)
+        if found is None:
+            raise NotInIndex(f"{element} has no attribute {attribute}")
+        return found
+
+    def completions(
+        self, element: str, prefix: str = "", parent: str | None = None
+    ) -> list[dict]:
+        name = self.resolve(element, parent)
+        table = self.elements[name]
+        items = []
+        for attribute in with_prefix(self.attribute_names[name], prefix):
+            found = table["attributes"][attribute]
+            items.append({"label": attribute, "kind": "attribute"} | found)
+        for attribute, found in self.extra_attributes.get(parent or "", {}).items():
+            if attribute.startswith(prefix):
+                items.append({"label": attribute, "kind": "attribute"} | found)
+        for child in with_prefix(self.child_names[name], prefix):
+            items.append(
+                {"label": child, "kind": "element", "type": table["children"][child]}
+            )
+        return items
+
+    def values(
+        self, element: str, attribute: str, prefix: str = "", parent: str | None = None
+    ) -> list[str]:
+        ty = self.attribute(element, attribute, parent)["type"]
+        variants = self.enums.get(ty, [])
+        return [variant for variant in variants if variant.startswith(prefix)]
+
+    def hover(
+        self,
+        element: str | None = None,
+        attribute: str | None = None,
+        parent: str | None = None,
+        name: str | None = None,
+    ) -> dict:
+        if name is not None:
+            # element names have no dots, attribute names might (position.x)
+            element, _, attribute = name.partition(".")
+            attribute = attribute or None
+        if element is None:
+            raise NotInIndex("hover needs an element or a name")
+        if attribute is None:
+            return {"doc": self.element(element, parent)["doc"]}
+        return self.attribute(element, attribute, parent)
+
+
+def handle(lookup: IndexLookup, request) -> dict | None:
+    """The response to one request, None for notifications"""
+    if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+        return error_response(None, INVALID_REQUEST, "invalid request")
+    request_id = request.get("id")
+    method = request["method"]
+    params = request.get("params", {})
+    function = {
+        "completions": lookup.completions,
+        "values": lookup.values,
+        "hover": lookup.hover,
+    }.get(method)
+    if function is None:
+        response = error_response(
+            request_id, METHOD_NOT_FOUND, f"unknown method {method}"
+        )
+    elif not isinstance(params, dict):
+        response = error_response(
+            request_id, INVALID_PARAMS, "params must be an object"
+        )
+    elif any(not isinstance(value, (str, type(None))) for value in params.values()):
+        # every parameter of every method is a name or a prefix
+        response = error_response(
+            request_id, INVALID_PARAMS, "params must be strings or null"
+        )
+    else:
+        try:
+            result = function(**params)
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except (NotInIndex, TypeError) as e:
+            response = error_response(request_id, INVALID_PARAMS, str(e))
+        except Exception as e:
+            # one bad request mustn't take the server down for the editor
+            response = error_response(
+                request_id, INTERNAL_ERROR, f"{type(e).__name__}: {e}"
+            )
+    return response if "id" in request else None
+
+
+def error_response(request_id, code: int, message: str) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": code, "message": message},
+    }
+
+
+def serve(lookup: IndexLookup, stdin: IO[str], stdout: IO[str]):
+    for line in stdin:
+        if line.strip() == "":
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            response = error_response(None, PARSE_ERROR, str(e))
+        else:
+            response = handle(lookup, request)
+        if response is not None:
+            stdout.write(json.dumps(response) + "\n")
+            stdout.flush()
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Answer completion and hover requests for entity files over stdio (JSON-RPC 2.0, one message per line)"
+    )
+    arg_parser.add_argument(
+        "index",
+        nargs="?",
+        default="./out/index.json",
+        help="index written by generate.py --index",
+    )
+    args = arg_parser.parse_args(argv)
+    serve(IndexLookup(json.load(open(args.index, "r"))), sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
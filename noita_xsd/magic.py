@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections.abc import Iterator
+from xml.parsers import expat
+
+from .model import get_xml_type
+from .native import BUILTIN_CHECKS, Tables, describe_invalid
+from .parse import load_json
+from .records import record
+from .trigram import TrigramIndex
+
+# a magic number with a typo in its name does nothing in game and magic_numbers.xsd can only
+# say the attribute isn't allowed. This checks magic_numbers.xml files against the names and
+# types in src/magic_numbers.json and suggests the names closest to an unknown one from a
+# trigram index (trigram.py)
+
+TAG_NAME_PATTERN = re.compile(rb"<[^\s/>]+")
+ATTRIBUTE_PATTERN = re.compile(rb"""\s*([^\s=/>]+)\s*=\s*(?:"[^"]*"|'[^']*')""")
+
+
+def find_magic_numbers_files(paths: list[str]) -> Iterator[str]:
+    for path in paths:
+        # files named on the command line are checked whatever they are called
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            if "magic_numbers.xml" in file_names:
+                yield os.path.join(dir_path, "magic_numbers.xml")
+
+
+def attribute_lines(data: bytes, offset: int, line: int) -> dict[str, int]:
+    """The line of every attribute of the start tag at offset (on line), counted in one
+    pass over the tag"""
+    lines: dict[str, int] = {}
+    found = TAG_NAME_PATTERN.match(data, offset)
+    if found is None:
+        return lines
+    position = found.end()
+    while (found := ATTRIBUTE_PATTERN.match(data, position)) is not None:
+        line += data.count(b"\n", position, found.start(1))
+        lines.setdefault(found.group(1).decode("utf-8", "replace"), line)
+        line += data.count(b"\n", found.start(1), found.end())
+        position = found.end()
+    return lines
+
+
+class MagicNumbersChecker:
+    def __init__(self):
+        self.types = {
+            attribute["name"]: get_xml_type("", attribute["type"])[0][1]
+            for attribute in load_json("magic_numbers")
+        }
+        self.index = TrigramIndex(self.types)
+        # describe_invalid only looks at the enums, NoitaBool being the only one here
+        self.tables = Tables({}, {}, BUILTIN_CHECKS)
+
+    def check(self, path: str) -> list[dict]:
+        """Error records like validate.validate_file's, with suggestions for unknown names"""
+        errors: list[dict] = []
+        try:
+            data = open(path, "rb").read()
+        except OSError as e:
+            return [
+                record(path, "magic_numbers", 0, "fatal", type(e).__name__, str(e))
+            ]
+        parser = expat.ParserCreate()
+        depth = 0
+
+        def start(name: str, attributes: dict[str, str]):
+            nonlocal depth
+            depth += 1
+            line = parser.CurrentLineNumber
+            if depth != 1 or name != "MagicNumbers":
+                errors.append(
+                    record(
+                        path,
+                        "magic_numbers",
+                        line,
+                        "error",
+                        "SCHEMAV_CVC_ELT_1" if depth == 1 else "SCHEMAV_ELEMENT_CONTENT",
+                        f"Element '{name}': This element is not expected.",
+                    )
+                )
+                return
+            # all the numbers are attributes of the one element, their lines are only
+            # looked for once there is something to report
+            lines: dict[str, int] | None = None
+            offset = parser.CurrentByteIndex
+            for attribute, value in attributes.items():
+                ty = self.types.get(attribute)
+                check = BUILTIN_CHECKS[ty] if ty is not None else None
+                if ty is not None and (check is None or check(value)):
+                    continue
+                if lines is None:
+                    lines = attribute_lines(data, offset, line)
+                at = lines.get(attribute, line)
+                if ty is None:
+                    errors.append(
+                        record(
+                            path,
+                            "magic_numbers",
+                            at,
+                            "error",
+                            "SCHEMAV_CVC_COMPLEX_TYPE_3_2_1",
+                            f"Element '{name}', attribute '{attribute}': The attribute '{attribute}' is not allowed.",
+                            self.index.suggest(attribute),
+                        )
+                    )
+                    continue
+                problem = describe_invalid(self.tables, ty, value)
+                errors.append(
+                    record(
+                        path,
+                        "magic_numbers",
+                        at,
+                        "error",
+                        problem[0],
+                        f"Element '{name}', attribute '{attribute}': {problem[1]}",
+                    )
+                )
+
+        def end(name: str):
+            nonlocal depth
+            depth -= 1
+
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        try:
+            parser.Parse(data, True)
+        except expat.ExpatError as e:
+            errors.append(
+                record(
+                    path,
+                    "magic_numbers",
+                    e.lineno,
+                    "fatal",
+                    type(e).__name__,
+                    str(e),
+                    column=e.offset,
+                )
+            )
+        return errors
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Check the names and values in magic_numbers.xml files, printing one json error per line"
+    )
+    arg_parser.add_argument(
+        "paths",
+        nargs="+",
+        help="magic_numbers.xml files, or directories to search for them",
+    )
+    args = arg_parser.parse_args(argv)
+
+    start = time.perf_counter()
+    checker = MagicNumbersChecker()
+    files = invalid = 0
+    for path in find_magic_numbers_files(args.paths):
+        files += 1
+        errors = checker.check(path)
+        invalid += len(errors) != 0
+        for error in errors:
+            sys.stdout.write(json.dumps(error) + "\n")
+    elapsed = time.perf_counter() - start
+    print(
+        f"{files} files, {invalid} invalid in {elapsed * 1000:.1f}ms "
+        f"({len(checker.types)} magic numbers known)",
+        file=sys.stderr,
+    )
+    if invalid != 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
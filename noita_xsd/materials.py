@@ -0,0 +1,299 @@
+import argparse
+import json
+import sys
+import time
+from dataclasses import dataclass
+from xml.parsers import expat
+
+from .parse import load_json
+from .records import record
+from .trigram import TrigramIndex
+
+# the schema can only say an attribute is a string, this checks that the strings naming
+# materials and [tags] point at something. All files are indexed in one expat pass, the
+# references are only looked at once every material is known since a reaction may come
+# before the materials it uses, or sit in another file of the modpack
+
+MATERIAL_ELEMENTS = {"CellData", "CellDataChild"}
+REACTION_ELEMENTS = {"Reaction", "ReqReaction"}
+# attributes that name a material, or a [tag] with an optional suffix for reactions
+REACTION_REFERENCES = [
+    "input_cell1",
+    "input_cell2",
+    "input_cell3",
+    "output_cell1",
+    "output_cell2",
+    "output_cell3",
+]
+MATERIAL_REFERENCES = {
+    "Reaction": ["cosmetic_particle"],
+    "ReqReaction": ["cosmetic_particle"],
+    "CellData": [
+        "cold_freezes_to_material",
+        "convert_to_box2d_material",
+        "on_fire_convert_to_material",
+        "on_fire_flame_material",
+        "on_fire_smoke_material",
+        "solid_break_to_type",
+        "solid_on_collision_material",
+        "warmth_melts_to_material",
+    ],
+}
+MATERIAL_REFERENCES["CellDataChild"] = MATERIAL_REFERENCES["CellData"]
+# a CellDataChild starts out as a copy of its _parent
+INHERITED = ["tags", "cell_type", "liquid_sand"]
+
+
+@dataclass
+class Material:
+    name: str
+    file: str
+    line: int
+    # the attributes in INHERITED, None where this definition doesn't set them
+    attributes: dict[str, str | None]
+    parent: str | None = None
+
+
+@dataclass
+class Reference:
+    file: str
+    line: int
+    element: str
+    attribute: str
+    value: str
+
+
+def material_defaults() -> dict[str, str]:
+    defaults = {
+        attribute["name"]: attribute["default"] for attribute in load_json("materials")
+    }
+    return {name: defaults[name] for name in INHERITED}
+
+
+class MaterialIndex:
+    def __init__(self):
+        self.materials: dict[str, Material] = {}
+        self.references: list[Reference] = []
+        self.errors: list[dict] = []
+        self.defaults = material_defaults()
+        # filled in by finish()
+        self.tags: dict[str, list[str]] = {}
+        # materials or tags -> their trigram index, built for the first unknown name
+        self.indexes: dict[str, TrigramIndex] = {}
+
+    def add_file(self, path: str):
+        parser = expat.ParserCreate()
+
+        def start(name: str, attributes: dict[str, str]):
+            line = parser.CurrentLineNumber
+            if name in MATERIAL_ELEMENTS:
+                self.add_material(path, line, name, attributes)
+            elif name in REACTION_ELEMENTS:
+                for attribute in REACTION_REFERENCES:
+                    value = attributes.get(attribute, "")
+                    if value != "":
+                        self.references.append(
+                            Reference(path, line, name, attribute, value)
+                        )
+            for attribute in MATERIAL_REFERENCES.get(name, []):
+                value = attributes.get(attribute, "")
+                if value != "":
+                    self.references.append(Reference(path, line, name, attribute, value))
+
+        parser.StartElementHandler = start
+        try:
+            parser.Parse(open(path, "rb").read(), True)
+        except (expat.ExpatError, OSError) as e:
+            self.errors.append(
+                record(
+                    path,
+                    "materials",
+                    getattr(e, "lineno", 0),
+                    "fatal",
+                    type(e).__name__,
+                    str(e),
+                    column=getattr(e, "offset", 0),
+                )
+            )
+
+    def add_material(
+        self, path: str, line: int, element: str, attributes: dict[str, str]
+    ):
+        name = attributes.get("name")
+        if name is None:
+            self.errors.append(
+                record(
+                    path,
+                    "materials",
+                    line,
+                    "error",
+                    "MATERIAL_WITHOUT_NAME",
+                    f"<{element}> has no name",
+                )
+            )
+            return
+        previous = self.materials.get(name)
+        if previous is not None:
+            self.errors.append(
+                record(
+                    path,
+                    "materials",
+                    line,
+                    "warning",
+                    "DUPLICATE_MATERIAL",
+                    f"material '{name}' overwrites the one defined at {previous.file}:{previous.line}",
+                )
+            )
+        parent = attributes.get("_parent") if element == "CellDataChild" else None
+        if parent:
+            self.references.append(Reference(path, line, element, "_parent", parent))
+        self.materials[name] = Material(
+            name,
+            path,
+            line,
+            {attribute: attributes.get(attribute) for attribute in INHERITED},
+            parent,
+        )
+
+    def resolve(self, material: Material, attribute: str) -> str:
+        """The attribute's value after inheritance, falling back to the default"""
+        seen = set()
+        while True:
+            value = material.attributes[attribute]
+            if value is not None:
+                return value
+            parent = self.materials.get(material.parent) if material.parent else None
+            if parent is None or parent.name in seen:
+                return self.defaults[attribute]
+            seen.add(parent.name)
+            material = parent
+
+    def finish(self):
+        """Works out the tags of every material, including the implicit ones"""
+        tags: dict[str, list[str]] = {"[*]": []}
+        for material in self.materials.values():
+            names = [tag.strip() for tag in self.resolve(material, "tags").split(",")]
+            if self.resolve(material, "cell_type") == "liquid":
+                if self.resolve(material, "liquid_sand") in ("1", "true"):
+                    names.append("[any_powder]")
+                else:
+                    names.append("[any_liquid]")
+            names.append("[*]")
+            for tag in dict.fromkeys(names):
+                if tag != "":
+                    tags.setdefault(tag, []).append(material.name)
+        self.tags = tags
+        self.indexes = {}
+
+    def suggest(self, name: str, kind: str) -> list[str]:
+        index = self.indexes.get(kind)
+        if index is None:
+            index = TrigramIndex(self.materials if kind == "materials" else self.tags)
+            self.indexes[kind] = index
+        return index.suggest(name)
+
+    def check(self) -> list[dict]:
+        """The problems found, call after all files are added"""
+        self.finish()
+        errors = list(self.errors)
+        # reactions like [meltable]_molten turn every material with the tag into the material
+        # of the same name plus the suffix, those only have to be checked once
+        checked_suffixes: set[tuple[str, str]] = set()
+        for reference in self.references:
+            value = reference.value
+            if value[0] != "[" or reference.attribute not in REACTION_REFERENCES:
+                if value not in self.materials:
+                    errors.append(
+                        record(
+                            reference.file,
+                            "materials",
+                            reference.line,
+                            "error",
+                            "UNKNOWN_MATERIAL",
+                            f"{reference.element} {reference.attribute}: no material is called '{value}'",
+                            self.suggest(value, "materials"),
+                        )
+                    )
+                continue
+            end = value.find("]")
+            tag, suffix = value[: end + 1], value[end + 1 :]
+            tagged = self.tags.get(tag)
+            if tagged is None:
+                errors.append(
+                    record(
+                        reference.file,
+                        "materials",
+                        reference.line,
+                        "error",
+                        "UNKNOWN_TAG",
+                        f"{reference.element} {reference.attribute}: no material has the tag '{tag}'",
+                        self.suggest(tag, "tags"),
+                    )
+                )
+                continue
+            if suffix == "" or (tag, suffix) in checked_suffixes:
+                continue
+            checked_suffixes.add((tag, suffix))
+            missing = [name for name in tagged if name + suffix not in self.materials]
+            if len(missing) != 0:
+                errors.append(
+                    record(
+                        reference.file,
+                        "materials",
+                        reference.line,
+                        "warning",
+                        "MISSING_TAG_SUFFIX_MATERIAL",
+                        f"{reference.element} {reference.attribute}: '{value}' needs a material "
+                        f"'{{name}}{suffix}' for every material tagged {tag}, "
+                        f"{len(missing)} are missing: {', '.join(missing[:5])}{', …' if len(missing) > 5 else ''}",
+                    )
+                )
+        return errors
+
+
+def check_materials(paths: list[str]) -> list[dict]:
+    index = MaterialIndex()
+    for path in paths:
+        index.add_file(path)
+    return index.check()
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Check that the materials and [tags] named in materials files exist, printing one json error per line"
+    )
+    arg_parser.add_argument(
+        "paths",
+        nargs="+",
+        help="materials files, all of them are checked as one set (e.g. the game's and every mod's)",
+    )
+    arg_parser.add_argument(
+        "--no-warnings",
+        action="store_true",
+        help="only report errors, not duplicate materials or tag suffixes without a material",
+    )
+    args = arg_parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = MaterialIndex()
+    for path in args.paths:
+        index.add_file(path)
+    errors = index.check()
+    elapsed = time.perf_counter() - start
+    failed = False
+    for error in errors:
+        if error["level"] == "warning" and args.no_warnings:
+            continue
+        failed = failed or error["level"] != "warning"
+        sys.stdout.write(json.dumps(error) + "\n")
+    print(
+        f"{len(index.materials)} materials, {len(index.tags)} tags, "
+        f"{len(index.references)} references checked in {elapsed * 1000:.1f}ms",
+        file=sys.stderr,
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from lxml import etree
+
+from .model import (
+    COMPONENT_TYPE_DEFAULTS,
+    ENUM_DEFAULTS,
+    Component,
+    Field,
+    format_decimal,
+    get_default_for_sub_field,
+    get_type_for_sub_field,
+    get_xml_type,
+)
+from .native import DECIMAL_PATTERN, INT_PATTERN, XSD_WHITESPACE
+from .parse import DEFAULT_DOCS_PATH, load_json
+from .snapshot import load_model
+
+# shipped mods are full of attributes set to the value they'd have anyway, which the game
+# parses and applies on every load. This drops them, along with comments, blank text and empty
+# _Transforms, and writes numbers the way the schemas do. Only defaults that are really known
+# count: the ones in the docs and src/*.json, the enum default tables and "" for strings.
+# The "0" the schemas fall back to for fields without a documented default could be wrong.
+# Anything that is applied on top of other values keeps its attributes: the contents of <Base>,
+# CellDataChild (inherits from _parent) and magic_numbers.xml (can undo another mod's change)
+
+STRING_TYPES = {"std::string", "std_string", "string"}
+NUMERIC_TYPES = {
+    "xsd:decimal": DECIMAL_PATTERN,
+    "xsd:int": INT_PATTERN,
+    "xsd:unsignedInt": INT_PATTERN,
+}
+
+
+@dataclass
+class DefaultTable:
+    # attribute name -> (xsd type, default value or None where it isn't known)
+    attributes: dict[str, tuple[str, str | None]]
+    # child element name -> name of its DefaultTable, other children are left alone
+    children: dict[str, str]
+    # children that are the same as no child at all once they are empty
+    optional: frozenset[str] = frozenset()
+
+
+def known_default(field: Field, ty: str, component_name: str) -> str | None:
+    if (ty, component_name) in COMPONENT_TYPE_DEFAULTS or ty in ENUM_DEFAULTS:
+        return get_default_for_sub_field(field, ty, component_name)
+    if field.default != "-":
+        # ints holding a material's name have a material id as their default
+        if ty == "xsd:string" and field.ty not in STRING_TYPES:
+            return None
+        return get_default_for_sub_field(field, ty, component_name)
+    if ty == "xsd:string" and field.ty in STRING_TYPES:
+        return ""
+    return None
+
+
+def compile_defaults(
+    comp: Component, config_types: set[str] | frozenset[str]
+) -> DefaultTable:
+    table = DefaultTable({}, {})
+    for f in comp.fields:
+        tys = get_xml_type(f.name, f.ty, config_types)
+        if type(tys) is str:
+            table.children[f.name] = tys.split("::")[-1]
+            continue
+        for suffix, ty in tys:
+            ty = get_type_for_sub_field(f.name, ty, comp.name)
+            # a vec2's default is written for both parts together, if at all
+            default = known_default(f, ty, comp.name) if len(tys) == 1 else None
+            table.attributes[f.name + suffix] = (ty, default)
+    # objects and configs are fields, an empty one is left as it was constructed
+    table.optional = frozenset(table.children)
+    return table
+
+
+def json_attributes(name: str) -> dict[str, tuple[str, str | None]]:
+    return {
+        attribute["name"]: (
+            get_xml_type("", attribute["type"])[0][1],
+            None if attribute.get("default", "-") == "-" else attribute["default"],
+        )
+        for attribute in load_json(name)
+    }
+
+
+def compile_default_tables(
+    components: list[Component],
+    configs: list[Component],
+    config_types: set[str] | frozenset[str] = frozenset(),
+) -> dict[str, DefaultTable]:
+    tables = {
+        "Transform": DefaultTable(
+            {
+                "position.x": ("xsd:decimal", "0"),
+                "position.y": ("xsd:decimal", "0"),
+                "scale.x": ("xsd:decimal", "1"),
+                "scale.y": ("xsd:decimal", "1"),
+                "rotation": ("xsd:decimal", "0"),
+            },
+            {},
+        )
+    }
+    for config in configs:
+        tables[config.name] = compile_defaults(config, config_types)
+    common = {"_tags": ("xsd:string", ""), "_enabled": ("NoitaBool", "1")}
+    for comp in components:
+        table = compile_defaults(comp, config_types)
+        table.attributes |= common
+        tables[comp.name] = table
+    tables["Entity"] = DefaultTable(
+        {"serialize": ("NoitaBool", "1")},
+        {"Entity": "Entity", "_Transform": "Transform"}
+        | {comp.name: comp.name for comp in components},
+        frozenset(["_Transform"]),
+    )
+    explosion = {"ExplosionConfig": "ConfigExplosion"}
+    tables["Materials"] = DefaultTable(
+        {}, {"CellData": "CellData", "Reaction": "Reaction", "ReqReaction": "Reaction"}
+    )
+    tables["CellData"] = DefaultTable(json_attributes("materials"), explosion)
+    tables["Reaction"] = DefaultTable(json_attributes("reaction"), explosion)
+    tables["Mod"] = DefaultTable(json_attributes("mod"), {})
+    return tables
+
+
+def is_default(ty: str, value: str, default: str) -> bool:
+    pattern = NUMERIC_TYPES.get(ty)
+    if pattern is None:
+        return value == default
+    value = value.strip(XSD_WHITESPACE)
+    # python's float() also takes "1_0" and "infinity", the game doesn't
+    return pattern.fullmatch(value) is not None and float(value) == float(default)
+
+
+def normalize_number(ty: str, value: str) -> str:
+    pattern = NUMERIC_TYPES.get(ty)
+    stripped = value.strip(XSD_WHITESPACE)
+    if pattern is None or pattern.fullmatch(stripped) is None:
+        return value
+    if ty == "xsd:decimal":
+        normalized = format_decimal(stripped)
+        # format_decimal stops at 15 places, tiny values would become 0
+        if float(normalized) != float(stripped):
+            return value
+    else:
+        normalized = str(int(stripped))
+    return normalized if len(normalized) < len(value) else value
+
+
+@dataclass
+class MinifyResult:
+    path: str
+    before: int
+    after: int
+    stripped: int = 0
+    normalized: int = 0
+    # why the file was copied as is, None if it was minified
+    kept: str | None = None
+
+
+class Minifier:
+    def __init__(self, tables: dict[str, DefaultTable]):
+        self.tables = tables
+        self.parser = etree.XMLParser(
+            resolve_entities=False,
+            no_network=True,
+            remove_comments=True,
+            remove_blank_text=True,
+        )
+
+    def minify(self, path: str, out_path: str) -> MinifyResult:
+        data = open(path, "rb").read()
+        result = MinifyResult(path, len(data), len(data))
+        if os.path.basename(path) == "magic_numbers.xml":
+            result.kept = "magic numbers apply on top of other mods"
+            return self.keep(data, out_path, result)
+        try:
+            root = etree.fromstring(data, self.parser)
+        except etree.XMLSyntaxError as e:
+            # the game's parser takes things libxml2 doesn't, so leave those alone
+            result.kept = f"not well formed: {e}"
+            return self.keep(data, out_path, result)
+        if root.tag not in ("Entity", "Materials", "Mod"):
+            result.kept = f"no defaults known for <{root.tag}>"
+            return self.keep(data, out_path, result)
+        for element in root.iter():
+            # remove_blank_text leaves the whitespace of elements without children
+            if element.text is not None and element.text.isspace():
+                element.text = None
+            if element.tail is not None and element.tail.isspace():
+                element.tail = None
+        self.strip(root, root.tag, result)
+        minified = etree.tostring(root, encoding="utf-8")
+        result.after = len(minified)
+        if out_path != path or minified != data:
+            write(out_path, minified)
+        return result
+
+    def keep(self, data: bytes, out_path: str, result: MinifyResult) -> MinifyResult:
+        if out_path != result.path:
+            write(out_path, data)
+        return result
+
+    def strip(self, element: etree._Element, table_name: str, result: MinifyResult):
+        table = self.tables[table_name]
+        for name, value in element.attrib.items():
+            known = table.attributes.get(name)
+            if known is None:
+                continue
+            ty, default = known
+            if default is not None and is_default(ty, value, default):
+                del element.attrib[name]
+                result.stripped += 1
+                continue
+            normalized = normalize_number(ty, value)
+            if normalized != value:
+                element.set(name, normalized)
+                result.normalized += 1
+        # an empty optional child is the same as none, except for a _Transform keeping the
+        # transform of a <Base> out
+        has_base = element.find("Base") is not None
+        for child in list(element):
+            if not isinstance(child.tag, str):
+                continue
+            child_table = table.children.get(child.tag)
+            if child_table is None:
+                continue
+            self.strip(child, child_table, result)
+            if (
+                child.tag in table.optional
+                and not (child.tag == "_Transform" and has_base)
+                and len(child.attrib) == 0
+                and len(child) == 0
+                and child.text is None
+            ):
+                element.remove(child)
+
+
+def write(path: str, data: bytes):
+    directory = os.path.dirname(path)
+    if directory != "":
+        os.makedirs(directory, exist_ok=True)
+    open(path + ".tmp", "wb").write(data)
+    os.replace(path + ".tmp", path)
+
+
+def find_tasks(paths: Iterable[str], out_dir: str | None) -> Iterator[tuple[str, str]]:
+    """(xml file, where its minified version goes) for every xml file in paths, in place
+    when out_dir is None and mirroring each given directory into out_dir otherwise"""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path, path if out_dir is None else os.path.join(
+                out_dir, os.path.basename(path)
+            )
+            continue
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if not file_name.endswith(".xml"):
+                    continue
+                source = os.path.join(dir_path, file_name)
+                if out_dir is None:
+                    yield source, source
+                else:
+                    yield source, os.path.join(out_dir, os.path.relpath(source, path))
+
+
+# per process state, like validate.py's workers
+_minifier: Minifier | None = None
+
+
+def init_worker(docs_path: str):
+    global _minifier
+    model = load_model(docs_path)
+    _minifier = Minifier(
+        compile_default_tables(model.components, model.configs, model.config_types)
+    )
+
+
+def _minify_task(task: tuple[str, str]) -> MinifyResult:
+    assert _minifier is not None
+    try:
+        return _minifier.minify(*task)
+    except OSError as e:
+        return MinifyResult(task[0], 0, 0, kept=str(e))
+
+
+def minify_files(
+    tasks: Iterable[tuple[str, str]],
+    docs_path: str = DEFAULT_DOCS_PATH,
+    jobs: int | None = None,
+    chunk_size: int = 16,
+) -> Iterator[MinifyResult]:
+    """Minifies (source, destination) pairs over jobs processes (all cores by default),
+    yielding the results in input order"""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        init_worker(docs_path)
+        yield from map(_minify_task, tasks)
+        return
+    with multiprocessing.Pool(jobs, init_worker, (docs_path,)) as pool:
+        yield from pool.imap(_minify_task, tasks, chunk_size)
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Strip attributes set to their default value from entity, material and mod.xml files, along with comments and blank text"
+    )
+    arg_parser.add_argument(
+        "paths", nargs="+", help="xml files, or directories to search for *.xml files"
+    )
+    target = arg_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument(
+        "--out-dir",
+        help="write the xml files here, each directory given mirrored into it (files that can't be minified are copied)",
+    )
+    target.add_argument("--in-place", action="store_true", help="overwrite the files")
+    arg_parser.add_argument(
+        "--docs",
+        default=DEFAULT_DOCS_PATH,
+        help="component_documentation.txt the component defaults come from",
+    )
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of worker processes, defaults to the number of cores",
+    )
+    arg_parser.add_argument(
+        "-v", "--verbose", action="store_true", help="print a line for every file"
+    )
+    args = arg_parser.parse_args(argv)
+
+    start = time.perf_counter()
+    files = kept = stripped = normalized = before = after = 0
+    tasks = find_tasks(args.paths, None if args.in_place else args.out_dir)
+    for result in minify_files(tasks, args.docs, args.jobs):
+        files += 1
+        before += result.before
+        after += result.after
+        stripped += result.stripped
+        normalized += result.normalized
+        kept += result.kept is not None
+        if args.verbose:
+            detail = result.kept or (
+                f"{result.stripped} defaults stripped, {result.normalized} numbers rewritten"
+            )
+            print(f"{result.path}: {result.before} -> {result.after} bytes, {detail}")
+    elapsed = time.perf_counter() - start
+    print(
+        f"{files} files ({kept} kept as they were), {stripped} defaults stripped, "
+        f"{normalized} numbers rewritten, {before} -> {after} bytes "
+        f"({100 - after * 100 / before if before > 0 else 0:.1f}% smaller) in {elapsed:.2f}s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+from dataclasses import dataclass
+
+# these constants might need to be changed if your editor works differently to lemminx when generating hover docs, they are only used for hover info
+TAB = "&emsp;&emsp;&emsp;&emsp;"
+NL = "<br>"
+
+
+@dataclass(slots=True)
+class Field:
+    name: str
+    ty: str
+    default: str
+    values: str
+    comment: str
+
+
+@dataclass(slots=True)
+class Component:
+    name: str
+    fields: list[Field]
+
+
+@dataclass(slots=True)
+class Enum:
+    name: str
+    variants: list[str]
+
+
+def xml_encode(s: str) -> str:
+    return s.replace(">", "&gt;").replace("<", "&lt;")
+
+
+XmlType = list[tuple[str, str]] | str
+
+# how every C++ type shows up in the schema: a list of (attribute suffix, xsd type) for types
+# that become attributes, or the name of the complexType for the ones that become child elements.
+# types that aren't in here (pointers, vectors, EntityID...) are defined to be invalid
+DECIMAL = [("", "xsd:decimal")]
+STRING = [("", "xsd:string")]
+BUILTIN_XML_TYPES: dict[str, XmlType] = {
+    "Hex8": [("", "Hex8")],
+    "REACTION_DIRECTION": [("", "REACTION_DIRECTION")],
+    "StatusEffectType": [("", "GAME_EFFECT")],
+    "float": DECIMAL,
+    "double": DECIMAL,
+    "string": STRING,
+    "std::string": STRING,
+    "std_string": STRING,
+    "VEC_OF_MATERIALS": STRING,
+    "bool": [("", "NoitaBool")],
+    "vec2": [(".x", "xsd:decimal"), (".y", "xsd:decimal")],
+    "ivec2": [(".x", "xsd:int"), (".y", "xsd:int")],
+    "types::fcolor": [
+        (".r", "xsd:decimal"),
+        (".g", "xsd:decimal"),
+        (".b", "xsd:decimal"),
+        (".a", "xsd:decimal"),
+    ],
+    "ValueRange": [(".min", "xsd:decimal"), (".max", "xsd:decimal")],
+    "ValueRangeInt": [(".min", "xsd:int"), (".max", "xsd:int")],
+    "types::aabb": [
+        (".min_x", "xsd:decimal"),
+        (".min_y", "xsd:decimal"),
+        (".max_x", "xsd:decimal"),
+        (".max_y", "xsd:decimal"),
+    ],
+    "types::iaabb": [
+        (".min_x", "xsd:int"),
+        (".min_y", "xsd:int"),
+        (".max_x", "xsd:int"),
+        (".max_y", "xsd:int"),
+    ],
+    # objects
+    "types::xform": "Transform",
+}
+# enums that are used by their plain name, everything ending in ::Enum is one too
+ENUM_TYPES = [
+    "MATERIALAUDIO_TYPE",
+    "MOVETOSURFACE_TYPE",
+    "RAGDOLL_FX",
+    "INVENTORY_KIND",
+    "DAMAGE_TYPES",
+    "AUDIO_LAYER",
+    "GAME_EFFECT",
+    "PROJECTILE_TYPE",
+    "JOINT_TYPE",
+    "ARC_TYPE",
+    "HIT_EFFECT",
+    "MATERIALBREAKAUDIO_TYPE",
+    "EDGE_STYLE",
+    "EXPLOSION_TRIGGER_TYPE",
+    "LUA_VM_TYPE",
+    "FOG_OF_WAR_TYPE",
+    "NOISE_TYPE",
+    "GENERAL_NOISE",
+    "BIOME_TYPE",
+    "VERLET_TYPE",
+    "PARTICLE_EMITTER_CUSTOM_STYLE",
+]
+LENS = "LensValue"
+ENUM_SUFFIX = "::Enum"
+# checked in order for types without an exact entry
+INT_PREFIXES = [
+    ("int", [("", "xsd:int")]),
+    ("unsigned", [("", "xsd:unsignedInt")]),
+    ("uint", [("", "xsd:unsignedInt")]),
+]
+
+
+class TypeRegistry:
+    """Resolves C++ types to schema types, every type is only worked out once"""
+
+    def __init__(self, config_types: frozenset[str] = frozenset()):
+        self.exact: dict[str, XmlType] = (
+            BUILTIN_XML_TYPES
+            | {ty: ty for ty in config_types}
+            | {ty: [("", ty)] for ty in ENUM_TYPES}
+        )
+        self.cache: dict[tuple[str, bool], XmlType] = {}
+
+    def xml_type(self, name: str, ty: str) -> XmlType:
+        # ints (LensValue<int> too) named like a material hold the material's name
+        key = (ty, name[-len("material") :] == "material")
+        resolved = self.cache.get(key)
+        if resolved is None:
+            resolved = self.cache[key] = self.resolve(ty, key[1])
+        return resolved
+
+    def resolve(self, ty: str, material: bool) -> XmlType:
+        if ty == "int" and material:
+            return STRING
+        resolved = self.exact.get(ty)
+        if resolved is not None:
+            return resolved
+        if ty[-len(ENUM_SUFFIX) :] == ENUM_SUFFIX:
+            return [("", ty[: -len(ENUM_SUFFIX)])]
+        if ty[: len(LENS)] == LENS:
+            return self.resolve(ty[len(LENS) + 1 : -1], material)
+        for prefix, resolved in INT_PREFIXES:
+            if ty[: len(prefix)] == prefix:
+                return resolved
+        return []
+
+
+_registries: dict[frozenset[str], TypeRegistry] = {}
+
+
+def type_registry(config_types: set[str] | frozenset[str] = frozenset()) -> TypeRegistry:
+    if not isinstance(config_types, frozenset):
+        config_types = frozenset(config_types)
+    registry = _registries.get(config_types)
+    if registry is None:
+        registry = _registries[config_types] = TypeRegistry(config_types)
+    return registry
+
+
+def get_xml_type(
+    name: str, ty: str, config_types: set[str] | frozenset[str] = frozenset()
+) -> XmlType:
+    return type_registry(config_types).xml_type(name, ty)
+
+
+TYPE_DEFAULTS = {
+    "ARC_TYPE": "MATERIAL",
+    "VERLET_TYPE": "CHAIN",
+    "PROJECTILE_TYPE": "PROJECTILE",
+    "EXPLOSION_TRIGGER_TYPE": "ON_CREATE",
+    "HIT_EFFECT": "NONE",
+    "INVENTORY_KIND": "QUICK",
+    "LUA_VM_TYPE": "SHARED_BY_MANY_COMPONENTS",
+    "MOVETOSURFACE_TYPE": "ENTITY",
+    "PARTICLE_EMITTER_CUSTOM_STYLE": "NONE",
+    "JOINT_TYPE": "REVOLUTE_JOINT",
+    "PathFindingComponentState": "",
+    "TeleportComponentState": "",
+    "BIOME_TYPE": "BIOME_PROCEDURAL",
+    "FOG_OF_WAR_TYPE": "DEFAULT",
+    "NOISE_TYPE": "IQ2_SIMPLEX1234",
+    "GENERAL_NOISE": "SimplexNoise",
+    "AUDIO_LAYER": "EFFECT_GAME",
+}
+
+
+def format_decimal(value: str) -> str:
+    """Format a decimal string to remove scientific notation and trailing zeroes."""
+    value_float = float(value)
+    return f"{value_float:.15f}".rstrip("0").rstrip(".")
+
+
+# enums whose default depends on the component using them
+COMPONENT_TYPE_DEFAULTS = {
+    ("GAME_EFFECT", "GameEffectComponent"): "ELECTROCUTION",
+    ("RAGDOLL_FX", "ProjectileComponent"): "NORMAL",
+    ("DAMAGE_TYPES", "AreaDamageComponent"): "DAMAGE_PHYSICS_HIT",
+}
+ENUM_DEFAULTS = TYPE_DEFAULTS | {
+    "GAME_EFFECT": "NONE",
+    "RAGDOLL_FX": "NONE",
+    "DAMAGE_TYPES": "NONE",
+}
+
+
+def get_default_for_sub_field(field: Field, ty: str, component_name: str) -> str:
+    default = COMPONENT_TYPE_DEFAULTS.get((ty, component_name)) or ENUM_DEFAULTS.get(ty)
+    if default is not None:
+        return default
+
+    if field.default != "-":
+        if ty == "xsd:decimal":
+            return format_decimal(field.default)
+        return field.default
+
+    return "0" if ty != "xsd:string" else ""
+
+
+COMPONENTS_WITH_MATERIALS = {
+    "MaterialAreaCheckerComponent",
+    "PhysicsImageShapeComponent",
+    "MaterialSeaSpawnerComponent",
+    "ItemAlchemyComponent",
+    "AnimalAIComponent",
+}
+
+
+# fields whose schema type isn't the one their C++ type implies
+FIELD_TYPE_OVERRIDES = {
+    ("ParticleEmitterComponent", "color"): "Hex8",
+    ("GenomeDataComponent", "herd_id"): "xsd:string",
+}
+_sub_field_types: dict[tuple[str, str, str], str] = {}
+
+
+def get_type_for_sub_field(field_name: str, ty: str, component_name: str) -> str:
+    key = (component_name, field_name, ty)
+    true_type = _sub_field_types.get(key)
+    if true_type is None:
+        true_type = FIELD_TYPE_OVERRIDES.get((component_name, field_name))
+        if true_type is None:
+            if component_name in COMPONENTS_WITH_MATERIALS and "material" in field_name:
+                true_type = "xsd:string"
+            else:
+                true_type = ty
+        _sub_field_types[key] = true_type
+    return true_type
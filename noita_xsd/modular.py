@@ -0,0 +1,179 @@
+import re
+from collections import defaultdict
+from typing import Callable, Iterator
+
+from .model import Component, Enum
+from .output import BuiltinIncluder, Output
+from .render import (
+    BUILTIN_TYPES,
+    SCHEMA_END,
+    SCHEMA_START,
+    DocsMode,
+    Layout,
+    iter_entity_types,
+    iter_magic_numbers_schema,
+    iter_materials_schema,
+    iter_mod_schema,
+    join_chunks,
+    render_component,
+    render_component_attributes,
+    render_config,
+    render_enum,
+    render_transform,
+)
+
+# modular output: common.xsd holds the simple types every schema needs and types.xsd the enums
+# and configs shared by entities and materials, the other schemas include them instead of
+# carrying a copy, so a mod.xml doesn't have to load 360 component types
+COMMON_CONFIGS = ["ConfigDamageCritical", "ConfigExplosion"]
+DOMAINS = ["entity", "materials", "sprite", "biomes_all", "mod", "magic_numbers"]
+# merged.xsd has never contained sprite and biomes_all
+MERGED_DOMAINS = ["entity", "materials", "mod", "magic_numbers"]
+MODULAR_OUTPUTS = [
+    "modular/common",
+    "modular/types",
+    *(f"modular/{domain}" for domain in DOMAINS),
+    "modular/merged",
+]
+
+
+def include(path: str) -> str:
+    return f'\t<xsd:include schemaLocation="{path}"/>\n'
+
+
+def component_family(name: str) -> str:
+    # first word of the name, AIAttackComponent -> AI, PhysicsBodyComponent -> Physics
+    words = re.findall(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z0-9]+|[A-Z]+", name)
+    return words[0] if len(words) != 0 else name
+
+
+def component_families(components: list[Component]) -> dict[str, list[Component]]:
+    families: dict[str, list[Component]] = defaultdict(list)
+    for component in components:
+        families[component_family(component.name)].append(component)
+    grouped: dict[str, list[Component]] = defaultdict(list)
+    for family, members in families.items():
+        grouped[family if len(members) > 1 else "Misc"].extend(members)
+    return dict(sorted(grouped.items()))
+
+
+def iter_types_schema(
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+) -> Iterator[str]:
+    yield SCHEMA_START
+    yield include("common.xsd")
+    yield "\t"
+    yield from join_chunks("\n", (render_enum(enum) for enum in enums))
+    for config in configs:
+        if config.name in COMMON_CONFIGS:
+            yield "\n"
+            yield render_config(config, config_types, docs)
+    yield SCHEMA_END
+
+
+def iter_components(
+    components: list[Component],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+    layout: Layout = "classic",
+) -> Iterator[str]:
+    yield from join_chunks(
+        "\n",
+        (
+            render_component(component, config_types, docs, layout)
+            for component in components
+        ),
+    )
+
+
+def iter_modular_entity_schema(
+    components: list[Component],
+    configs: list[Component],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+    layout: Layout = "classic",
+    families: list[str] | None = None,
+) -> Iterator[str]:
+    """Entity schema on top of common.xsd, the component types are included from
+    components/{family}.xsd when families is given"""
+    yield SCHEMA_START
+    yield include("types.xsd")
+    for family in families or []:
+        yield include(f"components/{family}.xsd")
+    yield render_component_attributes(layout)
+    yield render_transform(docs)
+    yield "\n"
+    yield from iter_entity_types(components, layout)
+    yield from join_chunks(
+        "\n",
+        (
+            render_config(config, config_types, docs)
+            for config in configs
+            if config.name not in COMMON_CONFIGS
+        ),
+    )
+    if families is None:
+        yield "\n"
+        yield from iter_components(components, config_types, docs, layout)
+    yield SCHEMA_END
+
+
+def render_modular_outputs(
+    open_output: Callable[[str], Output],
+    components: list[Component],
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+    layout: Layout = "classic",
+    split_components: bool = False,
+):
+    """Writes modular/common.xsd, modular/types.xsd, modular/{domain}.xsd and
+    modular/merged.xsd, plus modular/components/{family}.xsd if split_components is set"""
+    open_output("modular/common").write(SCHEMA_START + BUILTIN_TYPES + "</xsd:schema>")
+    types = open_output("modular/types")
+    for chunk in iter_types_schema(configs, enums, config_types, docs):
+        types.write(chunk)
+
+    families = component_families(components) if split_components else None
+    entity = open_output("modular/entity")
+    for chunk in iter_modular_entity_schema(
+        components,
+        configs,
+        config_types,
+        docs,
+        layout,
+        None if families is None else list(families),
+    ):
+        entity.write(chunk)
+    for family, members in (families or {}).items():
+        family_output = open_output(f"modular/components/{family}")
+        family_output.write(SCHEMA_START)
+        for chunk in iter_components(members, config_types, docs, layout):
+            family_output.write(chunk)
+        family_output.write(SCHEMA_END)
+
+    for name, shared, chunks in [
+        (
+            "materials",
+            "types.xsd",
+            iter_materials_schema(configs, enums, config_types, docs),
+        ),
+        ("mod", "common.xsd", iter_mod_schema(docs)),
+        ("magic_numbers", "common.xsd", iter_magic_numbers_schema(docs)),
+        ("sprite", "common.xsd", [open("./src/sprite.xsd", "r").read()]),
+        ("biomes_all", "common.xsd", [open("./src/biomes_all.xsd", "r").read()]),
+    ]:
+        schema = BuiltinIncluder(open_output(f"modular/{name}"), include(shared))
+        for chunk in chunks:
+            schema.write(chunk)
+        schema.close()
+
+    merged = open_output("modular/merged")
+    merged.write(SCHEMA_START)
+    for name in MERGED_DOMAINS:
+        merged.write(include(f"{name}.xsd"))
+    merged.write(SCHEMA_END.removeprefix("\n"))
@@ -0,0 +1,331 @@
+import re
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from xml.parsers import expat
+
+from .model import Component, Enum, get_type_for_sub_field, get_xml_type
+from .records import record
+from .trigram import TrigramIndex
+
+# a validator for entity files that doesn't go through an xsd engine, the model is compiled
+# into plain lookup tables that mirror what render.py puts into entity.xsd (classic layout)
+# and the file is checked with those while expat streams it. Errors use the same type codes
+# libxml2 reports so the output lines up with validate.py
+
+# the check looked up for an attribute the element doesn't declare
+UNDECLARED = object()
+
+
+@dataclass
+class ElementTable:
+    # attribute name -> simple type name
+    attributes: dict[str, str]
+    # child element name -> name of its ElementTable
+    children: dict[str, str]
+    required: frozenset[str] = frozenset()
+    # components and configs use xsd:all, so each of their children may appear only once
+    repeatable: bool = True
+    mixed: bool = True
+
+
+@dataclass
+class Tables:
+    elements: dict[str, ElementTable]
+    # enum name -> variants, in declaration order for the error messages
+    enums: dict[str, dict[str, None]]
+    # simple type name -> function returning something true for a valid value, None for
+    # anything goes
+    checks: dict[str, Callable[[str], object] | None]
+    # allowed root element -> its ElementTable
+    roots: dict[str, str] = field(default_factory=dict)
+
+
+INT_PATTERN = re.compile(r"[+-]?[0-9]+")
+UNSIGNED_PATTERN = re.compile(r"\+?[0-9]+")
+DECIMAL_PATTERN = re.compile(r"[+-]?([0-9]+(\.[0-9]*)?|\.[0-9]+)")
+HEX8_PATTERN = re.compile(r"[0-9A-Fa-f]{8}|0")
+HEX_BINARY_PATTERN = re.compile(r"([0-9A-Fa-f]{2})*")
+NOITA_BOOL = dict.fromkeys(["0", "1"])
+# whitespace around numbers is collapsed by xsd, string based types are compared as is
+XSD_WHITESPACE = " \t\n\r"
+
+
+def collapsed(pattern: re.Pattern) -> Callable[[str], re.Match | None]:
+    """fullmatch of pattern that also allows the whitespace xsd collapses around numbers"""
+    space = f"[{XSD_WHITESPACE}]*"
+    return re.compile(f"{space}(?:{pattern.pattern}){space}").fullmatch
+
+
+def int_check(pattern: re.Pattern, low: float, high: float) -> Callable[[str], bool]:
+    match = collapsed(pattern)
+    # int() skips the same whitespace
+    return lambda value: match(value) is not None and low <= int(value) <= high
+
+
+# the checks are only tested for truth, a match object counts as valid
+BUILTIN_CHECKS: dict[str, Callable[[str], object] | None] = {
+    "xsd:string": None,
+    "xsd:int": int_check(INT_PATTERN, -(2**31), 2**31 - 1),
+    "xsd:unsignedInt": int_check(UNSIGNED_PATTERN, 0, 2**32 - 1),
+    "xsd:decimal": collapsed(DECIMAL_PATTERN),
+    "NoitaBool": NOITA_BOOL.__contains__,
+    "Hex8": HEX8_PATTERN.fullmatch,
+    # only used by the hand written schemas
+    "xsd:integer": collapsed(INT_PATTERN),
+    "xsd:nonNegativeInteger": int_check(UNSIGNED_PATTERN, 0, float("inf")),
+    "xsd:positiveInteger": int_check(UNSIGNED_PATTERN, 1, float("inf")),
+    "xsd:hexBinary": collapsed(HEX_BINARY_PATTERN),
+}
+
+
+def compile_attributes(
+    comp: Component, config_types: set[str] | frozenset[str]
+) -> tuple[dict[str, str], dict[str, str]]:
+    attributes: dict[str, str] = {}
+    children: dict[str, str] = {}
+    for f in comp.fields:
+        tys = get_xml_type(f.name, f.ty, config_types)
+        if type(tys) is str:
+            children[f.name] = tys.split("::")[-1]
+            continue
+        for suffix, ty in tys:
+            attributes[f.name + suffix] = get_type_for_sub_field(f.name, ty, comp.name)
+    return attributes, children
+
+
+def compile_tables(
+    components: list[Component],
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+) -> Tables:
+    elements: dict[str, ElementTable] = {
+        "Transform": ElementTable(
+            {
+                "position.x": "xsd:decimal",
+                "position.y": "xsd:decimal",
+                "scale.x": "xsd:decimal",
+                "scale.y": "xsd:decimal",
+                "rotation": "xsd:decimal",
+            },
+            {},
+        )
+    }
+    for config in configs:
+        attributes, children = compile_attributes(config, config_types)
+        elements[config.name] = ElementTable(attributes, children, repeatable=False)
+    common = {"_tags": "xsd:string", "_enabled": "NoitaBool"}
+    for comp in components:
+        attributes, children = compile_attributes(comp, config_types)
+        elements[comp.name] = ElementTable(
+            attributes | common, children, repeatable=False
+        )
+        elements[f"{comp.name}Base"] = ElementTable(
+            attributes | common | {"_remove_from_base": "NoitaBool"},
+            children,
+            repeatable=False,
+        )
+    entity_attributes = {
+        "name": "xsd:string",
+        "tags": "xsd:string",
+        "serialize": "NoitaBool",
+    }
+    for name, suffix in [("Entity", ""), ("EntityBase", "Base")]:
+        elements[name] = ElementTable(
+            entity_attributes,
+            {"Entity": "Entity", "Base": "Base", "_Transform": "Transform"}
+            | {comp.name: f"{comp.name}{suffix}" for comp in components},
+            mixed=False,
+        )
+    elements["Base"] = ElementTable(
+        entity_attributes | {"file": "xsd:string", "include_children": "NoitaBool"},
+        elements["EntityBase"].children,
+        frozenset(["file"]),
+        mixed=False,
+    )
+    enum_variants = {enum.name: dict.fromkeys(enum.variants) for enum in enums}
+    checks = BUILTIN_CHECKS | {
+        name: variants.__contains__ for name, variants in enum_variants.items()
+    }
+    return Tables(elements, enum_variants, checks, {"Entity": "Entity"})
+
+
+def describe_invalid(tables: Tables, ty: str, value: str) -> tuple[str, str]:
+    """The libxml2 error (type, message) for a value that failed the check of its type"""
+    if ty == "Hex8":
+        return (
+            "SCHEMAV_CVC_PATTERN_VALID",
+            f"The value '{value}' is not accepted by the pattern '[0-9A-Fa-f]{{8}}|0'.",
+        )
+    if ty.startswith("xsd:"):
+        return (
+            "SCHEMAV_CVC_DATATYPE_VALID_1_2_1",
+            f"'{value}' is not a valid value of the atomic type '{ty.replace("xsd:", "xs:")}'.",
+        )
+    variants = tables.enums.get(ty, NOITA_BOOL)
+    return (
+        "SCHEMAV_CVC_ENUMERATION_VALID",
+        f"[facet 'enumeration'] The value '{value}' is not an element of the set {{{", ".join(f"'{v}'" for v in variants)}}}.",
+    )
+
+
+class NativeValidator:
+    """Validates one file at a time with expat, returning the same error records as
+    validate.validate_file plus a "suggestions" list for unknown names and enum values"""
+
+    def __init__(self, tables: Tables, schema: str = "entity"):
+        self.tables = tables
+        self.schema = schema
+        # keyed by id, the value keeps the table or candidates alive so ids stay unique
+        self.attribute_checks: dict[int, tuple[ElementTable, dict]] = {}
+        self.indexes: dict[int, tuple[object, TrigramIndex]] = {}
+
+    def checks_for(self, table: ElementTable) -> dict:
+        """attribute -> its check, built the first time an element of the table is seen"""
+        entry = self.attribute_checks.get(id(table))
+        if entry is None:
+            checks = self.tables.checks
+            entry = (table, {a: checks[ty] for a, ty in table.attributes.items()})
+            self.attribute_checks[id(table)] = entry
+        return entry[1]
+
+    def suggest(self, name: str, candidates) -> list[str]:
+        """The closest of candidates to a misspelled name, each set of candidates is
+        indexed once"""
+        entry = self.indexes.get(id(candidates))
+        if entry is None:
+            entry = (candidates, TrigramIndex(candidates))
+            self.indexes[id(candidates)] = entry
+        return entry[1].suggest(name)
+
+    def reset(self, path: str) -> expat.XMLParserType:
+        self.path = path
+        self.errors: list[dict] = []
+        # one entry per open element: [table or None if unknown, seen children, line, has text]
+        self.stack: list[list] = []
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = self.start
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.text
+        self.parser = parser
+        return parser
+
+    def validate(self, path: str) -> list[dict]:
+        parser = self.reset(path)
+        try:
+            # entity files are small, one Parse call is cheaper than ParseFile's reads
+            parser.Parse(open(path, "rb").read(), True)
+        except (expat.ExpatError, OSError) as e:
+            self.errors.append(
+                self.record(
+                    getattr(e, "lineno", 0),
+                    "fatal",
+                    type(e).__name__,
+                    str(e),
+                    column=getattr(e, "offset", 0),
+                )
+            )
+        return self.errors
+
+    def record(
+        self,
+        line: int,
+        level: str,
+        ty: str,
+        message: str,
+        suggestions: list[str] | None = None,
+        column: int = 0,
+    ) -> dict:
+        return record(
+            self.path, self.schema, line, level, ty, message, suggestions, column
+        )
+
+    def error(self, ty: str, message: str, suggestions: list[str] | None = None):
+        self.errors.append(
+            self.record(self.parser.CurrentLineNumber, "error", ty, message, suggestions)
+        )
+
+    def start(self, name: str, attributes: dict[str, str]):
+        stack = self.stack
+        if len(stack) == 0:
+            table_name = self.tables.roots.get(name)
+            if table_name is None:
+                self.error(
+                    "SCHEMAV_CVC_ELT_1",
+                    f"Element '{name}': No matching global declaration available for the validation root.",
+                    self.suggest(name, self.tables.roots),
+                )
+        else:
+            parent = stack[-1]
+            parent_table = parent[0]
+            table_name = None
+            if parent_table is not None:
+                table_name = parent_table.children.get(name)
+                if not parent_table.repeatable:
+                    if parent[1] is None:
+                        parent[1] = set()
+                    if name in parent[1]:
+                        table_name = None
+                    parent[1].add(name)
+                if table_name is None:
+                    self.error(
+                        "SCHEMAV_ELEMENT_CONTENT",
+                        f"Element '{name}': This element is not expected.",
+                        self.suggest(name, parent_table.children),
+                    )
+        table = self.tables.elements.get(table_name) if table_name is not None else None
+        # children seen so far, the start line and whether it had text are only needed sometimes
+        if table is None:
+            stack.append([None, None, 0, False])
+            return
+        stack.append(
+            [table, None, 0 if table.mixed else self.parser.CurrentLineNumber, False]
+        )
+        checks = self.attribute_checks.get(id(table))
+        checks = self.checks_for(table) if checks is None else checks[1]
+        for attribute, value in attributes.items():
+            check = checks.get(attribute, UNDECLARED)
+            if check is None:
+                continue
+            if check is UNDECLARED:
+                self.error(
+                    "SCHEMAV_CVC_COMPLEX_TYPE_3_2_1",
+                    f"Element '{name}', attribute '{attribute}': The attribute '{attribute}' is not allowed.",
+                    self.suggest(attribute, table.attributes),
+                )
+            elif not check(value):
+                ty = table.attributes[attribute]
+                problem = describe_invalid(self.tables, ty, value)
+                variants = self.tables.enums.get(ty)
+                self.error(
+                    problem[0],
+                    f"Element '{name}', attribute '{attribute}': {problem[1]}",
+                    self.suggest(value, variants) if variants is not None else None,
+                )
+        if table.required:
+            for attribute in table.required:
+                if attribute not in attributes:
+                    self.error(
+                        "SCHEMAV_CVC_COMPLEX_TYPE_4",
+                        f"Element '{name}': The attribute '{attribute}' is required but missing.",
+                    )
+
+    def end(self, name: str):
+        table, _, line, has_text = self.stack.pop()
+        if has_text:
+            self.errors.append(
+                self.record(
+                    line,
+                    "error",
+                    "SCHEMAV_CVC_COMPLEX_TYPE_2_3",
+                    f"Element '{name}': Character content other than whitespace is not allowed because the content type is 'element-only'.",
+                )
+            )
+
+    def text(self, data: str):
+        if data.isspace() or len(self.stack) == 0:
+            return
+        top = self.stack[-1]
+        if top[0] is not None and not top[0].mixed:
+            top[3] = True
@@ -0,0 +1,187 @@
+import filecmp
+import os
+import re
+from typing import Protocol
+
+
+class Output(Protocol):
+    def write(self, chunk: str): ...
+
+
+class StreamedOutput:
+    """Buffered writer for one output file, written to a temporary file next to it.
+
+    The real file is only replaced once everything was written and the bytes differ,
+    so an identical rebuild leaves it (and its mtime) alone."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        self.changed = False
+        self.file = open(self.tmp_path, "w")
+
+    def write(self, chunk: str):
+        self.file.write(chunk)
+
+    def __enter__(self) -> "StreamedOutput":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.file.close()
+        if exc_type is not None or (
+            os.path.exists(self.path)
+            and filecmp.cmp(self.tmp_path, self.path, shallow=False)
+        ):
+            os.remove(self.tmp_path)
+            return
+        os.replace(self.tmp_path, self.path)
+        self.changed = True
+
+
+class NullOutput:
+    changed = False
+
+    def write(self, chunk: str):
+        pass
+
+
+class Tee:
+    def __init__(self, *targets: Output):
+        self.targets = targets
+
+    def write(self, chunk: str):
+        for target in self.targets:
+            target.write(chunk)
+
+
+BUILTIN_MARKER = "<!--Builtin-->"
+
+
+class BuiltinPruner:
+    """Streaming version of render.prune_builtin.
+
+    Drops empty lines, the first and last line (the xsd:schema tags) and everything
+    between pairs of <!--Builtin--> markers, writing the rest into target as it arrives."""
+
+    def __init__(self, target: Output):
+        self.target = target
+        self.partial = ""
+        self.seen_first = False
+        self.pending: str | None = None
+        self.wrote_line = False
+        self.in_builtin = False
+
+    def write(self, chunk: str):
+        lines = (self.partial + chunk).split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            self.line(line)
+
+    def close(self):
+        self.line(self.partial)
+        self.partial = ""
+        # the held back line is the last one, which is dropped
+
+    def line(self, line: str):
+        if line == "":
+            return
+        if not self.seen_first:
+            self.seen_first = True
+            return
+        if self.pending is not None:
+            self.emit(self.pending)
+        self.pending = line
+
+    def emit(self, line: str):
+        if self.wrote_line and not self.in_builtin:
+            self.target.write("\n")
+        self.wrote_line = True
+        pieces = line.split(BUILTIN_MARKER)
+        for i, piece in enumerate(pieces):
+            if i != 0:
+                self.in_builtin = not self.in_builtin
+                if not self.in_builtin:
+                    self.target.write("\n")
+            if not self.in_builtin and piece != "":
+                self.target.write(piece)
+
+
+class BuiltinIncluder:
+    """Replaces the first <!--Builtin--> section of a hand written schema with an include of
+    the shared types and drops any later ones, the markers are expected on their own lines"""
+
+    def __init__(self, target: Output, include: str):
+        self.target = target
+        self.include = include
+        self.partial = ""
+        self.in_builtin = False
+        self.included = False
+
+    def write(self, chunk: str):
+        lines = (self.partial + chunk).split("\n")
+        self.partial = lines.pop()
+        for line in lines:
+            self.line(line + "\n")
+
+    def close(self):
+        self.line(self.partial)
+        self.partial = ""
+
+    def line(self, line: str):
+        if BUILTIN_MARKER in line:
+            self.in_builtin = not self.in_builtin
+            if not self.included:
+                self.included = True
+                self.target.write(self.include)
+        elif not self.in_builtin:
+            self.target.write(line)
+
+
+class CountingOutput:
+    def __init__(self):
+        self.size = 0
+
+    def write(self, chunk: str):
+        self.size += len(chunk.encode())
+
+
+# a chunk is only minified up to a point where no annotation, comment or CDATA section is left open
+UNCLOSED = [
+    ("<xsd:annotation", "</xsd:annotation>"),
+    ("<!--", "-->"),
+    ("<![CDATA[", "]]>"),
+]
+STRIPPED = re.compile(
+    r"<xsd:annotation\s*/>|<xsd:annotation>.*?</xsd:annotation>|<!--.*?-->", re.S
+)
+BETWEEN_TAGS = re.compile(r">\s+<")
+BEFORE_CLOSE = re.compile(r"\s+(/?>)")
+
+
+class Minifier:
+    """Drops documentation and comments and the whitespace between tags before writing to target"""
+
+    def __init__(self, target: Output):
+        self.target = target
+        self.buffer = ""
+
+    def write(self, chunk: str):
+        self.buffer += chunk
+        cut = self.buffer.rfind(">") + 1
+        for opener, closer in UNCLOSED:
+            start = self.buffer.rfind(opener, 0, cut)
+            if start != -1 and self.buffer.find(closer, start) == -1:
+                cut = min(cut, start)
+        if cut > 0:
+            self.emit(self.buffer[:cut])
+            self.buffer = self.buffer[cut:]
+
+    def close(self):
+        self.emit(self.buffer)
+        self.buffer = ""
+
+    def emit(self, text: str):
+        text = STRIPPED.sub("", text)
+        text = BETWEEN_TAGS.sub("><", text)
+        text = BEFORE_CLOSE.sub(r"\1", text)
+        self.target.write(text.strip())
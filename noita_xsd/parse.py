@@ -0,0 +1,159 @@
+import json
+import os
+import re
+from collections.abc import Iterator
+
+from .model import Component, Enum, Field
+
+PRIMARY_FILE = True
+DEFAULT_DOCS_PATH = (
+    os.path.expanduser(
+        "~/.local/share/Steam/steamapps/common/Noita/component_documentation.txt"
+    )
+    if PRIMARY_FILE
+    else "./small_comp_docs.txt"
+)
+
+
+# replaces int32 with std::string
+def mark_config_materials(values: list) -> list:
+    for x in values:
+        if x["type"] == "int32":
+            x["type"] = "std::string"
+    return values
+
+
+# field lines look like
+#     float                   min_distance                             10 [0, 10000] "comment"
+# the type column is 24 wide, types that don't fit push everything after them to the right.
+# FIELD_LINE handles the common case in one go, everything else goes through scan_var_line
+FIELD_LINE = re.compile(r'    (.{23}) ++([^ ]++) *+([^ "]++).?(.*)')
+TYPE_PREFIX = re.compile("[A-Z_]+")
+# the default is the first word before any quote, the line goes on one character after it
+DEFAULT = re.compile('[ ]*([^ "]+)')
+
+
+def split_values(line: str, default: str, rest: int) -> tuple[str, str]:
+    """The example range and the comment in line[rest:]"""
+    example = ""
+    if default != "-":
+        example_end = line.find("]", rest)
+        if example_end == -1:
+            example = line[rest:] + "]"
+            rest = len(line)
+        else:
+            example = line[rest : example_end + 1]
+            rest = example_end + 1
+    if example == "[0, 1]":
+        example = ""  # these are almost always wrong
+    comment_start = line.find('"', rest)
+    comment_end = line.rfind('"', rest)
+    comment = line[comment_start + 1 : comment_end] if comment_start < comment_end else ""
+    return example, comment
+
+
+def do_var_line(line: str) -> Field:
+    field_match = FIELD_LINE.match(line)
+    if field_match is None:
+        return scan_var_line(line)
+    ty, name, default, _ = field_match.groups()
+    example, comment = split_values(line, default, field_match.start(4))
+    return Field(name, ty.rstrip(" "), default, example, comment)
+
+
+def scan_var_line(line: str) -> Field:
+    if line[27] == " ":
+        ty = line[4:28].rstrip(" ")
+    else:
+        ty_end = line.find(" ", 4)
+        ty_part = line[4:] if ty_end == -1 else line[4:ty_end]
+        if "::Enum" in ty_part:
+            ty = ty_part[: ty_part.index("::Enum") + len("::Enum")]
+        elif "*" in ty_part:
+            ty = ty_part[: ty_part.index("*") + 1]
+        else:
+            type_match = TYPE_PREFIX.match(ty_part)
+            assert type_match is not None
+            ty = type_match.group()
+    name_start = 4 + len(ty)
+    while line[name_start] == " ":
+        name_start += 1
+    name_end = line.find(" ", name_start)
+    if name_end == -1:
+        name_end = len(line)
+    default_match = DEFAULT.match(line, name_end)
+    assert default_match is not None
+    default = default_match.group(1)
+    example, comment = split_values(line, default, default_match.end() + 1)
+    return Field(line[name_start:name_end], ty, default, example, comment)
+
+
+def iter_components(path: str = DEFAULT_DOCS_PATH) -> Iterator[Component]:
+    """Streams the components out of component_documentation.txt one line at a time"""
+    cur_type = ""
+    current_fields: list[Field] = []
+    for line in open(path, "r"):
+        if line[-1:] == "\n":
+            line = line[:-1]
+        if line == "":
+            if cur_type != "":
+                yield Component(cur_type, current_fields)
+            cur_type = ""
+            current_fields = []
+        elif line[:4] == "    ":
+            current_fields.append(do_var_line(line))
+        elif line[0] != " ":
+            if cur_type != "":
+                yield Component(cur_type, current_fields)
+                current_fields = []
+            cur_type = line
+    if cur_type != "":
+        yield Component(cur_type, current_fields)
+
+
+def load_components(path: str = DEFAULT_DOCS_PATH) -> list[Component]:
+    return list(iter_components(path))
+
+
+# configs are identical to components really, so we can just reuse component code
+def load_configs(
+    path: str = "./src/config_betas.json",
+) -> tuple[list[Component], frozenset[str]]:
+    configs_json = json.load(
+        open(path, "r")
+    )  # credits to dexter for getting these, from https://github.com/dextercd/Noita-Component-Explorer/blob/main/data/configs_beta.json
+    configs: list[Component] = []
+    config_types = set()
+    for config in configs_json:
+        configs.append(
+            Component(
+                config["name"].split("::")[-1],
+                [
+                    Field(
+                        field["name"], field["type"], "-", "", field.get("description", "")
+                    )
+                    for field in config.get("members", [])
+                    + config.get("privates", [])
+                    + mark_config_materials(config.get("custom_data_types", []))
+                    + config.get("objects", [])
+                ],
+            )
+        )
+        config_types.add(config["name"])
+    return configs, frozenset(config_types)
+
+
+def load_enums(path: str = "./src/enums") -> list[Enum]:
+    enums: list[Enum] = []
+    enum_content = open(path, "r").read().split("\n")  # this was generated from ghidra
+    for i in range(len(enum_content) // 2):
+        name = enum_content[i * 2]
+        fields = enum_content[i * 2 + 1][3:-2].split("', u'")
+        enums.append(Enum(name, fields))
+    enums.append(Enum("PathFindingComponentState", [""]))
+    enums.append(Enum("TeleportComponentState", [""]))
+    return enums
+
+
+def load_json(path_name: str) -> list[dict]:
+    return json.load(open(f"./src/{path_name}.json", "r"))
@@ -0,0 +1,26 @@
+# the error records every checker reports, one json object per line on the command line:
+# validate.py's fields (shaped after lxml's error log) plus "suggestions" where there are any
+
+
+def record(
+    path: str,
+    schema: str | None,
+    line: int | None,
+    level: str,
+    ty: str,
+    message: str,
+    suggestions: list[str] | None = None,
+    column: int = 0,
+) -> dict:
+    found = {
+        "file": path,
+        "schema": schema,
+        "line": line or 0,
+        "column": column,
+        "level": level,
+        "type": ty,
+        "message": message,
+    }
+    if suggestions:
+        found["suggestions"] = suggestions
+    return found
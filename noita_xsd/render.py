@@ -0,0 +1,572 @@
+import re
+from dataclasses import dataclass
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator
+
+from typing_extensions import deprecated
+
+from .ir import (
+    Attribute,
+    ComplexType,
+    DocsMode,
+    Layout,
+    base_type,
+    common_attributes,
+    component_base_type,
+    component_type,
+    entity_root,
+    entity_types,
+    enum_type,
+    json_type,
+    transform_type,
+)
+from .model import NL, TAB, Component, Enum
+from .timing import stage, timed
+
+# out/*.xsd as lemminx reads them, written from the schema IR (ir.py): the types carry
+# the structure and the plain text docs, this adds the markup and the hover formatting
+SCHEMA_START = '<xsd:schema xmlns:xsd="http://www.w3.org/2001/XMLSchema">\n'
+SCHEMA_END = "\n</xsd:schema>"
+# simple types every schema uses, the hand written ones in src/ keep their own copy between <!--Builtin--> markers
+BUILTIN_TYPES = """\t<xsd:simpleType name="NoitaBool">
+\t\t<xsd:restriction base="xsd:string">
+\t\t\t<xsd:enumeration value="0" />
+\t\t\t<xsd:enumeration value="1" />
+\t\t</xsd:restriction>
+\t</xsd:simpleType>
+\t<xsd:simpleType name="Hex8">
+\t\t<xsd:restriction base="xsd:string">
+\t\t\t<xsd:pattern value="[0-9A-Fa-f]{8}|0" />
+\t\t\t</xsd:restriction>
+\t</xsd:simpleType>
+"""
+
+
+def cpp_block(source: str) -> str:
+    # C++ source as a markdown code block, with the line breaks and tabs lemminx shows
+    return f"```cpp\n{source}\n```".replace("\n", NL).replace("\t", TAB)  # parser bug
+
+
+def class_block(doc: str) -> str:
+    # an empty class has always had a blank line between its braces
+    if doc.endswith("{\n};"):
+        doc = doc.removesuffix("\n};") + "\n\n};"
+    return cpp_block(doc)
+
+
+def render_sub_field(attribute: Attribute) -> str:
+    start = f'\t\t<xsd:attribute name="{attribute.name}" type="{attribute.ty}" default="{attribute.default}"'
+    if attribute.doc == "":
+        return start + "/>"
+    doc = cpp_block(attribute.doc.replace("\t", ""))
+    return f"""{start}>
+\t\t\t<xsd:annotation>
+\t\t\t\t<xsd:documentation><![CDATA[{doc}]]></xsd:documentation>
+\t\t\t</xsd:annotation>
+\t\t</xsd:attribute>"""
+
+
+def render_fields(ty: ComplexType) -> tuple[list[str], list[str]]:
+    """The child elements and the attributes of a component or config"""
+    objects = [
+        f'\t\t\t\t<xsd:element name="{child.name}" type="{child.ty}" minOccurs="0"/>'
+        for child in ty.children
+    ]
+    attrs = [render_sub_field(attribute) for attribute in ty.attributes]
+    # backwards, so the positions of the earlier ones still hold
+    for unknown in reversed(ty.unknown):
+        attrs.insert(
+            unknown.position,
+            f"\t\t<!-- Some Unknown Type: {unknown.cpp_type} for {unknown.name} -->",
+        )
+    return objects, attrs
+
+
+def render_class_docs(ty: ComplexType) -> str:
+    if ty.doc == "":
+        return ""
+    return f"""
+\t\t<xsd:annotation> <xsd:documentation> <![CDATA[{class_block(ty.doc)}]]> </xsd:documentation> </xsd:annotation>"""
+
+
+def render_type(ty: ComplexType, extra: str = "") -> str:
+    objects, attrs = render_fields(ty)
+    return f"""
+\t<xsd:complexType name="{ty.name}" mixed="true">{render_class_docs(ty)}{f"""
+\t\t\t<xsd:all>
+{"\n".join(objects)}
+\t\t\t</xsd:all>""" if len(objects) != 0 else ""}{
+"\n" + "\n".join(attrs) if len(attrs) != 0 else ""}{extra}
+\t</xsd:complexType>"""[
+        1:
+    ]
+
+
+def render_extension(ty: ComplexType) -> str:
+    attributes = "".join(
+        f'\t\t\t\t<xsd:attribute name="{attribute.name}" type="{attribute.ty}"'
+        + (' use="required"' if attribute.required else "")
+        + "/>\n"
+        for attribute in ty.attributes
+    )
+    docs = ""
+    if ty.doc != "":
+        docs = f"""\t\t<xsd:annotation>
+\t\t\t<xsd:documentation>{ty.doc}</xsd:documentation>
+\t\t</xsd:annotation>
+"""
+    return f"""\t<xsd:complexType name="{ty.name}">
+{docs}\t\t<xsd:complexContent>
+\t\t\t<xsd:extension base="{ty.extends}">
+{attributes}\t\t\t</xsd:extension>
+\t\t</xsd:complexContent>
+\t</xsd:complexType>"""
+
+
+def render_component(
+    comp: Component,
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+    layout: Layout = "classic",
+) -> str:
+    rendered = render_type(
+        component_type(comp, config_types, docs),
+        '\n\t\t<xsd:attributeGroup ref="CommonComponentAttributes"/>',
+    )
+    if layout == "classic":
+        rendered += "\n" + render_extension(component_base_type(comp.name))
+    return rendered
+
+
+def render_config(
+    config: Component,
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+) -> str:
+    return render_type(component_type(config, config_types, docs))
+
+
+def render_enum(enum: Enum) -> str:
+    ty = enum_type(enum)
+    return f"""
+\t<xsd:simpleType name="{ty.name}">
+\t\t<xsd:restriction base="xsd:string">
+{"\n".join([f'\t\t\t<xsd:enumeration value="{variant}"/>' for variant in ty.variants or []])}
+\t\t</xsd:restriction>
+\t</xsd:simpleType>"""[
+        1:
+    ]
+
+
+def render_transform(docs: DocsMode = "full") -> str:
+    ty = transform_type(docs)
+
+    def attribute(attribute: Attribute) -> str:
+        start = f'\t\t<xsd:attribute name="{attribute.name}" type="{attribute.ty}" default="{attribute.default}"'
+        if attribute.doc == "":
+            return f"{start} />\n"
+        return f"""{start} >
+\t\t\t<xsd:annotation>
+\t\t\t\t\t<xsd:documentation><![CDATA[```cpp{NL}{attribute.doc}{NL}```]]></xsd:documentation>
+\t\t\t</xsd:annotation>
+\t\t</xsd:attribute>
+"""
+
+    class_docs = ""
+    if ty.doc != "":
+        source = ty.doc.replace("\n", NL).replace("\t", TAB)
+        class_docs = f"""
+\t\t<xsd:annotation>
+\t\t\t<xsd:documentation><![CDATA[```cpp{NL}{source}```]]></xsd:documentation>
+\t\t</xsd:annotation>"""
+    return (
+        f"""\t<xsd:complexType name="{ty.name}" mixed="true">{class_docs}\n"""
+        + "".join(attribute(a) for a in ty.attributes)
+        + "\t</xsd:complexType>"
+    )
+
+
+def join_chunks(separator: str, chunks: Iterable[str]) -> Iterator[str]:
+    first = True
+    for chunk in chunks:
+        if not first:
+            yield separator
+        first = False
+        yield chunk
+
+
+def iter_entity_type(ty: ComplexType) -> Iterator[str]:
+    root = entity_root()
+    yield f"""\t<xsd:complexType name="{ty.name}">
+\t\t<xsd:sequence minOccurs="0">
+\t\t\t<xsd:choice maxOccurs="unbounded" minOccurs="0">
+\t\t\t\t"""
+    yield from join_chunks(
+        "\n\t\t\t\t",
+        (
+            (
+                f'<xsd:element ref="{root.name}" />'
+                if child.name == root.name and child.ty == root.ty
+                else f'<xsd:element name="{child.name}" type="{child.ty}" />'
+            )
+            for child in ty.children
+        ),
+    )
+    yield """
+\t\t\t</xsd:choice>
+\t\t</xsd:sequence>
+"""
+    for attribute in ty.attributes:
+        default = f' default="{attribute.default}"' if attribute.default is not None else ""
+        yield f'\t\t<xsd:attribute name="{attribute.name}" type="{attribute.ty}"{default} />\n'
+    yield "\t</xsd:complexType>"
+
+
+def render_component_attributes(layout: Layout = "classic") -> str:
+    attributes = "".join(
+        f'\t\t<xsd:attribute name="{attribute.name}" type="{attribute.ty}"'
+        + (f' default="{attribute.default}" ' if attribute.default is not None else "")
+        + "/>\n"
+        for attribute in common_attributes(layout)
+    )
+    return f"""\t<xsd:attributeGroup name="CommonComponentAttributes">
+{attributes}\t</xsd:attributeGroup>
+"""
+
+
+def render_entity_element(layout: Layout = "classic") -> str:
+    root = entity_root()
+    return f"""\t<xsd:element name="{root.name}" type="{root.ty}">
+\t\t<xsd:annotation>
+\t\t\t<xsd:documentation>{root.doc}</xsd:documentation>
+\t\t</xsd:annotation>
+\t</xsd:element>
+{render_extension(base_type(layout))}
+"""
+
+
+def iter_entity_types(
+    components: list[Component], layout: Layout = "classic"
+) -> Iterator[str]:
+    for ty in entity_types(components, layout):
+        yield from iter_entity_type(ty)
+        yield "\n"
+    yield render_entity_element(layout)
+
+
+def render_configs(
+    configs: list[Component],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+) -> str:
+    return "\n".join(render_config(config, config_types, docs) for config in configs)
+
+
+def render_components(
+    components: list[Component],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+    layout: Layout = "classic",
+) -> str:
+    return "\n".join(
+        render_component(component, config_types, docs, layout)
+        for component in components
+    )
+
+
+# (render a batch, items) -> the rendered batches in order. Batches are joined like the single
+# types, so the schema is the same however the items were split up
+BatchRenderer = Callable[[Callable[[list], str], list], Iterable[str]]
+
+
+def iter_entity_body(
+    components: list[Component],
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+    layout: Layout = "classic",
+    render_batches: BatchRenderer | None = None,
+) -> Iterator[str]:
+    # each component, config and enum is its own chunk, the whole schema is never held at once
+    yield SCHEMA_START
+    yield BUILTIN_TYPES
+    yield render_component_attributes(layout)
+    yield render_transform(docs)
+    yield "\n\t"
+    yield from join_chunks("\n", (render_enum(enum) for enum in enums))
+    yield "\n"
+    yield from iter_entity_types(components, layout)
+    if render_batches is not None:
+        yield from join_chunks(
+            "\n",
+            render_batches(
+                partial(render_configs, config_types=config_types, docs=docs), configs
+            ),
+        )
+        yield "\n"
+        yield from join_chunks(
+            "\n",
+            render_batches(
+                partial(
+                    render_components,
+                    config_types=config_types,
+                    docs=docs,
+                    layout=layout,
+                ),
+                components,
+            ),
+        )
+        return
+    yield from join_chunks(
+        "\n", (render_config(config, config_types, docs) for config in configs)
+    )
+    yield "\n"
+    yield from join_chunks(
+        "\n",
+        (
+            render_component(component, config_types, docs, layout)
+            for component in components
+        ),
+    )
+
+
+def iter_entity_schema(
+    components: list[Component],
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+    layout: Layout = "classic",
+) -> Iterator[str]:
+    yield from iter_entity_body(components, configs, enums, config_types, docs, layout)
+    yield SCHEMA_END
+
+
+def render_entity_schema(
+    components: list[Component],
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+    layout: Layout = "classic",
+) -> str:
+    return "".join(
+        iter_entity_schema(components, configs, enums, config_types, docs, layout)
+    )
+
+
+def replace_metatag(src: str, replacement: str, tag: str) -> str:
+    parts = src.split(tag)
+    # Replace content between markers
+    for i in range(
+        1, len(parts), 2
+    ):  # Only replace in "odd" indexed parts (between markers)
+        parts[i] = replacement
+    # Rejoin the parts
+    return tag.join(parts)
+
+
+def prune_builtin(src: str) -> str:
+    return "\n".join(
+        "\n".join([x for x in src.split("\n") if x != ""][1:-1]).split(
+            "<!--Builtin-->"
+        )[0::2]
+    )
+
+
+@dataclass
+class RenderedJson:
+    docs: str
+    attributes: str
+
+
+def render_json_attribute(attribute: Attribute) -> str:
+    use = (
+        'use="required"' if attribute.required else f'default="{attribute.default}"'
+    )
+    start = f'\t\t<xsd:attribute name="{attribute.name}" type="{attribute.ty}" {use}'
+    if attribute.doc == "":
+        return f"{start}/>\n"
+    doc = cpp_block(attribute.doc.replace("\t", ""))
+    return f"""{start}>
+\t\t\t<xsd:annotation>
+\t\t\t\t<xsd:documentation><![CDATA[{doc}]]></xsd:documentation>
+\t\t\t</xsd:annotation>
+\t\t</xsd:attribute>
+"""
+
+
+def iter_json_attributes(ty: ComplexType) -> Iterator[str]:
+    yield "\n"
+    for attribute in ty.attributes:
+        yield render_json_attribute(attribute)
+
+
+def render_json_docs(ty: ComplexType) -> str:
+    if ty.doc == "":
+        return ""
+    return (
+        "<xsd:annotation><xsd:documentation><![CDATA["
+        + NL
+        + class_block(ty.doc)
+        + NL
+        + "]]></xsd:documentation></xsd:annotation>"
+    )
+
+
+def render_json(
+    path_name: str,
+    class_name: str,
+    config_types: set[str] | frozenset[str] = frozenset(),
+) -> RenderedJson:
+    ty = json_type(path_name, class_name, config_types)
+    return RenderedJson(render_json_docs(ty), "".join(iter_json_attributes(ty)))
+
+
+def iter_replacements(
+    path_name: str, replacements: Dict[str, str | Iterable[str]]
+) -> Iterator[str]:
+    # same result as running replace_metatag for every replacement, but the replacements are
+    # streamed. A streamed replacement whose marker pair comes up again later in the template
+    # is kept the first time, so it can be put in every pair like replace_metatag does. Like
+    # replace_metatag, a marker without a closing one replaces the rest of the template
+    xsd = open(f"./src/{path_name}.xsd", "r").read()
+    tags = {f"<!-- {name} -->": replacement for name, replacement in replacements.items()}
+    pattern = re.compile("|".join(re.escape(tag) for tag in tags))
+    pos = 0
+    while (start := pattern.search(xsd, pos)) is not None:
+        tag = start.group()
+        end = xsd.find(tag, start.end())
+        yield xsd[pos : start.end()]
+        replacement = tags[tag]
+        if end == -1:
+            yield from [replacement] if isinstance(replacement, str) else replacement
+            return
+        if isinstance(replacement, str):
+            yield replacement
+        elif xsd.find(tag, end + len(tag)) == -1:
+            yield from replacement
+        else:
+            replacement = "".join(replacement)
+            tags[tag] = replacement
+            yield replacement
+        yield tag
+        pos = end + len(tag)
+    yield xsd[pos:]
+
+
+def apply_replacements(path_name: str, replacements: Dict[str, str]) -> str:
+    return "".join(iter_replacements(path_name, replacements))
+
+
+def iter_configs_and_enums(
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+) -> Iterator[str]:
+    config_explosion = next(
+        config for config in configs if config.name == "ConfigExplosion"
+    )
+    config_damage_critical = next(
+        config for config in configs if config.name == "ConfigDamageCritical"
+    )
+    yield "\n"
+    yield render_config(config_damage_critical, config_types, docs)
+    yield "\n"
+    yield render_config(config_explosion, config_types, docs)
+    yield "\n"
+    yield from join_chunks("\n", (render_enum(enum) for enum in enums))
+    yield "\n"
+
+
+def iter_materials_schema(
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+) -> Iterator[str]:
+    with stage("render_json materials"):
+        material = json_type("materials", "CellData", config_types, docs)
+        material_docs = render_json_docs(material)
+    with stage("render_json reaction"):
+        reaction = json_type("reaction", "Reaction", config_types, docs)
+        reaction_docs = render_json_docs(reaction)
+    yield from iter_replacements(
+        "materials",
+        {
+            "Material Attributes": timed(
+                "render_json materials", iter_json_attributes(material)
+            ),
+            "Material Docs": material_docs,
+            "Reaction Attributes": timed(
+                "render_json reaction", iter_json_attributes(reaction)
+            ),
+            "Reaction Docs": reaction_docs,
+            "Configs and Enums": timed(
+                "render configs and enums",
+                iter_configs_and_enums(configs, enums, config_types, docs),
+            ),
+        },
+    )
+
+
+def iter_mod_schema(docs: DocsMode = "full") -> Iterator[str]:
+    with stage("render_json mod"):
+        mod = json_type("mod", "Mod", docs=docs)
+        mod_docs = render_json_docs(mod)
+    yield from iter_replacements(
+        "mod",
+        {
+            "Mod Attributes": timed("render_json mod", iter_json_attributes(mod)),
+            "Mod Docs": mod_docs,
+        },
+    )
+
+
+def iter_magic_numbers_schema(docs: DocsMode = "full") -> Iterator[str]:
+    with stage("render_json magic_numbers"):
+        magic = json_type("magic_numbers", "MagicNumbers", docs=docs)
+        magic_docs = render_json_docs(magic)
+    yield from iter_replacements(
+        "magic_numbers",
+        {
+            "MagicNumbers Attributes": timed(
+                "render_json magic_numbers", iter_json_attributes(magic)
+            ),
+            "MagicNumbers Docs": magic_docs,
+        },
+    )
+
+
+def render_materials_schema(
+    configs: list[Component],
+    enums: list[Enum],
+    config_types: set[str] | frozenset[str] = frozenset(),
+    docs: DocsMode = "full",
+) -> str:
+    return "".join(iter_materials_schema(configs, enums, config_types, docs))
+
+
+def render_mod_schema(docs: DocsMode = "full") -> str:
+    return "".join(iter_mod_schema(docs))
+
+
+def render_magic_numbers_schema(docs: DocsMode = "full") -> str:
+    return "".join(iter_magic_numbers_schema(docs))
+
+
+@deprecated("Use render_json and apply_replacements instead")
+def handwritten(name: str) -> str:
+    with open(f"./src/{name}.xsd", "r") as src_file:
+        return src_file.read()
+
+
+def render_merged_schema(entity: str, *schemas: str) -> str:
+    # sprite and biomes_all have never been part of merged.xsd, so they aren't passed here
+    return (
+        entity.removesuffix(SCHEMA_END)
+        + "".join(prune_builtin(schema) for schema in schemas)
+        + SCHEMA_END
+    )
@@ -0,0 +1,202 @@
+import hashlib
+import marshal
+import os
+import sys
+from array import array
+from dataclasses import dataclass
+
+from .model import Component, Enum, Field
+from .parse import DEFAULT_DOCS_PATH, load_components, load_configs, load_enums
+
+# the parsed model saved next to the build manifest, so a run whose sources didn't change
+# skips parsing the docs, configs and enums. Every string is stored once in a table and
+# everything else is an index into it, loading gives every field the same interned type and
+# default strings instead of one copy per line of the docs. The snapshot records the sources
+# it was made from (and the parser's own code) and is made again when any of them changed
+SNAPSHOT_DIR = "./.model_snapshots"
+SNAPSHOT_VERSION = 1
+PARSER_MODULES = ["model", "parse", "snapshot"]
+
+
+@dataclass(slots=True)
+class Model:
+    components: list[Component]
+    configs: list[Component]
+    config_types: frozenset[str]
+    enums: list[Enum]
+
+
+def hash_file(path: str, known: dict) -> str:
+    # the stat check lets a no-op run skip reading the megabyte docs file
+    stat = os.stat(path)
+    entry = known.get(path)
+    if (
+        entry is not None
+        and entry["size"] == stat.st_size
+        and entry["mtime_ns"] == stat.st_mtime_ns
+    ):
+        return entry["sha256"]
+    digest = hashlib.sha256(open(path, "rb").read()).hexdigest()
+    known[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+    return digest
+
+
+def snapshot_sources(docs_path: str, configs_path: str, enums_path: str) -> list[str]:
+    package_dir = os.path.dirname(__file__)
+    return [docs_path, configs_path, enums_path] + [
+        os.path.join(package_dir, f"{name}.py") for name in PARSER_MODULES
+    ]
+
+
+def snapshot_path(docs_path: str, configs_path: str, enums_path: str) -> str:
+    # one snapshot per set of sources, so building the main and beta docs doesn't keep
+    # replacing the same file
+    key = "\0".join(os.path.abspath(path) for path in [docs_path, configs_path, enums_path])
+    return os.path.join(SNAPSHOT_DIR, hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def encode(model: Model, sources: dict) -> bytes:
+    strings: dict[str, int] = {}
+
+    def ref(s: str) -> int:
+        index = strings.get(s)
+        if index is None:
+            index = strings[s] = len(strings)
+        return index
+
+    # per type its name and field count, then five strings per field
+    types = array("I")
+    fields = array("I")
+    for group in (model.components, model.configs):
+        for comp in group:
+            types.append(ref(comp.name))
+            types.append(len(comp.fields))
+            for f in comp.fields:
+                fields.extend(
+                    (ref(f.name), ref(f.ty), ref(f.default), ref(f.values), ref(f.comment))
+                )
+    # per enum its name and variant count, then the variants
+    enums = array("I")
+    for enum in model.enums:
+        enums.append(ref(enum.name))
+        enums.append(len(enum.variants))
+        enums.extend(ref(variant) for variant in enum.variants)
+    config_types = array("I", (ref(ty) for ty in sorted(model.config_types)))
+    return marshal.dumps(
+        (
+            SNAPSHOT_VERSION,
+            sources,
+            len(model.components),
+            tuple(strings),
+            types.tobytes(),
+            fields.tobytes(),
+            enums.tobytes(),
+            config_types.tobytes(),
+        )
+    )
+
+
+def decode(data: tuple) -> Model:
+    _, _, component_count, table, types_data, fields_data, enums_data, config_data = data
+    strings = [sys.intern(s) for s in table]
+    types = array("I")
+    types.frombytes(types_data)
+    fields = array("I")
+    fields.frombytes(fields_data)
+    decoded: list[Component] = []
+    pos = 0
+    for i in range(0, len(types), 2):
+        end = pos + types[i + 1] * 5
+        decoded.append(
+            Component(
+                strings[types[i]],
+                [
+                    Field(
+                        strings[fields[j]],
+                        strings[fields[j + 1]],
+                        strings[fields[j + 2]],
+                        strings[fields[j + 3]],
+                        strings[fields[j + 4]],
+                    )
+                    for j in range(pos, end, 5)
+                ],
+            )
+        )
+        pos = end
+    enums_array = array("I")
+    enums_array.frombytes(enums_data)
+    enums: list[Enum] = []
+    i = 0
+    while i < len(enums_array):
+        count = enums_array[i + 1]
+        enums.append(
+            Enum(
+                strings[enums_array[i]],
+                [strings[j] for j in enums_array[i + 2 : i + 2 + count]],
+            )
+        )
+        i += 2 + count
+    config_types = array("I")
+    config_types.frombytes(config_data)
+    return Model(
+        decoded[:component_count],
+        decoded[component_count:],
+        frozenset(strings[i] for i in config_types),
+        enums,
+    )
+
+
+def read_snapshot(path: str, sources: list[str]) -> tuple[Model | None, dict, bool]:
+    """The model in the snapshot at path if it was made from the current sources, the
+    recorded state of the sources and whether that state needs saving again"""
+    try:
+        data = marshal.loads(open(path, "rb").read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None, {}, True
+    if not isinstance(data, tuple) or len(data) != 8 or data[0] != SNAPSHOT_VERSION:
+        return None, {}, True
+    known = dict(data[1])
+    recorded = dict(known)
+    if any(path not in known for path in sources):
+        return None, known, True
+    for path in sources:
+        # a touched but unchanged source still matches, by its hash
+        if hash_file(path, known) != recorded[path]["sha256"]:
+            return None, known, True
+    touched = any(known[path] is not recorded[path] for path in sources)
+    return decode(data), known, touched
+
+
+def load_model(
+    docs_path: str = DEFAULT_DOCS_PATH,
+    configs_path: str = "./src/config_betas.json",
+    enums_path: str = "./src/enums",
+    use_snapshot: bool = True,
+) -> Model:
+    """The components, configs and enums, from the snapshot when it is up to date and
+    parsed from the sources (saving a new snapshot) when it isn't"""
+    if not use_snapshot:
+        configs, config_types = load_configs(configs_path)
+        return Model(
+            load_components(docs_path), configs, config_types, load_enums(enums_path)
+        )
+    sources = snapshot_sources(docs_path, configs_path, enums_path)
+    path = snapshot_path(docs_path, configs_path, enums_path)
+    model, known, outdated = read_snapshot(path, sources)
+    if not outdated and model is not None:
+        return model
+    # hashed before parsing, a source saved in between makes the next run parse again
+    for source in sources:
+        hash_file(source, known)
+    if model is None:
+        model = load_model(docs_path, configs_path, enums_path, False)
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        open(path + ".tmp", "wb").write(
+            encode(model, {source: known[source] for source in sources})
+        )
+        os.replace(path + ".tmp", path)
+    except OSError:
+        # a read-only checkout still builds, just without the head start
+        pass
+    return model
@@ -0,0 +1,372 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from xml.parsers import expat
+
+from lxml import etree
+
+from .native import BUILTIN_CHECKS, ElementTable, NativeValidator, Tables
+from .validate import FILE_SCHEMAS, ROOT_SCHEMAS, find_xml_files
+
+# validation that never holds the document: the generated schemas are compiled into the same
+# lookup tables native.py builds for entities, and the file is fed to expat a chunk at a time.
+# Every element is checked when it starts and forgotten when it ends, so memory only grows with
+# the nesting depth (and the keys of xsd:unique constraints), and errors come out while the
+# rest of the file is still unread. Covers the parts of xsd the schemas in out/ use: named and
+# anonymous types, extension, attribute groups, element refs, enumerations, patterns and
+# xsd:unique on attributes. Element order isn't checked and of minOccurs only whether an element
+# that needs children has any
+XSD = "{http://www.w3.org/2001/XMLSchema}"
+CHUNK_SIZE = 64 * 1024
+UNBOUNDED = float("inf")
+
+
+@dataclass
+class SchemaTables(Tables):
+    # table name -> (constraint name, selected child elements, attribute) of its xsd:unique
+    unique: dict[str, list[tuple[str, frozenset[str], str]]] = field(
+        default_factory=dict
+    )
+    # table name -> the children one of which has to be there, for the error message
+    needs_child: dict[str, list[str]] = field(default_factory=dict)
+
+
+def max_occurs(element: etree._Element) -> float:
+    value = element.get("maxOccurs", "1")
+    return UNBOUNDED if value == "unbounded" else int(value)
+
+
+def first_children(group: etree._Element) -> list[str] | None:
+    """The children a sequence or choice of elements can start with, None if it may be
+    empty (or holds more than elements, which isn't worth following)"""
+    if group.get("minOccurs", "1") == "0":
+        return None
+    expected = []
+    for child in group:
+        if child.tag != f"{XSD}element":
+            return None
+        expected.append(child.get("ref") or child.get("name"))
+        required = child.get("minOccurs", "1") != "0"
+        if group.tag == f"{XSD}sequence" and required:
+            return expected
+        if group.tag == f"{XSD}choice" and not required:
+            return None
+    return expected if group.tag == f"{XSD}choice" and len(expected) != 0 else None
+
+
+class SchemaCompiler:
+    def __init__(self, schema: etree._Element):
+        self.complex_types = {
+            e.get("name"): e for e in schema.iterchildren(f"{XSD}complexType")
+        }
+        self.simple_types = {
+            e.get("name"): e for e in schema.iterchildren(f"{XSD}simpleType")
+        }
+        self.groups = {
+            e.get("name"): e for e in schema.iterchildren(f"{XSD}attributeGroup")
+        }
+        self.elements = {e.get("name"): e for e in schema.iterchildren(f"{XSD}element")}
+        self.tables = SchemaTables({}, {}, dict(BUILTIN_CHECKS))
+        for name in self.simple_types:
+            self.simple_type(name, self.simple_types[name])
+        for name, element in self.elements.items():
+            self.tables.roots[name] = self.element_table(element, "")
+
+    def simple_type(self, name: str, element: etree._Element) -> str:
+        restriction = element.find(f"{XSD}restriction")
+        if restriction is None:
+            self.tables.checks[name] = None
+            return name
+        variants = [e.get("value") for e in restriction.iterchildren(f"{XSD}enumeration")]
+        patterns = [e.get("value") for e in restriction.iterchildren(f"{XSD}pattern")]
+        if len(variants) != 0:
+            self.tables.enums[name] = dict.fromkeys(variants)
+            self.tables.checks[name] = self.tables.enums[name].__contains__
+        elif len(patterns) != 0:
+            # xsd patterns are anchored and these use nothing python reads differently
+            pattern = re.compile("|".join(f"(?:{p})" for p in patterns))
+            self.tables.checks[name] = lambda value: pattern.fullmatch(value) is not None
+        else:
+            self.tables.checks[name] = self.tables.checks.get(restriction.get("base", ""))
+        return name
+
+    def attribute_type(self, attribute: etree._Element, owner: str) -> str:
+        ty = attribute.get("type")
+        if ty is not None:
+            return ty
+        inline = attribute.find(f"{XSD}simpleType")
+        if inline is None:
+            return "xsd:string"
+        return self.simple_type(f"{owner}@{attribute.get('name')}", inline)
+
+    def element_table(self, element: etree._Element, parent: str) -> str:
+        ref = element.get("ref")
+        if ref is not None:
+            return self.element_table(self.elements[ref], "")
+        ty = element.get("type")
+        if ty is not None:
+            if ty not in self.complex_types:
+                # simple content, there are no attributes to check
+                if ty not in self.tables.elements:
+                    self.tables.elements[ty] = ElementTable({}, {})
+                return ty
+            return self.complex_type(ty, self.complex_types[ty])
+        name = f"{parent}/{element.get('name')}"
+        inline = element.find(f"{XSD}complexType")
+        if inline is None:
+            self.tables.elements[name] = ElementTable({}, {})
+        else:
+            self.complex_type(name, inline)
+        constraints = [
+            (
+                unique.get("name"),
+                frozenset(
+                    step.strip()
+                    for step in unique.find(f"{XSD}selector").get("xpath").split("|")
+                ),
+                unique.find(f"{XSD}field").get("xpath").removeprefix("@"),
+            )
+            for unique in element.iterchildren(f"{XSD}unique")
+        ]
+        if len(constraints) != 0:
+            self.tables.unique[name] = constraints
+        return name
+
+    def complex_type(self, name: str, element: etree._Element) -> str:
+        if name in self.tables.elements:
+            return name
+        # added before the content so types containing themselves (Entity) terminate
+        table = ElementTable({}, {}, mixed=element.get("mixed") == "true")
+        self.tables.elements[name] = table
+        occurs: dict[str, float] = {}
+        required: set[str] = set()
+        self.content(name, element, table, occurs, required, 1)
+        table.required = frozenset(required)
+        table.repeatable = any(count > 1 for count in occurs.values())
+        for group in element.iterchildren(f"{XSD}sequence", f"{XSD}choice"):
+            expected = first_children(group)
+            if expected is not None:
+                self.tables.needs_child[name] = expected
+        return name
+
+    def content(
+        self,
+        name: str,
+        element: etree._Element,
+        table: ElementTable,
+        occurs: dict[str, float],
+        required: set[str],
+        repeat: float,
+    ):
+        """Adds the attributes and children declared in element to table, occurs gets how
+        often each child may appear and required the required attributes"""
+        for child in element:
+            tag = child.tag
+            if tag == f"{XSD}attribute":
+                attribute = child.get("name")
+                table.attributes[attribute] = self.attribute_type(child, name)
+                if child.get("use") == "required":
+                    required.add(attribute)
+            elif tag == f"{XSD}attributeGroup":
+                group = self.groups[child.get("ref")]
+                self.content(name, group, table, occurs, required, repeat)
+            elif tag in (f"{XSD}sequence", f"{XSD}choice", f"{XSD}all"):
+                self.content(
+                    name, child, table, occurs, required, repeat * max_occurs(child)
+                )
+            elif tag == f"{XSD}element":
+                child_name = child.get("ref") or child.get("name")
+                table.children[child_name] = self.element_table(child, name)
+                occurs[child_name] = occurs.get(child_name, 0) + repeat * max_occurs(
+                    child
+                )
+            elif tag in (f"{XSD}complexContent", f"{XSD}simpleContent"):
+                self.content(name, child, table, occurs, required, repeat)
+            elif tag == f"{XSD}extension":
+                base = child.get("base")
+                if base in self.complex_types:
+                    base_table = self.tables.elements[
+                        self.complex_type(base, self.complex_types[base])
+                    ]
+                    table.attributes.update(base_table.attributes)
+                    table.children.update(base_table.children)
+                    required |= base_table.required
+                    for child_name in base_table.children:
+                        occurs[child_name] = UNBOUNDED if base_table.repeatable else 1
+                self.content(name, child, table, occurs, required, repeat)
+
+
+def compile_schema(path: str) -> SchemaTables:
+    """Lookup tables for a generated (or hand written) schema in out/"""
+    parser = etree.XMLParser(remove_comments=True, resolve_entities=False)
+    return SchemaCompiler(etree.parse(path, parser).getroot()).tables
+
+
+class StreamValidator(NativeValidator):
+    """Validates any file the schemas in schema_dir cover, yielding the errors as the
+    file is read. The schema is picked like validate.py does, once the root element is
+    known, and compiled the first time it is needed"""
+
+    def __init__(self, schema_dir: str = "./out", chunk_size: int = CHUNK_SIZE):
+        super().__init__(SchemaTables({}, {}, {}), "")
+        self.schema_dir = schema_dir
+        self.chunk_size = chunk_size
+        self.compiled: dict[str, SchemaTables] = {}
+        self.forced_schema: str | None = None
+
+    def iter_validate(
+        self, path: str, forced_schema: str | None = None
+    ) -> Iterator[dict]:
+        parser = self.reset(path)
+        self.forced_schema = forced_schema
+        # one entry per open element: [its table name, start line, whether it has child
+        # elements, the keys seen for its xsd:unique constraints]
+        self.open: list[list] = []
+        try:
+            with open(path, "rb") as file:
+                while True:
+                    chunk = file.read(self.chunk_size)
+                    parser.Parse(chunk, len(chunk) == 0)
+                    if len(self.errors) != 0:
+                        yield from self.errors
+                        self.errors.clear()
+                    if len(chunk) == 0:
+                        break
+        except (expat.ExpatError, OSError) as e:
+            yield self.record(
+                getattr(e, "lineno", 0),
+                "fatal",
+                type(e).__name__,
+                str(e),
+                column=getattr(e, "offset", 0),
+            )
+
+    def validate(self, path: str) -> list[dict]:
+        return list(self.iter_validate(path))
+
+    def pick(self, root: str):
+        name = (
+            self.forced_schema
+            or FILE_SCHEMAS.get(os.path.basename(self.path))
+            or ROOT_SCHEMAS.get(root)
+        )
+        self.schema = name or ""
+        if name is None:
+            self.tables = SchemaTables({}, {}, {})
+            return
+        tables = self.compiled.get(name)
+        if tables is None:
+            tables = compile_schema(os.path.join(self.schema_dir, f"{name}.xsd"))
+            self.compiled[name] = tables
+        self.tables = tables
+
+    def start(self, name: str, attributes: dict[str, str]):
+        if len(self.stack) == 0:
+            self.pick(name)
+            if self.schema == "":
+                self.errors.append(
+                    self.record(
+                        self.parser.CurrentLineNumber,
+                        "skipped",
+                        "NO_SCHEMA",
+                        f"no schema for root element <{name}>",
+                    )
+                )
+                self.parser.StartElementHandler = None
+                self.parser.EndElementHandler = None
+                self.parser.CharacterDataHandler = None
+                return
+        else:
+            self.open[-1][2] = True
+        if len(self.open) != 0 and self.open[-1][3] is not None:
+            for constraint, selected, attribute, seen in self.open[-1][3]:
+                value = attributes.get(attribute)
+                if name not in selected or value is None:
+                    continue
+                if value in seen:
+                    self.error(
+                        "SCHEMAV_CVC_IDC",
+                        f"Element '{name}': Duplicate key-sequence ['{value}'] in unique identity-constraint '{constraint}'.",
+                    )
+                seen.add(value)
+        super().start(name, attributes)
+        table_name = self.table_name(name) if self.stack[-1][0] is not None else None
+        constraints = None
+        if table_name in self.tables.unique:
+            constraints = [
+                (*constraint, set()) for constraint in self.tables.unique[table_name]
+            ]
+        self.open.append(
+            [table_name, self.parser.CurrentLineNumber, False, constraints]
+        )
+
+    def table_name(self, name: str) -> str | None:
+        if len(self.stack) == 1:
+            return self.tables.roots.get(name)
+        parent = self.stack[-2][0]
+        return parent.children.get(name) if parent is not None else None
+
+    def end(self, name: str):
+        super().end(name)
+        table_name, line, has_child, _ = self.open.pop()
+        if not has_child and table_name in self.tables.needs_child:
+            expected = self.tables.needs_child[table_name]
+            one_of = "one of " if len(expected) > 1 else ""
+            self.errors.append(
+                self.record(
+                    line,
+                    "error",
+                    "SCHEMAV_ELEMENT_CONTENT",
+                    f"Element '{name}': Missing child element(s). Expected is {one_of}( {', '.join(expected)} ).",
+                )
+            )
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Validate xml files against the generated schemas without loading them into memory, printing one json error per line as soon as it is found"
+    )
+    arg_parser.add_argument(
+        "paths", nargs="+", help="xml files, or directories to search for *.xml files"
+    )
+    arg_parser.add_argument(
+        "--schema-dir", default="./out", help="directory holding the generated schemas"
+    )
+    arg_parser.add_argument(
+        "--schema", help="validate every file against this schema instead of picking one"
+    )
+    arg_parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=CHUNK_SIZE,
+        help="bytes read at a time, the memory a file takes doesn't grow beyond about this",
+    )
+    args = arg_parser.parse_args(argv)
+
+    validator = StreamValidator(args.schema_dir, args.chunk_size)
+    start = time.perf_counter()
+    files = invalid = 0
+    for path in find_xml_files(args.paths):
+        files += 1
+        failed = False
+        for error in validator.iter_validate(path, args.schema):
+            failed = failed or error["level"] != "skipped"
+            sys.stdout.write(json.dumps(error) + "\n")
+            sys.stdout.flush()
+        invalid += failed
+    elapsed = time.perf_counter() - start
+    print(
+        f"{files} files, {invalid} invalid in {elapsed:.2f}s",
+        file=sys.stderr,
+    )
+    if invalid != 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import cProfile
+import time
+import tracemalloc
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from .output import Output
+
+# --profile support. Rendering is streamed, so a stage isn't one block of code: the json
+# attributes are rendered while the template is spliced while the outputs are written. Every
+# stage on the stack only counts its own time, a nested stage pauses its parent, so the
+# seconds add up to the wall time. The peak is tracemalloc's while the stage was on the stack
+
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    seconds: float = 0.0
+    peak_bytes: int = 0
+
+
+class Profiler:
+    def __init__(self, cprofile_path: str | None = None):
+        self.cprofile_path = cprofile_path
+        self.stages: dict[str, StageStats] = {}
+        # [name, time the stage last resumed, highest peak seen so far]
+        self.stack: list[list] = []
+
+    def push(self, name: str):
+        now = time.perf_counter()
+        if len(self.stack) != 0:
+            parent = self.stack[-1]
+            self.stats(parent[0]).seconds += now - parent[1]
+            parent[2] = max(parent[2], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self.stack.append([name, now, 0])
+
+    def pop(self):
+        now = time.perf_counter()
+        name, resumed, peak = self.stack.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        stats = self.stats(name)
+        stats.calls += 1
+        stats.seconds += now - resumed
+        stats.peak_bytes = max(stats.peak_bytes, peak)
+        if len(self.stack) != 0:
+            parent = self.stack[-1]
+            parent[1] = now
+            parent[2] = max(parent[2], peak)
+        tracemalloc.reset_peak()
+
+    def stats(self, name: str) -> StageStats:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        return stats
+
+    def report(self) -> str:
+        total = sum(stats.seconds for stats in self.stages.values())
+        lines = [f"{'stage':<36}{'calls':>8}{'ms':>10}{'%':>8}{'peak MB':>10}"]
+        for name, stats in self.stages.items():
+            lines.append(
+                f"{name:<36}{stats.calls:>8}{stats.seconds * 1000:>10.2f}"
+                f"{100 * stats.seconds / total if total != 0 else 0:>8.1f}"
+                f"{stats.peak_bytes / 1e6:>10.2f}"
+            )
+        lines.append(f"{'total':<36}{'':>8}{total * 1000:>10.2f}")
+        return "\n".join(lines)
+
+
+_active: Profiler | None = None
+
+
+@contextmanager
+def profiling(profiler: Profiler | None):
+    """Makes profiler the one stage(), timed() and timed_output() report to"""
+    global _active
+    if profiler is None:
+        yield
+        return
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    _active = profiler
+    try:
+        yield
+    finally:
+        _active = None
+        if not tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name: str):
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    profiler.push(name)
+    try:
+        yield
+    finally:
+        profiler.pop()
+
+
+def timed(name: str, chunks: Iterable[str]) -> Iterable[str]:
+    """Counts the time spent producing each chunk towards the stage name"""
+    if _active is None:
+        return chunks
+    return _timed(_active, name, iter(chunks))
+
+
+def _timed(profiler: Profiler, name: str, chunks: Iterator[str]) -> Iterator[str]:
+    while True:
+        profiler.push(name)
+        try:
+            chunk = next(chunks, None)
+        finally:
+            profiler.pop()
+        if chunk is None:
+            return
+        yield chunk
+
+
+class TimedOutput:
+    def __init__(self, profiler: Profiler, name: str, target: Output):
+        self.profiler = profiler
+        self.name = name
+        self.target = target
+
+    def write(self, chunk: str):
+        self.profiler.push(self.name)
+        try:
+            self.target.write(chunk)
+        finally:
+            self.profiler.pop()
+
+
+def timed_output(name: str, output: Output) -> Output:
+    if _active is None:
+        return output
+    return TimedOutput(_active, name, output)
+
+
+@contextmanager
+def cprofiled():
+    """Runs the block under cProfile if the active profiler was asked to dump one"""
+    if _active is None or _active.cprofile_path is None:
+        yield
+        return
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(_active.cprofile_path)
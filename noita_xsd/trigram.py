@@ -0,0 +1,107 @@
+import heapq
+from collections import Counter
+
+# close-name suggestions for the checkers: the names are indexed by their trigrams, so a
+# lookup only measures the few names sharing most trigrams instead of every name
+
+# names compared in full after the trigram filter
+CANDIDATES = 8
+SUGGESTIONS = 3
+
+
+def trigrams(name: str) -> set[str]:
+    # padded so the start and end of a name count as much as the middle
+    padded = f"  {name.lower()} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (a swap of neighbours counts once), anything
+    above limit is returned as limit + 1"""
+    # most typos are one spot in a long name, the shared start and end cost nothing
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a = a[start : len(a) - end]
+    b = b[start : len(b) - end]
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) == 0 or len(b) == 0:
+        return max(len(a), len(b))
+    over = limit + 1
+    previous2: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        current[0] = i
+        row_best = i
+        char = a[i - 1]
+        # cells further than limit from the diagonal can't be within the limit
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            best = previous[j - 1] if char == b[j - 1] else previous[j - 1] + 1
+            if previous[j] + 1 < best:
+                best = previous[j] + 1
+            if current[j - 1] + 1 < best:
+                best = current[j - 1] + 1
+            if (
+                i > 1
+                and j > 1
+                and char == b[j - 2]
+                and a[i - 2] == b[j - 1]
+                and previous2[j - 2] + 1 < best
+            ):
+                best = previous2[j - 2] + 1
+            current[j] = best
+            if best < row_best:
+                row_best = best
+        if row_best > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+class TrigramIndex:
+    def __init__(self, names):
+        self.names = list(names)
+        self.lowered = [name.lower() for name in self.names]
+        self.sizes: list[int] = []
+        self.postings: dict[str, list[int]] = {}
+        for i, name in enumerate(self.names):
+            grams = trigrams(name)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(i)
+
+    def suggest(self, name: str, count: int = SUGGESTIONS) -> list[str]:
+        """The closest names, by edit distance among the names sharing the most trigrams.
+        A name only counts as close if a quarter of it or less differs, or if most of its
+        trigrams are shared (a missing or extra word)"""
+        grams = trigrams(name)
+        shared: Counter[int] = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        lowered = name.lower()
+        limit = max(2, len(lowered) // 4)
+        ranked: list[tuple[int, float, str]] = []
+        # ties go to the earlier name, most_common would order them by the set's hashes
+        closest = heapq.nsmallest(
+            CANDIDATES, shared.items(), key=lambda item: (-item[1], item[0])
+        )
+        for i, common in closest:
+            # once count names are closer, the others only have to be measured that far
+            if len(ranked) >= count:
+                limit = min(limit, ranked[count - 1][0])
+            dice = 2 * common / (len(grams) + self.sizes[i])
+            # an edit changes at most 4 trigrams, names differing in more trigrams than
+            # the limit allows don't need measuring
+            if max(len(grams), self.sizes[i]) - common > 4 * limit:
+                distance = limit + 1
+            else:
+                distance = edit_distance(lowered, self.lowered[i], limit)
+            if distance <= limit or dice >= 0.6:
+                ranked.append((distance, -dice, self.names[i]))
+                ranked.sort()
+        return [name for _, _, name in ranked[:count]]
@@ -0,0 +1,285 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections.abc import Iterable, Iterator
+
+from lxml import etree
+
+from .cache import DEFAULT_CACHE_PATH, ResultCache
+from .magic import MagicNumbersChecker
+from .native import NativeValidator, compile_tables
+from .parse import DEFAULT_DOCS_PATH
+from .records import record
+from .snapshot import load_model
+
+# which out/*.xsd a file is checked against, the file name wins over the root element
+# since a mod.xml and an entity file can't be told apart by much else
+FILE_SCHEMAS = {
+    "mod.xml": "mod",
+    "magic_numbers.xml": "magic_numbers",
+    "biomes_all.xml": "biomes_all",
+}
+ROOT_SCHEMAS = {
+    "Entity": "entity",
+    "Materials": "materials",
+    "Sprite": "sprite",
+    "Mod": "mod",
+    "MagicNumbers": "magic_numbers",
+    "BiomesToLoad": "biomes_all",
+}
+
+# per process state, every worker compiles a schema the first time it needs it and keeps it
+_schema_dir = "./out"
+_schemas: dict[str, etree.XMLSchema] = {}
+_parser = etree.XMLParser(resolve_entities=False, no_network=True)
+_native: NativeValidator | None = None
+_magic: MagicNumbersChecker | None = None
+
+
+def init_worker(schema_dir: str, docs_path: str | None = None):
+    """docs_path enables the native validator for entity files, built from that
+    component_documentation.txt instead of compiling entity.xsd, and the magic numbers
+    checker for magic_numbers.xml"""
+    global _schema_dir, _native, _magic
+    _schema_dir = schema_dir
+    _schemas.clear()
+    _native = None
+    _magic = None
+    if docs_path is not None:
+        _magic = MagicNumbersChecker()
+        model = load_model(docs_path)
+        tables = compile_tables(
+            model.components, model.configs, model.enums, model.config_types
+        )
+        _native = NativeValidator(tables)
+
+
+def get_schema(name: str) -> etree.XMLSchema:
+    schema = _schemas.get(name)
+    if schema is None:
+        path = os.path.join(_schema_dir, f"{name}.xsd")
+        schema = etree.XMLSchema(etree.parse(path, _parser))
+        _schemas[name] = schema
+    return schema
+
+
+def pick_schema(path: str, root_tag: str) -> str | None:
+    return FILE_SCHEMAS.get(os.path.basename(path)) or ROOT_SCHEMAS.get(root_tag)
+
+
+def validate_file(path: str, forced_schema: str | None = None) -> list[dict]:
+    """Validates one file, returning an error record for every problem found. A file
+    without a matching schema gets a single record with level "skipped\""""
+    return check_file(path, forced_schema)[1]
+
+
+def check_file(
+    path: str, forced_schema: str | None = None
+) -> tuple[str | None, list[dict]]:
+    """validate_file, plus what the file was checked with: "xsd:{schema name}",
+    "native:entity" or "magic:magic_numbers", None when the result only depends on the
+    file itself (it didn't parse or no schema applies)"""
+    if _magic is not None and (
+        forced_schema or FILE_SCHEMAS.get(os.path.basename(path))
+    ) == "magic_numbers":
+        return "magic:magic_numbers", _magic.check(path)
+    if (
+        _native is not None
+        and forced_schema in (None, "entity")
+        and os.path.basename(path) not in FILE_SCHEMAS
+    ):
+        errors = _native.validate(path)
+        # anything but an <Entity> goes through the schemas
+        if len(errors) == 0 or errors[0]["type"] != "SCHEMAV_CVC_ELT_1":
+            return "native:entity", errors
+    try:
+        tree = etree.parse(path, _parser)
+    except (etree.XMLSyntaxError, OSError) as e:
+        line, column = getattr(e, "position", (0, 0))
+        return None, [
+            record(
+                path, None, line, "fatal", type(e).__name__, str(e), column=column
+            )
+        ]
+    root_tag = tree.getroot().tag
+    name = forced_schema or pick_schema(path, root_tag)
+    if name is None:
+        return None, [
+            record(
+                path,
+                None,
+                tree.getroot().sourceline,
+                "skipped",
+                "NO_SCHEMA",
+                f"no schema for root element <{root_tag}>",
+            )
+        ]
+    schema = get_schema(name)
+    if schema.validate(tree):
+        return f"xsd:{name}", []
+    return f"xsd:{name}", [
+        record(
+            path,
+            name,
+            error.line,
+            error.level_name.lower(),
+            error.type_name,
+            error.message,
+            column=error.column,
+        )
+        for error in schema.error_log
+    ]
+
+
+def _check_task(task: tuple[str, str | None]) -> tuple[str, str | None, list[dict]]:
+    return task[0], *check_file(*task)
+
+
+def find_xml_files(paths: Iterable[str]) -> Iterator[str]:
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for dir_path, dir_names, file_names in os.walk(path):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                if file_name.endswith(".xml"):
+                    yield os.path.join(dir_path, file_name)
+
+
+def check_files(
+    paths: Iterable[str],
+    schema_dir: str = "./out",
+    jobs: int | None = None,
+    forced_schema: str | None = None,
+    chunk_size: int = 16,
+    docs_path: str | None = None,
+) -> Iterator[tuple[str, str | None, list[dict]]]:
+    """Yields (path, checked with, errors) for every file in input order as soon as it is
+    done, fanning the work out over jobs processes (all cores by default)"""
+    jobs = jobs or os.cpu_count() or 1
+    tasks = ((path, forced_schema) for path in paths)
+    if jobs == 1:
+        init_worker(schema_dir, docs_path)
+        yield from map(_check_task, tasks)
+        return
+    with multiprocessing.Pool(jobs, init_worker, (schema_dir, docs_path)) as pool:
+        # imap keeps the input order while still handing results back as they finish
+        yield from pool.imap(_check_task, tasks, chunk_size)
+
+
+def validate_files(
+    paths: Iterable[str],
+    schema_dir: str = "./out",
+    jobs: int | None = None,
+    forced_schema: str | None = None,
+    chunk_size: int = 16,
+    docs_path: str | None = None,
+    cache: ResultCache | None = None,
+) -> Iterator[tuple[str, list[dict]]]:
+    """Yields (path, errors) for every file in input order, see check_files. With a cache
+    only the files that changed, or whose schema did, are checked and the rest get the
+    errors from last time"""
+    if cache is None:
+        for path, _, errors in check_files(
+            paths, schema_dir, jobs, forced_schema, chunk_size, docs_path
+        ):
+            yield path, errors
+        return
+    # every file is looked up (and hashed) before any is checked, a file saved while
+    # it is being checked then has the old hash recorded and is checked again next time
+    planned = [(path, cache.lookup(path)) for path in paths]
+    checked = check_files(
+        [path for path, errors in planned if errors is None],
+        schema_dir,
+        jobs,
+        forced_schema,
+        chunk_size,
+        docs_path,
+    )
+    for path, errors in planned:
+        if errors is None:
+            _, checker, errors = next(checked)
+            cache.store(path, checker, errors)
+        yield path, errors
+
+
+def main(argv: list[str] | None = None):
+    arg_parser = argparse.ArgumentParser(
+        description="Validate Noita xml files against the generated schemas, printing one json error per line"
+    )
+    arg_parser.add_argument(
+        "paths", nargs="+", help="xml files, or directories to search for *.xml files"
+    )
+    arg_parser.add_argument(
+        "--schema-dir", default="./out", help="directory holding the generated schemas"
+    )
+    arg_parser.add_argument(
+        "--schema",
+        help="validate every file against this schema (e.g. merged) instead of picking one per file",
+    )
+    arg_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=None,
+        help="number of worker processes, defaults to the number of cores",
+    )
+    arg_parser.add_argument(
+        "--native",
+        nargs="?",
+        const=DEFAULT_DOCS_PATH,
+        metavar="DOCS_PATH",
+        help="check entity files with lookup tables built from component_documentation.txt instead of entity.xsd, and magic_numbers.xml against src/magic_numbers.json, unknown names get suggestions",
+    )
+    arg_parser.add_argument(
+        "--skipped",
+        action="store_true",
+        help="also report files that no schema applies to",
+    )
+    arg_parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=DEFAULT_CACHE_PATH,
+        metavar="CACHE_PATH",
+        help=f"only check files that changed since the last run with the same cache (default {DEFAULT_CACHE_PATH}) or whose schema did, the others get their errors from the cache",
+    )
+    args = arg_parser.parse_args(argv)
+
+    start = time.perf_counter()
+    cache = None
+    if args.cache is not None:
+        cache = ResultCache(args.cache, args.schema_dir, args.native, args.schema)
+    files = invalid = skipped = 0
+    for path, errors in validate_files(
+        find_xml_files(args.paths),
+        args.schema_dir,
+        args.jobs,
+        args.schema,
+        docs_path=args.native,
+        cache=cache,
+    ):
+        files += 1
+        if len(errors) == 1 and errors[0]["level"] == "skipped":
+            skipped += 1
+            if not args.skipped:
+                continue
+        elif len(errors) != 0:
+            invalid += 1
+        for error in errors:
+            sys.stdout.write(json.dumps(error) + "\n")
+    cached = ""
+    if cache is not None:
+        cache.save()
+        cached = f", {cache.hits} from the cache"
+    elapsed = time.perf_counter() - start
+    print(
+        f"{files} files, {invalid} invalid, {skipped} skipped{cached} in {elapsed:.2f}s "
+        f"({files / elapsed if elapsed > 0 else 0:.0f} files/s)",
+        file=sys.stderr,
+    )
+    if invalid != 0:
+        sys.exit(1)
@@ -0,0 +1,288 @@
+import ctypes
+import ctypes.util
+import io
+import os
+import select
+import struct
+import sys
+import time
+import traceback
+from contextlib import ExitStack
+
+from .build import (
+    MERGED_SECTIONS,
+    OUTPUTS,
+    copy_handwritten,
+    generator_sources,
+    hash_file,
+    is_stale,
+    load_manifest,
+    output_hashes,
+    output_inputs,
+    render_section,
+    save_manifest,
+)
+from .output import NullOutput, Output, StreamedOutput
+from .parse import DEFAULT_DOCS_PATH, load_components, load_configs, load_enums
+from .render import SCHEMA_END, DocsMode, Layout
+
+# --watch keeps the model in memory and only re-renders the outputs a changed source is an
+# input of. merged.xsd is kept as one string per section, so an edit to src/mod.json renders
+# mod.xsd again and joins merged.xsd from the kept parts instead of rendering every entity type
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_Q_OVERFLOW = 0x4000
+EVENT_HEADER = struct.Struct("iIII")
+# editors may save in a few steps, changes this close together make a single rebuild
+SETTLE_SECONDS = 0.01
+POLL_SECONDS = 0.05
+
+
+class InotifyWatcher:
+    """Watches the directories of paths rather than the files, editors that save by renaming
+    a new file over the old one would otherwise end the watch"""
+
+    def __init__(self, paths: list[str]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths = {os.path.abspath(path): path for path in paths}
+        self.dirs: dict[int, str] = {}
+        for directory in sorted({os.path.dirname(path) for path in self.paths}):
+            wd = libc.inotify_add_watch(
+                self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO
+            )
+            if wd < 0:
+                errno = ctypes.get_errno()
+                os.close(self.fd)
+                raise OSError(errno, f"can't watch {directory}")
+            self.dirs[wd] = directory
+
+    def wait(self, timeout: float | None = None) -> set[str]:
+        """The watched paths written since the last call, waits up to timeout seconds for
+        an event. Events for other files in the directories give an empty set"""
+        changed: set[str] = set()
+        if len(select.select([self.fd], [], [], timeout)[0]) == 0:
+            return changed
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return set(self.paths.values())
+            path = self.paths.get(os.path.join(self.dirs.get(wd, ""), name))
+            if path is not None:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    def __init__(self, paths: list[str], interval: float = POLL_SECONDS):
+        self.interval = interval
+        self.stats = {path: self.stat(path) for path in paths}
+
+    @staticmethod
+    def stat(path: str) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def wait(self, timeout: float | None = None) -> set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            changed = set()
+            for path, old in self.stats.items():
+                new = self.stat(path)
+                if new != old:
+                    self.stats[path] = new
+                    changed.add(path)
+            if len(changed) != 0:
+                return changed
+            delay = self.interval
+            if deadline is not None:
+                delay = min(delay, deadline - time.monotonic())
+                if delay <= 0:
+                    return changed
+            time.sleep(delay)
+
+    def close(self):
+        pass
+
+
+def open_watcher(paths: list[str], poll: bool = False) -> InotifyWatcher | PollingWatcher:
+    if not poll:
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            # not linux, or out of inotify watches
+            pass
+    return PollingWatcher(paths)
+
+
+class LiveBuild:
+    """The model and the merged.xsd parts of one out_dir, kept between rebuilds"""
+
+    def __init__(
+        self,
+        docs_path: str = DEFAULT_DOCS_PATH,
+        docs: DocsMode = "full",
+        layout: Layout = "classic",
+        out_dir: str = "./out",
+    ):
+        self.docs_path = docs_path
+        self.docs: DocsMode = docs
+        self.layout: Layout = layout
+        # the options a normal build without --compact records, so it agrees on what is stale
+        self.options = f"docs={docs} compact=False layout={layout}"
+        self.paths = {name: os.path.join(out_dir, f"{name}.xsd") for name in OUTPUTS}
+        self.parts: dict[str, str] = {}
+        self.generator_files: dict = {}
+        self.generator = self.generator_hashes()
+        # hashes of the configs, enums and docs the model in memory was loaded from
+        self.loaded: dict[str, str] = {}
+
+    def generator_hashes(self) -> list[str]:
+        return [hash_file(path, self.generator_files) for path in generator_sources()]
+
+    def generator_changed(self) -> bool:
+        """The generator itself isn't reloaded, the watch has to be restarted for that"""
+        return self.generator_hashes() != self.generator
+
+    def sources(self) -> list[str]:
+        generator = generator_sources()
+        return [
+            path
+            for path in output_inputs(self.docs_path)["merged"]
+            if path not in generator
+        ]
+
+    def reload(self, known: dict):
+        """Loads the model sources that differ from the ones in memory, known is the
+        manifest's file cache the inputs were just hashed into"""
+        for path in ["./src/config_betas.json", "./src/enums", self.docs_path]:
+            digest = known[path]["sha256"]
+            if self.loaded.get(path) == digest:
+                continue
+            if path == "./src/config_betas.json":
+                self.configs, self.config_types = load_configs()
+            elif path == "./src/enums":
+                self.enums = load_enums()
+            else:
+                self.components = load_components(self.docs_path)
+            self.loaded[path] = digest
+
+    def rebuild(self) -> list[str]:
+        """Rewrites the stale outputs, returning the paths that were replaced. Only the
+        sources and merged.xsd parts that changed since the last rebuild are redone"""
+        manifest = load_manifest()
+        hashes = output_hashes(OUTPUTS, self.docs_path, self.options, manifest)
+        self.reload(manifest["files"])
+        stale = {
+            name for name in OUTPUTS if is_stale(self.paths[name], hashes[name], manifest)
+        }
+        files: dict[str, StreamedOutput] = {}
+        # nothing is replaced if any of the outputs fails to render
+        with ExitStack() as stack:
+
+            def open_output(name: str) -> Output:
+                if name not in stale:
+                    return NullOutput()
+                files[name] = stack.enter_context(StreamedOutput(self.paths[name]))
+                return files[name]
+
+            parts = dict(self.parts)
+            for name in MERGED_SECTIONS:
+                if name in stale or name not in parts:
+                    part = io.StringIO()
+                    render_section(
+                        name,
+                        open_output(name),
+                        part,
+                        self.components,
+                        self.configs,
+                        self.enums,
+                        self.config_types,
+                        self.docs,
+                        self.layout,
+                    )
+                    parts[name] = part.getvalue()
+            if "merged" in stale:
+                merged = open_output("merged")
+                for name in MERGED_SECTIONS:
+                    merged.write(parts[name])
+                merged.write(SCHEMA_END)
+            for name in ["sprite", "biomes_all"]:
+                if name in stale:
+                    copy_handwritten(name, open_output(name))
+        self.parts = parts
+
+        if len(stale) != 0:
+            for name in OUTPUTS:
+                manifest["outputs"][self.paths[name]] = hashes[name]
+            save_manifest(manifest)
+        return [self.paths[name] for name in OUTPUTS if name in files and files[name].changed]
+
+
+def watch(
+    docs_path: str = DEFAULT_DOCS_PATH,
+    docs: DocsMode = "full",
+    layout: Layout = "classic",
+    out_dir: str = "./out",
+    poll: bool = False,
+):
+    """Keeps out_dir up to date with src/ and docs_path until interrupted"""
+    # the messages should show up as they happen when piped to a log
+    sys.stdout.reconfigure(line_buffering=True)
+    live = LiveBuild(docs_path, docs, layout, out_dir)
+    sources = live.sources()
+    watcher = open_watcher(sources, poll)
+    try:
+        for path in live.rebuild():
+            print(f"Wrote {path}")
+        kind = "inotify" if isinstance(watcher, InotifyWatcher) else "polling"
+        print(f"Watching {len(sources)} files ({kind}), Ctrl+C to stop")
+        while True:
+            changed = watcher.wait()
+            if len(changed) == 0:
+                continue
+            while True:
+                more = watcher.wait(SETTLE_SECONDS)
+                if len(more) == 0:
+                    break
+                changed |= more
+            start = time.perf_counter()
+            if live.generator_changed():
+                print("noita_xsd was edited, restart --watch to use the new code")
+                return
+            try:
+                written = live.rebuild()
+            except Exception as e:
+                # most likely a half finished edit, the old outputs are left in place
+                print(
+                    f"Rebuild after changes to {', '.join(sorted(changed))} failed:",
+                    file=sys.stderr,
+                )
+                traceback.print_exception(e, limit=-1, file=sys.stderr)
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            if len(written) == 0:
+                print(f"{', '.join(sorted(changed))} changed, outputs are the same")
+            for path in written:
+                print(f"Wrote {path} ({elapsed:.1f} ms)")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
@@ -0,0 +1,42 @@
+import os
+import shutil
+import subprocess
+import sys
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DOCS = """AbilityComponent
+ - Members -----------------------------
+    int                     cooldown_frames                          0 [0, 60000] ""
+    std::string             entity_file                              - "the projectile entity file"
+"""
+
+
+def generate(cwd: str) -> str:
+    return subprocess.run(
+        [sys.executable, "-m", "noita_xsd", "docs.txt"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+def test_editing_ir_rebuilds(tmp_path):
+    # a copy of the package, so the edit and the build cache stay in tmp_path
+    shutil.copytree(
+        os.path.join(REPO, "noita_xsd"),
+        tmp_path / "noita_xsd",
+        ignore=shutil.ignore_patterns("__pycache__"),
+    )
+    os.symlink(os.path.join(REPO, "src"), tmp_path / "src")
+    (tmp_path / "docs.txt").write_text(DOCS)
+    assert "Wrote ./out/entity.xsd" in generate(tmp_path)
+    assert generate(tmp_path) == "All outputs are up to date\n"
+
+    ir = tmp_path / "noita_xsd" / "ir.py"
+    source = ir.read_text()
+    assert 'doc="Base file"' in source
+    ir.write_text(source.replace('doc="Base file"', 'doc="Base entity file"'))
+    assert "Wrote ./out/entity.xsd" in generate(tmp_path)
+    assert "Base entity file" in (tmp_path / "out" / "entity.xsd").read_text()
@@ -0,0 +1,20 @@
+import pytest
+
+from noita_xsd.render import iter_replacements, replace_metatag
+
+MARKER = "<!-- Attributes -->"
+
+
+@pytest.mark.parametrize("markers", [1, 2, 3, 4, 5])
+@pytest.mark.parametrize("streamed", [False, True])
+def test_iter_replacements_matches_replace_metatag(
+    tmp_path, monkeypatch, markers, streamed
+):
+    template = "".join(f"<part{i}/>{MARKER}" for i in range(markers)) + "<end/>"
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "template.xsd").write_text(template)
+    monkeypatch.chdir(tmp_path)
+    replacement = iter(["<a/>", "<b/>"]) if streamed else "<a/><b/>"
+    assert "".join(
+        iter_replacements("template", {"Attributes": replacement})
+    ) == replace_metatag(template, "<a/><b/>", MARKER)
@@ -0,0 +1,4 @@
+from noita_xsd.validate import main
+
+if __name__ == "__main__":
+    main()